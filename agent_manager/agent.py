@@ -1,55 +1,71 @@
 import asyncio
-import re
+import threading
 import uuid
 from typing import Any, Dict, Optional
 
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService
 from google.genai import types
 
-from .config import APP_NAME, MODEL, GEMINI_MODEL_PATTERN, AZURE_OPENAI_MODEL_PATTERN
-from .sub_agents.action_recommender.agent import action_recommender_agent
-from .sub_agents.detector.agent import detector_agent
-from .sub_agents.fixer.agent import fixer_agent
-from .sub_agents.notifier.agent import notifier_agent
-from .sub_agents.planner.agent import planner_agent
+from .config import SESSION_DB_URL
+from .callbacks import agent_callbacks
+from .database import create_session_service
+from .llm import model_for_agent
+from .sub_agents import build_sub_agents
 
-# --- Constants ---
-DB_URL = "sqlite:///./agent_Manager_data.db"
+# --- Root Agent Definition ---
+# Built on first access of root_agent (the ADK agent loader reads it as a module
+# attribute), so importing this module builds no agents and imports no sub-agent
+# modules; model clients and toolsets are in turn created when an agent first runs.
+_root_agent: Optional[Agent] = None
+_root_agent_lock = threading.Lock()
 
-# --- Model Selection ---
-if re.findall(AZURE_OPENAI_MODEL_PATTERN, MODEL):
-    model_instance = LiteLlm(model="azure/gpt-4o")
-elif re.findall(GEMINI_MODEL_PATTERN, MODEL):
-    model_instance = MODEL  # MODEL is assumed to be a valid Gemini string
-else:
-    raise ValueError(f"Unsupported model format: {MODEL}")
 
-# --- Root Agent Definition ---
-root_agent = Agent(
-    name="agent_manager",
-    model=model_instance,
-    description="Orchestration layer for the chaos engineering system.",
-    sub_agents=[
-        detector_agent,
-        planner_agent,
-        action_recommender_agent,
-        fixer_agent,
-        notifier_agent,
-    ],
-)
+def get_root_agent() -> Agent:
+    """Return the orchestrating root agent, building it and its sub-agents on first use."""
+    global _root_agent
+    if _root_agent is None:
+        with _root_agent_lock:
+            if _root_agent is None:
+                _root_agent = Agent(
+                    name="agent_manager",
+                    model=model_for_agent("agent_manager"),
+                    description="Orchestration layer for the chaos engineering system.",
+                    sub_agents=build_sub_agents(),
+                    **agent_callbacks(),
+                )
+    return _root_agent
+
+
+def __getattr__(name: str) -> Any:
+    if name == "root_agent":
+        return get_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Session Service ---
-session_service = DatabaseSessionService(db_url=DB_URL)
+session_service: Optional[BaseSessionService] = None
+
+
+def get_session_service() -> BaseSessionService:
+    """Return the shared session service, connecting to SESSION_DB_URL on first use."""
+    global session_service
+    if session_service is None:
+        session_service = create_session_service(SESSION_DB_URL)
+    return session_service
 
 class SessionManager:
     """Manages session lifecycle for Google ADK with proper error handling and cleanup."""
     
-    def __init__(self, session_service: DatabaseSessionService):
-        self.session_service = session_service
+    def __init__(self, session_service: Optional[BaseSessionService] = None):
+        self._session_service = session_service
         self._active_sessions: Dict[str, Any] = {}
+
+    @property
+    def session_service(self) -> BaseSessionService:
+        if self._session_service is None:
+            self._session_service = get_session_service()
+        return self._session_service
     
     async def get_or_create_session(self, app_name: str, user_id: str, session_id: Optional[str] = None) -> tuple:
         """
@@ -100,16 +116,26 @@ class SessionManager:
             
             # Update cached session if it exists
             if session_key in self._active_sessions:
-                current_state = self._active_sessions[session_key].state or {}
-                current_state.update(state_updates)
-                
-                # Update in database
-                await self.session_service.update_session_state(
+                # Re-read first: runs append events, so the cached copy is stale and the
+                # session service rejects appends to sessions older than storage
+                session = await self.session_service.get_session(
                     app_name=app_name,
                     user_id=user_id,
-                    session_id=session_id,
-                    state=current_state
+                    session_id=session_id
                 )
+                if session is None:
+                    return
+                
+                # Session services only persist state through events carrying a state_delta
+                await self.session_service.append_event(
+                    session,
+                    Event(
+                        invocation_id=f"state-{uuid.uuid4().hex[:8]}",
+                        author="user",
+                        actions=EventActions(state_delta=state_updates),
+                    ),
+                )
+                self._active_sessions[session_key] = session
                 
                 print(f"Updated session state for {session_id}")
         except Exception as e:
@@ -130,7 +156,7 @@ class SessionManager:
         return len(self._active_sessions)
 
 # --- Initialize Session Manager ---
-session_manager = SessionManager(session_service)
+session_manager = SessionManager()
 
 # --- Helper: Convert dict to types.Content ---
 def dict_to_content(new_message_dict: Dict[str, Any]) -> types.Content:
@@ -197,10 +223,12 @@ async def run_with_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
         print(f"SESSION READY - ID: {session_id}")
         
         # Create runner
+        from google.adk.runners import Runner
+
         runner = Runner(
-            agent=root_agent,
+            agent=get_root_agent(),
             app_name=app_name,
-            session_service=session_service
+            session_service=session_manager.session_service
         )
         
         # Process message if provided
@@ -226,6 +254,9 @@ async def run_with_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
                 new_message=new_message
             ):
                 if event.is_final_response():
+                    # Callback events can be final with only a state delta and no content
+                    if not (event.content and event.content.parts):
+                        continue
                     final_response = event.content.parts[0].text
                     responses.append({
                         "type": "final",
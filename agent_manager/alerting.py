@@ -0,0 +1,303 @@
+# alerting.py
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from google.genai import types
+from pydantic import ValidationError
+
+from .config import (
+    ALERT_CHANNEL_RATE_LIMITS,
+    ALERT_COALESCING_ENABLED,
+    ALERT_DEFAULT_RATE_PER_HOUR,
+    ALERT_WINDOW_SECONDS,
+)
+from .schemas import compact_json, validate_output
+from .tools.rollups import message_template
+
+# Default channel per alert severity, as in the notifier's output example
+SEVERITY_CHANNELS: Dict[str, str] = {"critical": "email", "info": "slack"}
+_REGION = re.compile(r"\b[a-z]+-[a-z]+[0-9]+\b")
+
+# (region, incident_type, task)
+AlertKey = Tuple[Optional[str], Optional[str], str]
+
+
+@dataclass(frozen=True)
+class Alert:
+    """One notification the notifier would send for a fixer task."""
+
+    region: Optional[str]
+    incident_type: Optional[str]
+    task: str
+    severity: str  # 'critical' (escalation) or 'info' (auto-approved)
+    channel: str
+    incident_id: Optional[str] = None
+    # The fixer task this alert is for; not part of the dedup key
+    task_id: Optional[str] = field(default=None, compare=False)
+
+    @property
+    def key(self) -> AlertKey:
+        return (self.region, self.incident_type, self.task)
+
+
+def _task_alert(task: Dict[str, Any], severity: str, plan: Dict[str, Any]) -> Alert:
+    description = task.get("description") or ""
+    region = _REGION.search(description)
+    summary = plan.get("incident_summary") or {}
+    return Alert(
+        region=region.group(0) if region else None,
+        incident_type=summary.get("incident_type"),
+        # Task ids restart at task-001 for every incident, so the action itself identifies the task
+        task=message_template(description) or task["task_id"],
+        severity=severity,
+        channel=SEVERITY_CHANNELS[severity],
+        incident_id=plan.get("incident_id"),
+        task_id=task["task_id"],
+    )
+
+
+def alerts_from_state(state: Any) -> List[Alert]:
+    """Alerts implied by the fixer_summary (and plan) in session state; empty if there is none."""
+    try:
+        fixer_summary = validate_output("fixer_summary", state.get("fixer_summary") or {})
+        plan = validate_output("plan", state.get("plan") or {})
+    except (ValueError, ValidationError):
+        return []
+    return [_task_alert(task, "critical", plan) for task in fixer_summary.get("escalation_required", [])] + [
+        _task_alert(task, "info", plan) for task in fixer_summary.get("safe_to_execute_tasks", [])
+    ]
+
+
+class ChannelRateLimiter:
+    """Token bucket per channel: up to rate_per_hour notifications, refilled continuously."""
+
+    def __init__(self, limits: Dict[str, float], default_per_hour: float):
+        self.limits = limits
+        self.default_per_hour = default_per_hour
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def allow(self, channel: str, now: float) -> bool:
+        capacity = self.limits.get(channel, self.default_per_hour)
+        tokens, updated = self._buckets.get(channel, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * capacity / 3600)
+        allowed = tokens >= 1
+        self._buckets[channel] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+@dataclass
+class AlertWindow:
+    """Alerts sharing one dedup key within one aggregation window."""
+
+    alert: Alert
+    opened_at: float
+    count: int = 0
+    notified: int = 0
+    incidents: Set[str] = field(default_factory=set)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "region": self.alert.region,
+            "incident_type": self.alert.incident_type,
+            "task": self.alert.task,
+            "severity": self.alert.severity,
+            "channel": self.alert.channel,
+            "alerts": self.count,
+            "suppressed": self.count - self.notified,
+            "incidents": len(self.incidents),
+            "window_start": datetime.fromtimestamp(self.opened_at, tz=timezone.utc).isoformat(),
+        }
+
+
+@dataclass
+class CoalescingDecision:
+    notify: bool
+    # Alerts that opened a window and are to be sent: escalations always, others if their channel had capacity
+    new_alerts: List[Alert] = field(default_factory=list)
+    suppressed: List[Alert] = field(default_factory=list)
+    # Closed windows that held alerts nobody was notified about, for the next notification to summarise
+    digest: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class AlertCoalescer:
+    """
+    Collapses alert storms into one notification per dedup key per window.
+
+    The first alert for a (region, incident type, task) key opens a window
+    of window_s seconds and is notified at once, if its channel's rate limit
+    allows; a critical (escalation) alert is notified even over the limit,
+    since dropping it would hide a task waiting on a human. Later alerts
+    with that key inside the window are only counted. When a window closes
+    with suppressed alerts, its summary is queued and handed to the next
+    notification, or to flush(), which start_digest_flush() calls on a
+    timer, so every window yields at most one notification and one summary
+    however many events it saw.
+    """
+
+    def __init__(
+        self,
+        window_s: float = ALERT_WINDOW_SECONDS,
+        channel_limits: Optional[Dict[str, float]] = None,
+        default_per_hour: float = ALERT_DEFAULT_RATE_PER_HOUR,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.window_s = window_s
+        self.limiter = ChannelRateLimiter(
+            ALERT_CHANNEL_RATE_LIMITS if channel_limits is None else channel_limits, default_per_hour
+        )
+        self.clock = clock
+        self.windows: Dict[AlertKey, AlertWindow] = {}
+        self._digest: List[Dict[str, Any]] = []
+        self.stats = {"offered": 0, "notified": 0, "suppressed": 0, "over_limit_escalations": 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _close_expired(self, now: float) -> None:
+        for key in [k for k, w in self.windows.items() if now - w.opened_at >= self.window_s]:
+            window = self.windows.pop(key)
+            if window.count > window.notified:
+                self._digest.append(window.summary())
+
+    def offer(self, alerts: List[Alert]) -> CoalescingDecision:
+        """Record alerts and decide whether they warrant a notification now."""
+        with self._lock:
+            now = self.clock()
+            self._close_expired(now)
+            fresh_channels = {alert.key: alert.channel for alert in alerts if alert.key not in self.windows}
+            for alert in alerts:
+                window = self.windows.setdefault(alert.key, AlertWindow(alert=alert, opened_at=now))
+                window.count += 1
+                if alert.incident_id:
+                    window.incidents.add(alert.incident_id)
+            allowed = {channel for channel in set(fresh_channels.values()) if self.limiter.allow(channel, now)}
+            decision = CoalescingDecision(notify=False)
+            for alert in alerts:
+                channel = fresh_channels.pop(alert.key, None)
+                if channel is not None and (channel in allowed or alert.severity == "critical"):
+                    if channel not in allowed:
+                        self.stats["over_limit_escalations"] += 1
+                    self.windows[alert.key].notified += 1
+                    decision.new_alerts.append(alert)
+                else:
+                    decision.suppressed.append(alert)
+            decision.notify = bool(decision.new_alerts)
+            if decision.notify:
+                decision.digest, self._digest = self._digest, []
+            self.stats["offered"] += len(alerts)
+            self.stats["notified"] += len(decision.new_alerts)
+            self.stats["suppressed"] += len(decision.suppressed)
+            return decision
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Summaries of closed windows with suppressed alerts, for a periodic digest; clears them."""
+        with self._lock:
+            self._close_expired(self.clock())
+            digest, self._digest = self._digest, []
+            return digest
+
+    def start_digest_flush(
+        self, sink: Optional[Callable[[List[Dict[str, Any]]], Any]] = None, interval: Optional[float] = None
+    ) -> None:
+        """Hand flush()'s digest to sink every interval seconds (default window_s) on a daemon thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            sink = sink or _print_digest
+            interval = interval or self.window_s
+            stop = self._stop = threading.Event()
+
+            def run() -> None:
+                while not stop.wait(interval):
+                    try:
+                        digest = self.flush()
+                        if digest:
+                            sink(digest)
+                    except Exception as e:
+                        print(f"⚠️ Alert digest flush failed: {e}")
+
+            self._thread = threading.Thread(target=run, name="alert-digest-flush", daemon=True)
+            self._thread.start()
+
+    def stop_digest_flush(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread started by start_digest_flush(), if any; start_digest_flush() may be called again."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join(timeout)
+
+
+def _print_digest(digest: List[Dict[str, Any]]) -> None:
+    print(f"🧾 Coalesced alerts: {compact_json(digest)}", flush=True)
+
+
+alert_coalescer = AlertCoalescer()
+
+
+def only_new_alerts(context: Dict[str, Any], state: Any) -> Dict[str, Any]:
+    """
+    The notifier's projection with fixer_summary cut down to the tasks coalescing let through.
+
+    coalesce_notifications stores those task ids under alert_task_ids; when
+    it is absent (coalescing off) the projection is left as it is.
+    """
+    task_ids = state.get("alert_task_ids")
+    fixer_summary = context.get("fixer_summary")
+    if task_ids is None or not fixer_summary:
+        return context
+    keep = set(task_ids)
+    fixer_summary = dict(fixer_summary)
+    for tasks in ("safe_to_execute_tasks", "escalation_required"):
+        if tasks in fixer_summary:
+            fixer_summary[tasks] = [task for task in fixer_summary[tasks] if task.get("task_id") in keep]
+    counts = dict(fixer_summary.get("summary") or {})
+    if counts:
+        counts["tasks_safe_to_execute"] = len(fixer_summary.get("safe_to_execute_tasks", []))
+        counts["tasks_escalated"] = len(fixer_summary.get("escalation_required", []))
+        fixer_summary["summary"] = counts
+    return {**context, "fixer_summary": fixer_summary}
+
+
+# --- ADK callback ---
+def coalesce_notifications(callback_context) -> Optional[types.Content]:
+    """
+    Skip the notifier (and its model call) when every alert it would send is already covered.
+
+    Runs before the notifier agent. When the fixer summary only repeats
+    alerts whose window is still open, it answers with a one-line note
+    instead; otherwise it stores the ids of the tasks to notify about under
+    alert_task_ids (only_new_alerts narrows the notifier's input to them)
+    and the digest of closed windows under alert_digest for the notifier's
+    summary of recent incidents.
+    """
+    if not ALERT_COALESCING_ENABLED:
+        return None
+    # Started here rather than at import, so only a process that notifies runs the thread
+    alert_coalescer.start_digest_flush()
+    state = callback_context.state
+    alerts = alerts_from_state(state)
+    if not alerts:
+        if state.get("alert_task_ids") is not None:
+            state["alert_task_ids"] = None
+        return None
+    decision = alert_coalescer.offer(alerts)
+    if decision.notify:
+        state["alert_task_ids"] = [alert.task_id for alert in decision.new_alerts]
+        state["alert_digest"] = decision.digest
+        return None
+    keys = sorted({" / ".join(str(part) for part in alert.key if part) for alert in decision.suppressed})
+    return types.Content(
+        role="model",
+        parts=[
+            types.Part(
+                text=f"🔕 {len(decision.suppressed)} alert(s) coalesced into open {alert_coalescer.window_s:.0f}s "
+                f"alert windows ({'; '.join(keys)}); their summary goes out once the windows close."
+            )
+        ],
+    )
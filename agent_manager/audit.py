@@ -0,0 +1,191 @@
+# audit.py
+
+import atexit
+import datetime
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from .config import (
+    AUDIT_BATCH_SIZE,
+    AUDIT_ENABLED,
+    AUDIT_FLUSH_INTERVAL_SECONDS,
+    AUDIT_QUEUE_SIZE,
+)
+from .database import get_data_engine
+from .models import AuditLog
+
+
+class AuditLogWriter:
+    """
+    Buffers audit events in a bounded queue and bulk-inserts them from a background thread.
+
+    record() never blocks and never touches the database: when the queue is full
+    the event is dropped and counted, so auditing adds no latency to agent turns.
+    The writer drains up to batch_size events per INSERT (executemany), flushing
+    every flush_interval seconds, or immediately while the queue is backed up.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        max_queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+    ):
+        self._engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self.stats = {"enqueued": 0, "dropped": 0, "written": 0, "failed_batches": 0}
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_data_engine()
+        return self._engine
+
+    def record(
+        self,
+        event_type: str,
+        agent_name: str,
+        tool_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Queue an audit event; returns False if it was dropped because the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(
+                {
+                    "event_type": event_type,
+                    "agent_name": agent_name,
+                    "tool_name": tool_name,
+                    "user_id": user_id,
+                    "details": details or {},
+                    "timestamp": datetime.datetime.utcnow(),
+                }
+            )
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Write everything currently queued (blocking); used on shutdown and in tests."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background thread after writing the remaining events."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            # Sleep until the flush interval elapses or record() signals a full batch
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(AuditLog), batch)
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            print(f"⚠️ Failed to write {len(batch)} audit events: {e}")
+
+
+audit_writer = AuditLogWriter()
+atexit.register(audit_writer.stop)
+
+
+def _user_id(callback_context: Any) -> Optional[str]:
+    invocation_context = getattr(callback_context, "_invocation_context", None)
+    return getattr(invocation_context, "user_id", None)
+
+
+def _payload_size(value: Any) -> int:
+    # len() only: serialising large tool results here would cost hot-path time
+    return len(value) if isinstance(value, (str, bytes, list, dict)) else 0
+
+
+# --- ADK callbacks ---
+def audit_before_agent(callback_context) -> None:
+    """Record an agent invocation."""
+    if AUDIT_ENABLED:
+        audit_writer.record(
+            "agent_invocation",
+            callback_context.agent_name,
+            user_id=_user_id(callback_context),
+            details={"invocation_id": callback_context.invocation_id},
+        )
+
+
+def audit_before_tool(tool, args: Dict[str, Any], tool_context) -> None:
+    """Record a tool call with its arguments."""
+    if AUDIT_ENABLED:
+        audit_writer.record(
+            "tool_call",
+            tool_context.agent_name,
+            tool_name=tool.name,
+            user_id=_user_id(tool_context),
+            details={"invocation_id": tool_context.invocation_id, "args": args},
+        )
+
+
+def audit_after_tool(tool, args: Dict[str, Any], tool_context, tool_response: Any) -> None:
+    """Record a tool result (length only, results can be large)."""
+    if AUDIT_ENABLED:
+        audit_writer.record(
+            "tool_result",
+            tool_context.agent_name,
+            tool_name=tool.name,
+            user_id=_user_id(tool_context),
+            details={
+                "invocation_id": tool_context.invocation_id,
+                "response_size": _payload_size(tool_response),
+            },
+        )
@@ -0,0 +1,195 @@
+# batch.py
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from google.adk.agents import SequentialAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService, Session
+from google.genai import types
+
+from .config import BATCH_CONCURRENCY, BATCH_INCIDENT_TIMEOUT_SECONDS
+from .sub_agents import build_sub_agents
+from .tool_dedup import ToolCallDeduplicator, active_deduplicator
+
+BATCH_APP_NAME = "agent_manager_batch"
+BATCH_USER_ID = "batch"
+TRIAGE_CHAIN = ("detector", "planner", "action_recommender")
+# State keys the triage chain's agents write (see schemas.OUTPUT_SCHEMAS)
+TRIAGE_OUTPUT_KEYS = ("detector_summary", "plan", "recommendations")
+
+
+@dataclass
+class IncidentRequest:
+    """One incident to triage, typically a failing chaos experiment."""
+
+    incident_id: str
+    message: Optional[str] = None
+    experiment_id: Optional[str] = None
+    state: Dict[str, Any] = field(default_factory=dict)
+
+    def prompt(self) -> str:
+        if self.message:
+            return self.message
+        target = f"experiment {self.experiment_id}" if self.experiment_id else f"incident {self.incident_id}"
+        return f"Analyze the chaos logs for {target}, then plan the response and recommend actions."
+
+
+@dataclass
+class IncidentResult:
+    incident_id: str
+    status: str  # 'completed', 'timeout' or 'failed'
+    duration_s: float
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    final_response: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def build_triage_pipeline(names: Iterable[str] = TRIAGE_CHAIN) -> SequentialAgent:
+    """Detector -> planner -> recommender, built fresh so it does not steal root_agent's sub-agents."""
+    return SequentialAgent(name="incident_triage", sub_agents=build_sub_agents(list(names)))
+
+
+class BatchTriageRunner:
+    """
+    Runs the triage chain for many incidents concurrently.
+
+    Each incident gets its own in-memory session and runs under a semaphore
+    and its own timeout. Tool calls with identical arguments (the shared
+    aggregate queries) execute once per batch. Results are yielded as
+    incidents finish, not in input order.
+    """
+
+    def __init__(
+        self,
+        agent: Optional[Any] = None,
+        concurrency: int = BATCH_CONCURRENCY,
+        incident_timeout: float = BATCH_INCIDENT_TIMEOUT_SECONDS,
+        deduplicate_tools: bool = True,
+    ):
+        self.agent = agent or build_triage_pipeline()
+        self.concurrency = concurrency
+        self.incident_timeout = incident_timeout
+        self.deduplicate_tools = deduplicate_tools
+        self.session_service = InMemorySessionService()
+        self.runner = Runner(
+            agent=self.agent, app_name=BATCH_APP_NAME, session_service=self.session_service
+        )
+        self.deduplicator: Optional[ToolCallDeduplicator] = None
+
+    async def _run_incident(self, incident: IncidentRequest, session: Session) -> IncidentResult:
+        user_id = session.user_id
+        final_response = None
+        async for event in self.runner.run_async(
+            user_id=user_id,
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=incident.prompt())]),
+        ):
+            if event.is_final_response() and event.content and event.content.parts:
+                final_response = "".join(part.text or "" for part in event.content.parts)
+
+        session = await self.session_service.get_session(
+            app_name=BATCH_APP_NAME, user_id=user_id, session_id=session.id
+        )
+        outputs = {key: session.state[key] for key in TRIAGE_OUTPUT_KEYS if key in session.state}
+        return IncidentResult(
+            incident_id=incident.incident_id,
+            status="completed",
+            duration_s=0.0,
+            outputs=outputs,
+            final_response=final_response,
+        )
+
+    async def _guarded(self, incident: IncidentRequest, semaphore: asyncio.Semaphore) -> IncidentResult:
+        # Each task runs in its own context copy, so this only affects this incident's run
+        active_deduplicator.set(self.deduplicator)
+        async with semaphore:
+            started = time.perf_counter()
+            session = await self.session_service.create_session(
+                app_name=BATCH_APP_NAME,
+                user_id=BATCH_USER_ID,
+                state={"incident_id": incident.incident_id, "experiment_id": incident.experiment_id, **incident.state},
+            )
+            try:
+                result = await asyncio.wait_for(
+                    self._run_incident(incident, session), timeout=self.incident_timeout
+                )
+            except asyncio.TimeoutError:
+                result = IncidentResult(
+                    incident_id=incident.incident_id,
+                    status="timeout",
+                    duration_s=0.0,
+                    error=f"Timed out after {self.incident_timeout:.0f}s",
+                )
+            except Exception as e:
+                result = IncidentResult(
+                    incident_id=incident.incident_id, status="failed", duration_s=0.0, error=str(e)
+                )
+            finally:
+                if self.deduplicator is not None:
+                    self.deduplicator.release(session.id)
+            result.duration_s = time.perf_counter() - started
+            return result
+
+    async def run(self, incidents: Iterable[IncidentRequest]) -> AsyncIterator[IncidentResult]:
+        """Triage incidents concurrently, yielding each result as soon as it is ready."""
+        self.deduplicator = ToolCallDeduplicator() if self.deduplicate_tools else None
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._guarded(incident, semaphore)) for incident in incidents]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def triage_incidents(
+    incidents: Iterable[IncidentRequest], **runner_kwargs: Any
+) -> List[IncidentResult]:
+    """Run a batch and collect every result (in completion order)."""
+    runner = BatchTriageRunner(**runner_kwargs)
+    return [result async for result in runner.run(incidents)]
+
+
+def triage_incidents_sync(incidents: Iterable[IncidentRequest], **runner_kwargs: Any) -> List[IncidentResult]:
+    """Sync wrapper for triage_incidents."""
+    return asyncio.run(triage_incidents(incidents, **runner_kwargs))
+
+
+def load_incidents(path: str) -> List[IncidentRequest]:
+    """Read incidents from a JSON list: experiment id strings or IncidentRequest-shaped objects."""
+    with open(path) as f:
+        raw = json.load(f)
+    incidents = []
+    for item in raw:
+        if isinstance(item, str):
+            item = {"experiment_id": item}
+        item.setdefault("incident_id", item.get("experiment_id") or uuid.uuid4().hex[:8])
+        incidents.append(IncidentRequest(**item))
+    return incidents
+
+
+async def _main(args: argparse.Namespace) -> None:
+    runner = BatchTriageRunner(concurrency=args.concurrency, incident_timeout=args.timeout)
+    async for result in runner.run(load_incidents(args.incidents)):
+        print(json.dumps(result.to_dict(), separators=(",", ":"), default=str), flush=True)
+    if runner.deduplicator is not None:
+        print(f"tool calls: {runner.deduplicator.stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Triage many incidents concurrently; prints one JSON line per incident as it completes.")
+    parser.add_argument("incidents", help="JSON file with a list of experiment ids or incident objects")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=BATCH_INCIDENT_TIMEOUT_SECONDS)
+    asyncio.run(_main(parser.parse_args()))
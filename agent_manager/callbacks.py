@@ -0,0 +1,39 @@
+# callbacks.py
+
+from typing import Any, Callable, Dict, List
+
+from .audit import audit_after_tool, audit_before_agent, audit_before_tool
+from .compaction import compactor
+from .response_cache import response_cache
+from .schemas import store_structured_output, strip_upstream_replies
+from .telemetry import instrumentation
+from .tool_dedup import dedup_after_tool, dedup_before_tool
+
+
+def agent_callbacks() -> Dict[str, List[Callable[..., Any]]]:
+    """
+    Keyword arguments that attach the shared ADK callbacks to an Agent.
+
+    Every agent in the chain is built with Agent(..., **agent_callbacks()) so
+    cross-cutting hooks are wired in one place. ADK stops at the first callback
+    returning a value, so observers that only record come first. Upstream
+    replies are stripped (consumers get their contract projection instead) and
+    compaction rewrites the request before anything keys on or measures it. The response
+    cache is the exception: on a hit it short-circuits the model call and none
+    of the model callbacks after it run. The batch tool deduplicator also
+    short-circuits, answering repeated tool calls from shared results, but it
+    comes last so the observers still see every call.
+    """
+    return {
+        "before_agent_callback": [instrumentation.before_agent, audit_before_agent],
+        "after_agent_callback": [instrumentation.after_agent, store_structured_output],
+        "before_model_callback": [
+            strip_upstream_replies,
+            compactor.before_model,
+            response_cache.before_model,
+            instrumentation.before_model,
+        ],
+        "after_model_callback": [instrumentation.after_model, response_cache.after_model],
+        "before_tool_callback": [instrumentation.before_tool, audit_before_tool, dedup_before_tool],
+        "after_tool_callback": [instrumentation.after_tool, audit_after_tool, dedup_after_tool],
+    }
@@ -0,0 +1,185 @@
+# compaction.py
+
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List
+
+from google.genai import types
+from prometheus_client import Histogram
+
+from .config import (
+    COMPACTION_KEEP_RECENT,
+    COMPACTION_SUMMARY_CHARS,
+    COMPACTION_TOKEN_BUDGET,
+)
+from .schemas import compact_json
+
+# Upstream outputs that must reach the model verbatim however much history is compacted
+PRESERVED_STATE_KEYS = ("detector_summary", "fixer_summary")
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """Rough prompt size: ~4 characters per token over text, call arguments and tool results."""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call is not None:
+                chars += len(compact_json(part.function_call.args or {}))
+            elif part.function_response is not None:
+                chars += len(compact_json(part.function_response.response or {}))
+    return chars // CHARS_PER_TOKEN
+
+
+def summarize_value(value: Any, max_chars: int = COMPACTION_SUMMARY_CHARS) -> Dict[str, Any]:
+    """Small structural stand-in for a large tool result: its shape plus a truncated preview."""
+    if isinstance(value, dict) and set(value) == {"result"}:
+        value = value["result"]
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {"compacted": True, "chars": len(value), "preview": value[:max_chars]}
+    summary: Dict[str, Any] = {"compacted": True}
+    if isinstance(value, list):
+        summary["rows"] = len(value)
+    elif isinstance(value, dict):
+        summary["keys"] = list(value)[:20]
+    text = compact_json(value)
+    summary["chars"] = len(text)
+    summary["preview"] = text[:max_chars]
+    return summary
+
+
+@dataclass
+class CompactionRecord:
+    agent_name: str
+    invocation_id: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class ContextCompactor:
+    """
+    Keeps each model request's history under a token budget.
+
+    Runs as a before_model callback. When the estimated prompt exceeds
+    token_budget, contents older than the last keep_recent are compacted in
+    order of cost: tool results are replaced by summaries, then call
+    arguments, then old text-only model turns are dropped, stopping as soon
+    as the request fits. User turns are never dropped, so the task survives
+    even when the budget cannot be met. Function call/response pairs are kept in place (only their
+    payloads shrink) so the provider still sees a well-formed tool exchange.
+    The latest detector_summary and fixer_summary are appended to the system
+    instruction verbatim.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = COMPACTION_TOKEN_BUDGET,
+        keep_recent: int = COMPACTION_KEEP_RECENT,
+        summary_chars: int = COMPACTION_SUMMARY_CHARS,
+        max_records: int = 1000,
+        registry: Any = None,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.records: Deque[CompactionRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        kwargs = {"registry": registry} if registry is not None else {}
+        self.tokens_saved = Histogram(
+            "chaospilot_compaction_tokens_saved",
+            "Estimated prompt tokens removed by context compaction per model call.",
+            ["agent"],
+            buckets=(256, 1024, 4096, 16384, 65536, 262144),
+            **kwargs,
+        )
+
+    def compact(self, contents: List[types.Content]) -> List[types.Content]:
+        """Return contents compacted to the budget (unchanged if already under it)."""
+        if estimate_tokens(contents) <= self.token_budget:
+            return contents
+        cutoff = max(len(contents) - self.keep_recent, 0)
+        old = [content.model_copy(deep=True) for content in contents[:cutoff]]
+        recent = contents[cutoff:]
+
+        def over_budget() -> bool:
+            return estimate_tokens(old) + estimate_tokens(recent) > self.token_budget
+
+        # 1. Tool results, oldest first
+        for content in old:
+            for part in content.parts or []:
+                response = part.function_response
+                if response is not None and not (response.response or {}).get("compacted"):
+                    response.response = summarize_value(response.response, self.summary_chars)
+            if not over_budget():
+                return old + recent
+
+        # 2. Tool call arguments
+        for content in old:
+            for part in content.parts or []:
+                call = part.function_call
+                if call is not None and call.args and len(compact_json(call.args)) > self.summary_chars:
+                    call.args = {"compacted": True, "preview": compact_json(call.args)[: self.summary_chars]}
+            if not over_budget():
+                return old + recent
+
+        # 3. Whole text-only model turns, oldest first; user turns (the task itself) and
+        # tool exchanges are never dropped, so the request still opens with the user's question
+        for content in list(old):
+            if not over_budget():
+                break
+            if content.role == "model" and content.parts and all(part.text is not None for part in content.parts):
+                old.remove(content)
+        return old + recent
+
+    @staticmethod
+    def _preserve_state(llm_request, state: Any) -> None:
+        preserved = {key: state.get(key) for key in PRESERVED_STATE_KEYS if state.get(key)}
+        if not preserved:
+            return
+        block = "Latest upstream results (verbatim):\n" + compact_json(preserved)
+        llm_request.append_instructions([block])
+
+    # --- ADK callback ---
+    def before_model(self, callback_context, llm_request) -> None:
+        contents = llm_request.contents or []
+        tokens_before = estimate_tokens(contents)
+        if tokens_before <= self.token_budget:
+            return None
+        llm_request.contents = self.compact(contents)
+        self._preserve_state(llm_request, callback_context.state)
+        record = CompactionRecord(
+            agent_name=callback_context.agent_name,
+            invocation_id=callback_context.invocation_id,
+            tokens_before=tokens_before,
+            tokens_after=estimate_tokens(llm_request.contents),
+        )
+        with self._lock:
+            self.records.append(record)
+        self.tokens_saved.labels(record.agent_name).observe(record.tokens_saved)
+        return None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Compacted calls and tokens saved per agent."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            entry = totals.setdefault(record.agent_name, {"calls": 0, "tokens_saved": 0})
+            entry["calls"] += 1
+            entry["tokens_saved"] += record.tokens_saved
+        return totals
+
+
+compactor = ContextCompactor()
@@ -0,0 +1,142 @@
+# database.py
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from google.adk.sessions import DatabaseSessionService
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+from .config import (
+    DATA_DB_URL,
+    SESSION_DB_MAX_OVERFLOW,
+    SESSION_DB_POOL_RECYCLE,
+    SESSION_DB_POOL_SIZE,
+    SESSION_DB_URL,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
+
+# --- SQLite Tuning ---
+# WAL lets readers run alongside the single writer, and NORMAL sync is durable
+# across application crashes in WAL mode while skipping an fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "cache_size": -64000,  # ~64 MB page cache
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,  # 256 MB
+    "foreign_keys": "ON",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    """Apply SQLITE_PRAGMAS to every new pysqlite connection."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def is_sqlite_url(db_url: str) -> bool:
+    """Return True if the URL points at a SQLite database."""
+    return make_url(db_url).get_backend_name() == "sqlite"
+
+
+def ensure_sqlite_directory(db_url: str) -> None:
+    """Create the directory of a file-backed SQLite URL (SQLite creates the file, but not its directory)."""
+    if not is_sqlite_url(db_url):
+        return
+    database = make_url(db_url).database
+    if database and database != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+
+
+def engine_options(db_url: str) -> Dict[str, Any]:
+    """
+    Build create_engine keyword arguments for the given backend.
+
+    SQLite gets a connection timeout matching busy_timeout so writers wait for
+    the lock instead of failing; server databases get a bounded, pre-pinged pool.
+    """
+    if is_sqlite_url(db_url):
+        return {
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            }
+        }
+
+    return {
+        "pool_size": SESSION_DB_POOL_SIZE,
+        "max_overflow": SESSION_DB_MAX_OVERFLOW,
+        "pool_recycle": SESSION_DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def tune_engine(engine: Engine) -> Engine:
+    """Attach SQLite pragmas to an engine and recycle connections opened before tuning."""
+    if engine.dialect.name == "sqlite" and not event.contains(
+        engine, "connect", _apply_sqlite_pragmas
+    ):
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+        engine.dispose()
+    return engine
+
+
+def install_sqlite_tuning() -> None:
+    """
+    Apply SQLite pragmas to every engine in the process.
+
+    Used where the engine is created out of our reach, e.g. the session service
+    that get_fast_api_app builds from session_service_uri.
+    """
+    if not event.contains(Engine, "connect", _apply_sqlite_pragmas):
+        event.listen(Engine, "connect", _apply_sqlite_pragmas)
+
+
+def create_db_engine(db_url: str = SESSION_DB_URL) -> Engine:
+    """Create a SQLAlchemy engine tuned for the configured backend."""
+    ensure_sqlite_directory(db_url)
+    return tune_engine(create_engine(db_url, **engine_options(db_url)))
+
+
+_data_engine: Optional[Engine] = None
+# Background threads (feedback score refresh, audit writer) can ask for the engine while the
+# main thread is creating it; without the lock both run create_all and one fails
+_data_engine_lock = threading.Lock()
+
+
+def get_data_engine() -> Engine:
+    """Return the shared engine for application tables in models.py, creating them on first use."""
+    global _data_engine
+    if _data_engine is None:
+        with _data_engine_lock:
+            if _data_engine is None:
+                from .models import Base
+
+                engine = create_db_engine(DATA_DB_URL)
+                Base.metadata.create_all(engine)
+                _data_engine = engine
+    return _data_engine
+
+
+def create_session_service(db_url: str = SESSION_DB_URL) -> DatabaseSessionService:
+    """
+    Create the ADK session service for the configured backend.
+
+    DatabaseSessionService builds its own engine (and creates its tables) during
+    construction, so pragmas are attached afterwards and the pool is disposed to
+    make sure every pooled connection is opened with them.
+    """
+    ensure_sqlite_directory(db_url)
+    service = DatabaseSessionService(db_url=db_url, **engine_options(db_url))
+    tune_engine(service.db_engine)
+    return service
@@ -0,0 +1,194 @@
+# feedback_scores.py
+
+import datetime
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .config import (
+    FEEDBACK_HALF_LIFE_DAYS,
+    FEEDBACK_PRIOR_WEIGHT,
+    FEEDBACK_REFRESH_INTERVAL_SECONDS,
+)
+from .database import get_data_engine
+from .models import Feedback
+
+
+@dataclass
+class DecayedStats:
+    """Exponentially decayed sum of normalised effectiveness scores and their weight."""
+
+    score_sum: float = 0.0
+    weight: float = 0.0
+    updated_at: float = 0.0  # epoch seconds the sums are decayed to
+
+    def decay_to(self, timestamp: float, half_life_s: float) -> None:
+        if timestamp > self.updated_at:
+            factor = 0.5 ** ((timestamp - self.updated_at) / half_life_s)
+            self.score_sum *= factor
+            self.weight *= factor
+            self.updated_at = timestamp
+
+    def add(self, score: float, timestamp: float, half_life_s: float) -> None:
+        if timestamp < self.updated_at:
+            # Late arrival: decay the observation instead of the aggregate
+            factor = 0.5 ** ((self.updated_at - timestamp) / half_life_s)
+            self.score_sum += score * factor
+            self.weight += factor
+            return
+        self.decay_to(timestamp, half_life_s)
+        self.score_sum += score
+        self.weight += 1.0
+
+
+def _normalise(effectiveness_score: Optional[int]) -> Optional[float]:
+    """Map the 1-5 effectiveness scale onto 0-1."""
+    if effectiveness_score is None:
+        return None
+    return min(max((effectiveness_score - 1) / 4.0, 0.0), 1.0)
+
+
+def _feedback_actions(context: Optional[Dict]) -> Iterable[str]:
+    """Playbook action names a feedback row refers to."""
+    if not isinstance(context, dict):
+        return []
+    actions = context.get("actions") or context.get("recommended_actions") or []
+    if context.get("action"):
+        actions = list(actions) + [context["action"]]
+    return [a for a in actions if isinstance(a, str)]
+
+
+class FeedbackScoreTable:
+    """
+    Precomputed per-action and per-tool effectiveness from the Feedback table.
+
+    refresh() folds in only feedback rows newer than the last one seen, keeping
+    recency-decayed sums per key. Lookups are plain dict reads that combine
+    those sums with a prior (Bayesian average), so ranking never touches the
+    database: a lookup finding the tables older than refresh_interval starts
+    a one-off refresh on a daemon thread and answers from the current ones.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        half_life_days: float = FEEDBACK_HALF_LIFE_DAYS,
+        prior_weight: float = FEEDBACK_PRIOR_WEIGHT,
+        refresh_interval: float = FEEDBACK_REFRESH_INTERVAL_SECONDS,
+    ):
+        self._engine = engine
+        self.half_life_s = half_life_days * 86400
+        self.prior_weight = prior_weight
+        self.refresh_interval = refresh_interval
+        self._last_feedback_id = 0
+        self._action_stats: Dict[str, DecayedStats] = {}
+        self._tool_stats: Dict[str, DecayedStats] = {}
+        # Published snapshots: name -> (decayed score sum, decayed weight)
+        self._action_lookup: Dict[str, tuple] = {}
+        self._tool_lookup: Dict[str, tuple] = {}
+        self._refresh_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # time.monotonic() after which lookups trigger a refresh
+        self._stale_at = 0.0
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_data_engine()
+        return self._engine
+
+    def refresh(self, now: Optional[float] = None) -> int:
+        """Fold in new feedback rows and republish the lookup tables; returns rows applied."""
+        with self._refresh_lock:
+            query = (
+                select(
+                    Feedback.id,
+                    Feedback.timestamp,
+                    Feedback.effectiveness_score,
+                    Feedback.context_json,
+                    Feedback.tools_used,
+                )
+                .where(Feedback.id > self._last_feedback_id)
+                .where(Feedback.effectiveness_score.is_not(None))
+                .order_by(Feedback.id)
+            )
+            with Session(self.engine) as session:
+                rows = session.execute(query).all()
+
+            for row in rows:
+                self.apply(row.effectiveness_score, row.timestamp, row.context_json, row.tools_used)
+                self._last_feedback_id = row.id
+
+            self._publish(now if now is not None else datetime.datetime.utcnow().timestamp())
+            self._stale_at = time.monotonic() + self.refresh_interval
+            return len(rows)
+
+    def apply(
+        self,
+        effectiveness_score: Optional[int],
+        timestamp: Optional[datetime.datetime],
+        context: Optional[Dict],
+        tools_used: Optional[List[str]],
+    ) -> None:
+        """Fold a single feedback observation into the running statistics."""
+        score = _normalise(effectiveness_score)
+        if score is None:
+            return
+        ts = (timestamp or datetime.datetime.utcnow()).timestamp()
+        for action in _feedback_actions(context):
+            self._action_stats.setdefault(action, DecayedStats()).add(score, ts, self.half_life_s)
+        for tool in tools_used or []:
+            if isinstance(tool, str):
+                self._tool_stats.setdefault(tool, DecayedStats()).add(score, ts, self.half_life_s)
+
+    def _publish(self, now: float) -> None:
+        def snapshot(stats: Dict[str, DecayedStats]) -> Dict[str, tuple]:
+            for entry in stats.values():
+                entry.decay_to(now, self.half_life_s)
+            return {name: (entry.score_sum, entry.weight) for name, entry in stats.items()}
+
+        # Swap whole dicts so readers never see a half-built table
+        self._action_lookup = snapshot(self._action_stats)
+        self._tool_lookup = snapshot(self._tool_stats)
+
+    def _bayesian(self, entry: Optional[tuple], prior: float) -> float:
+        if entry is None:
+            return prior
+        score_sum, weight = entry
+        return (self.prior_weight * prior + score_sum) / (self.prior_weight + weight)
+
+    def action_score(self, action: str, prior: float = 0.5) -> float:
+        """Effectiveness estimate for a playbook action, shrunk towards prior."""
+        self._refresh_if_stale()
+        return self._bayesian(self._action_lookup.get(action), prior)
+
+    def tool_score(self, tool: str, prior: float = 0.5) -> float:
+        """Effectiveness estimate for a tool, shrunk towards prior."""
+        self._refresh_if_stale()
+        return self._bayesian(self._tool_lookup.get(tool), prior)
+
+    def _refresh_if_stale(self) -> None:
+        if time.monotonic() < self._stale_at:
+            return
+        with self._thread_lock:
+            if time.monotonic() < self._stale_at or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._background_refresh, name="feedback-score-refresh", daemon=True)
+            self._thread.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"⚠️ Feedback score refresh failed: {e}")
+            # Retry after an interval rather than on every lookup
+            self._stale_at = time.monotonic() + self.refresh_interval
+
+
+feedback_scores = FeedbackScoreTable()
@@ -0,0 +1,94 @@
+# incident_features.py
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+# Pattern categories of EnhancedLogDetector.patterns and severities of its severity_indicators
+PATTERN_CATEGORIES: Tuple[str, ...] = ("database_errors", "api_errors", "performance_issues", "security_events")
+SEVERITY_LEVELS: Tuple[str, ...] = ("critical", "high", "medium", "low")
+
+# Service -> message substrings that implicate it
+SERVICE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("api_gateway", ("api",)),
+    ("database", ("database", "sql")),
+    ("authentication", ("auth", "login")),
+    ("payment_processing", ("payment",)),
+)
+
+# Distinct messages kept as evidence per category; the counts cover every hit
+EVIDENCE_SAMPLE_SIZE = 20
+
+
+def _frozen(mapping: Dict[str, Any]) -> Mapping[str, Any]:
+    return MappingProxyType(mapping)
+
+
+@dataclass(frozen=True)
+class IncidentFeatures:
+    """
+    Everything the planner and the incident history read from a detector analysis, extracted in one pass.
+
+    Built with from_detector_data(), which walks patterns_found once; the
+    planner's classification, priority, impact, hypotheses and services,
+    and the similarity vector, are all derived from these fields.
+    """
+
+    pattern_count: int = 0
+    # Distinct pattern categories in order of first appearance
+    categories: Tuple[str, ...] = ()
+    category_counts: Mapping[str, int] = field(default_factory=lambda: _frozen({}))
+    severity_counts: Mapping[str, int] = field(default_factory=lambda: _frozen({}))
+    # Services implicated by any message, in order of first appearance
+    services: Tuple[str, ...] = ()
+    # Category -> first EVIDENCE_SAMPLE_SIZE distinct messages
+    evidence: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: _frozen({}))
+    anomaly_count: int = 0
+    correlation_count: int = 0
+
+    @classmethod
+    def from_detector_data(cls, detector_data: Dict) -> "IncidentFeatures":
+        analysis = detector_data.get("detailed_analysis", {})
+        patterns = analysis.get("patterns_found", [])
+        category_counts: Dict[str, int] = {}
+        severity_counts: Dict[str, int] = {}
+        evidence: Dict[str, list] = {}
+        services: Dict[str, None] = {}
+        seen_messages: Dict[Any, None] = {}
+        seen_evidence = set()
+
+        for pattern in patterns:
+            category = pattern.get("category", "")
+            category_counts[category] = category_counts.get(category, 0) + 1
+            severity = pattern.get("severity")
+            severity_counts[severity] = severity_counts.get(severity, 0) + 1
+            message = pattern.get("message")
+
+            # Keyword checks and evidence bookkeeping only run per distinct message
+            if message not in seen_messages:
+                seen_messages[message] = None
+                lowered = (message or "").lower()
+                for service, keywords in SERVICE_KEYWORDS:
+                    if service not in services and any(keyword in lowered for keyword in keywords):
+                        services[service] = None
+            samples = evidence.setdefault(category, [])
+            if len(samples) < EVIDENCE_SAMPLE_SIZE and (category, message) not in seen_evidence:
+                seen_evidence.add((category, message))
+                samples.append(message)
+
+        return cls(
+            pattern_count=len(patterns),
+            categories=tuple(category_counts),
+            category_counts=_frozen(category_counts),
+            severity_counts=_frozen(severity_counts),
+            services=tuple(services),
+            evidence=_frozen({category: tuple(samples) for category, samples in evidence.items()}),
+            anomaly_count=len(analysis.get("anomalies", [])),
+            correlation_count=len(analysis.get("correlations", [])),
+        )
+
+    def count(self, category: str) -> int:
+        return self.category_counts.get(category, 0)
+
+    def severity(self, level: str) -> int:
+        return self.severity_counts.get(level, 0)
@@ -0,0 +1,221 @@
+# incident_store.py
+
+import math
+import uuid
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .database import get_data_engine
+from .incident_features import PATTERN_CATEGORIES, SEVERITY_LEVELS, IncidentFeatures
+from .models import IncidentHistory
+
+# Order of the compact per-incident feature vector. Pattern categories match
+# EnhancedLogDetector.patterns, severities match its severity_indicators.
+FEATURE_NAMES = [
+    *PATTERN_CATEGORIES,
+    *(f"severity_{level}" for level in SEVERITY_LEVELS),
+    "anomalies",
+    "correlations",
+]
+
+
+def incident_features(detector_data: Union[Dict, IncidentFeatures]) -> List[float]:
+    """
+    Build the L2-normalised feature vector for a detector analysis (or its extracted features).
+
+    Counts are log-scaled so a 10k-hit incident still resembles a 100-hit one
+    with the same shape.
+    """
+    features = (
+        detector_data
+        if isinstance(detector_data, IncidentFeatures)
+        else IncidentFeatures.from_detector_data(detector_data)
+    )
+    counts = [
+        *(features.count(category) for category in PATTERN_CATEGORIES),
+        *(features.severity(level) for level in SEVERITY_LEVELS),
+        features.anomaly_count,
+        features.correlation_count,
+    ]
+
+    vector = [math.log1p(c) for c in counts]
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+def pack_vector(vector: Iterable[float]) -> bytes:
+    """Pack a feature vector as float32 bytes."""
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(data: Optional[bytes]) -> array:
+    """Unpack float32 bytes produced by pack_vector."""
+    vector = array("f")
+    if data:
+        vector.frombytes(data)
+    return vector
+
+
+def primary_region(detector_data: Dict) -> Optional[str]:
+    """Pick the region an incident is attributed to, if the detector reported one."""
+    if detector_data.get("region"):
+        return detector_data["region"]
+
+    by_region = detector_data.get("errors_grouped_by_region") or {}
+    if not by_region:
+        return None
+
+    def total(counts: Any) -> float:
+        return sum(counts.values()) if isinstance(counts, dict) else counts or 0
+
+    return max(by_region, key=lambda region: total(by_region[region]))
+
+
+class IncidentHistoryStore:
+    """Persists incidents with indexed attributes and answers similar-incident queries"""
+
+    def __init__(self, engine: Optional[Engine] = None, candidate_limit: int = 500):
+        self._engine = engine
+        self.candidate_limit = candidate_limit
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_data_engine()
+        return self._engine
+
+    def record_incident(
+        self,
+        incident_id: Optional[str],
+        incident_type: str,
+        priority: str,
+        detector_data: Dict,
+        summary: Dict,
+        agent_outputs: Optional[Dict] = None,
+        features: Optional[IncidentFeatures] = None,
+    ) -> str:
+        """Persist an incident and its feature vector (from features when given); returns the incident_id."""
+        incident_id = incident_id or f"INC-{uuid.uuid4().hex[:12]}"
+        row = IncidentHistory(
+            incident_id=incident_id,
+            incident_type=incident_type,
+            priority=priority,
+            region=primary_region(detector_data),
+            feature_vector=pack_vector(incident_features(features or detector_data)),
+            summary_json=summary,
+            agent_outputs_json=agent_outputs or {},
+            created_at=datetime.utcnow(),
+        )
+        with Session(self.engine) as session, session.begin():
+            session.add(row)
+        return incident_id
+
+    def record_resolution(self, incident_id: str, resolution: Dict) -> bool:
+        """Attach a resolution to a stored incident; returns False if it is unknown."""
+        with Session(self.engine) as session, session.begin():
+            result = session.execute(
+                update(IncidentHistory)
+                .where(IncidentHistory.incident_id == incident_id)
+                .values(resolution_json=resolution)
+            )
+        return result.rowcount > 0
+
+    def feature_vector(self, incident_id: str) -> Optional[List[float]]:
+        """The feature vector stored with an incident; None if it is unknown."""
+        with Session(self.engine) as session:
+            data = session.execute(
+                select(IncidentHistory.feature_vector).where(IncidentHistory.incident_id == incident_id)
+            ).scalar_one_or_none()
+        return None if data is None else list(unpack_vector(data))
+
+    def find_similar(
+        self,
+        incident_type: str,
+        detector_data: Optional[Dict] = None,
+        priority: Optional[str] = None,
+        region: Optional[str] = None,
+        limit: int = 5,
+        exclude_incident_id: Optional[str] = None,
+        features: Optional[IncidentFeatures] = None,
+        vector: Optional[Sequence[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most similar past incidents with their resolutions.
+
+        Candidates come from the (incident_type, priority, created_at) index,
+        newest first and capped at candidate_limit, so cost does not grow with
+        table size. Only the compact vectors are read for ranking; JSON blobs
+        are loaded for the final top `limit` rows. Pass features to skip
+        re-extracting them from detector_data, or a stored vector (see
+        feature_vector()). Without any detector features to compare there is
+        no meaningful ranking, so nothing is returned.
+        """
+        query_vector = list(vector) if vector is not None else incident_features(features or detector_data or {})
+        if not any(query_vector):
+            return []
+
+        candidates = select(
+            IncidentHistory.id,
+            IncidentHistory.incident_id,
+            IncidentHistory.priority,
+            IncidentHistory.region,
+            IncidentHistory.feature_vector,
+            IncidentHistory.created_at,
+        ).where(IncidentHistory.incident_type == incident_type)
+        if priority:
+            candidates = candidates.where(IncidentHistory.priority == priority)
+        if region:
+            candidates = candidates.where(IncidentHistory.region == region)
+        if exclude_incident_id:
+            candidates = candidates.where(IncidentHistory.incident_id != exclude_incident_id)
+        candidates = candidates.order_by(IncidentHistory.created_at.desc()).limit(
+            self.candidate_limit
+        )
+
+        with Session(self.engine) as session:
+            scored = []
+            for row in session.execute(candidates):
+                vector = unpack_vector(row.feature_vector)
+                similarity = sum(a * b for a, b in zip(query_vector, vector))
+                scored.append((similarity, row))
+
+            scored.sort(key=lambda item: item[0], reverse=True)
+            top = scored[:limit]
+            if not top:
+                return []
+
+            resolutions = dict(
+                session.execute(
+                    select(IncidentHistory.id, IncidentHistory.resolution_json).where(
+                        IncidentHistory.id.in_([row.id for _, row in top])
+                    )
+                ).all()
+            )
+
+        return [
+            {
+                "incident_id": row.incident_id,
+                "similarity": round(similarity, 4),
+                "priority": row.priority,
+                "region": row.region,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "resolution": resolutions.get(row.id),
+            }
+            for similarity, row in top
+        ]
+
+
+_default_store: Optional[IncidentHistoryStore] = None
+
+
+def get_incident_store() -> IncidentHistoryStore:
+    """Return the process-wide incident history store."""
+    global _default_store
+    if _default_store is None:
+        _default_store = IncidentHistoryStore()
+    return _default_store
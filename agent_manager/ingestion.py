@@ -0,0 +1,312 @@
+# ingestion.py
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import (
+    INGEST_BASELINE_HOURS,
+    INGEST_BATCH_SIZE,
+    INGEST_FILE_POLL_SECONDS,
+    INGEST_MAX_LATENCY_SECONDS,
+    INGEST_QUEUE_SIZE,
+)
+from .sub_agents.detector.agent import EnhancedLogDetector
+from .tools.heavy_hitters import HeavyHitters
+from .tools.log_batch import LogBatch
+from .tools.log_reader import decode_row
+from .tools.rollups import LogRollups
+from .tools.sketches import ImpactSketches
+
+# A source hands each decoded log row to put(), which blocks while the worker's queue is full
+Put = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class FileTailSource:
+    """
+    Follows an NDJSON file as it grows, like `tail -F`.
+
+    Starts at the end of the file unless from_start is set, and reopens it
+    from the beginning when it is truncated or replaced (log rotation).
+    A trailing partial line is held back until its newline arrives.
+    """
+
+    def __init__(self, path: str, from_start: bool = False, poll_interval: float = INGEST_FILE_POLL_SECONDS):
+        self.path = path
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+
+    async def produce(self, put: Put) -> None:
+        f = None
+        inode = None
+        pending = b""
+        # Only the file present at start-up is skipped to its end; a rotated-in file is read whole
+        seek_end = not self.from_start
+        try:
+            while True:
+                if f is None:
+                    try:
+                        f = open(self.path, "rb")
+                    except FileNotFoundError:
+                        await asyncio.sleep(self.poll_interval)
+                        continue
+                    inode = os.fstat(f.fileno()).st_ino
+                    if seek_end:
+                        f.seek(0, os.SEEK_END)
+                    seek_end = False
+                chunk = f.read(1 << 20)
+                if chunk:
+                    lines = (pending + chunk).split(b"\n")
+                    pending = lines.pop()
+                    for line in lines:
+                        row = decode_row(line)
+                        if row is not None:
+                            await put(row)
+                    continue
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    stat = os.stat(self.path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_ino != inode or stat.st_size < f.tell():
+                    f.close()
+                    f, pending = None, b""
+        finally:
+            if f is not None:
+                f.close()
+
+
+class UnixSocketSource:
+    """
+    Accepts NDJSON log streams on a Unix domain socket, one row per line.
+
+    Any number of writers may connect. A connection is only read while the
+    worker keeps up, so a full queue pushes back on writers through the
+    socket buffers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def produce(self, put: Put) -> None:
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                while line := await reader.readline():
+                    row = decode_row(line)
+                    if row is not None:
+                        await put(row)
+            finally:
+                writer.close()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(handle, path=self.path, limit=1 << 20)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+class QueueSource:
+    """In-process stand-in for a Pub/Sub subscription: producers call publish()."""
+
+    def __init__(self, maxsize: int = INGEST_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def publish(self, row: Dict[str, Any]) -> None:
+        await self.queue.put(row)
+
+    async def produce(self, put: Put) -> None:
+        while True:
+            await put(await self.queue.get())
+
+
+@dataclass
+class IngestionStats:
+    rows: int = 0
+    batches: int = 0
+    anomalies: int = 0
+    max_queue_depth: int = 0
+    # Seconds from a batch's first row being queued to its analysis finishing
+    last_batch_delay_s: float = 0.0
+    max_batch_delay_s: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class BatchResult:
+    """Detector output for one micro-batch."""
+
+    rows: int
+    first_queued_at: float
+    analysis: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def anomalies(self) -> List[Dict[str, Any]]:
+        return self.analysis.get("anomalies", [])
+
+
+class IngestionWorker:
+    """
+    Continuous detection over log events from one or more sources.
+
+    Sources push decoded rows into one bounded queue; when it is full they
+    block, so a slow detector throttles the sources instead of growing
+    memory. The consumer cuts micro-batches of up to batch_size rows, or
+    fewer once max_latency seconds have passed since the batch's first row,
+    encodes each as a LogBatch, runs EnhancedLogDetector on it off the event
+    loop and hands the result to on_batch. A micro-batch usually covers a
+    single hour, so the worker keeps per-hour error counts for the last
+    baseline_hours hours and the detector judges each batch's hours
+    against them rather than against the batch alone. Rows are also folded
+    into rollups, sketches and hitters, when given, so the aggregate, impact
+    and top-k error tools stay current.
+    """
+
+    def __init__(
+        self,
+        sources: List[Any],
+        detector: Optional[EnhancedLogDetector] = None,
+        rollups: Optional[LogRollups] = None,
+        sketches: Optional[ImpactSketches] = None,
+        hitters: Optional[HeavyHitters] = None,
+        on_batch: Optional[Callable[[BatchResult], Any]] = None,
+        batch_size: int = INGEST_BATCH_SIZE,
+        max_latency: float = INGEST_MAX_LATENCY_SECONDS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        baseline_hours: int = INGEST_BASELINE_HOURS,
+    ):
+        self.sources = sources
+        self.detector = detector or EnhancedLogDetector()
+        self.rollups = rollups
+        self.sketches = sketches
+        self.hitters = hitters
+        self.on_batch = on_batch
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.baseline_hours = baseline_hours
+        # Hour key -> error rows seen in earlier batches; only touched from the consumer
+        self.error_baseline: Counter = Counter()
+        self.stats = IngestionStats()
+
+    async def _put(self, row: Dict[str, Any]) -> None:
+        await self.queue.put((time.monotonic(), row))
+        depth = self.queue.qsize()
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+
+    async def _next_batch(self) -> Tuple[float, List[Dict[str, Any]]]:
+        """Block for one row, then take more until batch_size or the latency deadline."""
+        first_queued_at, row = await self.queue.get()
+        rows = [row]
+        deadline = first_queued_at + self.max_latency
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self.queue.get_nowait()[1])
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append((await asyncio.wait_for(self.queue.get(), remaining))[1])
+            except asyncio.TimeoutError:
+                break
+        return first_queued_at, rows
+
+    def _analyze(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.rollups is not None:
+            self.rollups.ingest(rows)
+        if self.sketches is not None:
+            self.sketches.ingest(rows)
+        if self.hitters is not None:
+            self.hitters.ingest(rows)
+        batch = LogBatch.from_rows(rows)
+        analysis = self.detector.analyze_log_patterns(batch, error_baseline=self.error_baseline)
+        self.error_baseline.update(self.detector.hourly_error_counts(batch))
+        if len(self.error_baseline) > self.baseline_hours:
+            # Hour keys sort chronologically; drop the oldest
+            for hour in sorted(self.error_baseline)[: -self.baseline_hours]:
+                del self.error_baseline[hour]
+        return analysis
+
+    async def _consume(self) -> None:
+        while True:
+            first_queued_at, rows = await self._next_batch()
+            analysis = await asyncio.to_thread(self._analyze, rows)
+            result = BatchResult(rows=len(rows), first_queued_at=first_queued_at, analysis=analysis)
+            delay = time.monotonic() - first_queued_at
+            self.stats.rows += len(rows)
+            self.stats.batches += 1
+            self.stats.anomalies += len(result.anomalies)
+            self.stats.last_batch_delay_s = delay
+            self.stats.max_batch_delay_s = max(self.stats.max_batch_delay_s, delay)
+            if self.on_batch is not None:
+                outcome = self.on_batch(result)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+
+    async def run(self) -> None:
+        """Run the sources and the consumer until cancelled (or a source fails)."""
+        tasks = [asyncio.create_task(source.produce(self._put)) for source in self.sources]
+        tasks.append(asyncio.create_task(self._consume()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _print_anomalies(result: BatchResult) -> None:
+    for anomaly in result.anomalies:
+        print(json.dumps(anomaly, separators=(",", ":"), default=str), flush=True)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    sources = [FileTailSource(path, from_start=args.from_start) for path in args.tail]
+    sources += [UnixSocketSource(path) for path in args.socket]
+    if not sources:
+        sys.exit("give at least one --tail file or --socket path")
+    worker = IngestionWorker(
+        sources,
+        rollups=LogRollups(),
+        sketches=ImpactSketches(),
+        hitters=HeavyHitters(),
+        on_batch=_print_anomalies,
+        batch_size=args.batch_size,
+        max_latency=args.max_latency,
+        queue_size=args.queue_size,
+    )
+    try:
+        await worker.run()
+    finally:
+        print(f"ingestion: {worker.stats.to_dict()}", file=sys.stderr)
+        print(f"impact: {json.dumps(worker.sketches.system_chaos_summary(), default=str)}", file=sys.stderr)
+        print(f"top errors: {json.dumps(worker.hitters.most_frequent_error_types(), default=str)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuously detect anomalies in streamed logs; prints one JSON line per anomaly.")
+    parser.add_argument("--tail", action="append", default=[], help="NDJSON file to follow (repeatable)")
+    parser.add_argument("--from-start", action="store_true", help="Read tailed files from the beginning")
+    parser.add_argument("--socket", action="append", default=[], help="Unix socket path to accept NDJSON on (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--max-latency", type=float, default=INGEST_MAX_LATENCY_SECONDS)
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
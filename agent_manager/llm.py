@@ -0,0 +1,326 @@
+# llm.py
+
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import AsyncGenerator, Callable, Deque, Dict, List, Optional, Union
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from .config import (
+    AGENT_MODEL_TIERS,
+    AZURE_OPENAI_MODEL_PATTERN,
+    FAST_MODEL,
+    GEMINI_MODEL_PATTERN,
+    MODEL,
+    ROUTING_CONFIDENCE_THRESHOLD,
+)
+from .schemas import parse_json_output
+
+# Label ADK puts on every model request with the calling agent's name
+AGENT_NAME_LABEL = "adk_agent_name"
+
+# --- Routing Policy ---
+# full: always the MODEL; fast: always the FAST_MODEL;
+# routed: FAST_MODEL first, escalating to MODEL on low confidence or ambiguity
+MODEL_ROUTING_POLICY: Dict[str, str] = {
+    "agent_manager": "routed",  # picks which sub-agent to transfer to
+    "notifier": "routed",  # formats upstream outputs into an alert
+    **AGENT_MODEL_TIERS,
+}
+
+# USD per 1K (prompt, completion) tokens, matched on the model name without provider prefix
+MODEL_PRICES_PER_1K: Dict[str, tuple] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4.1-nano": (0.0001, 0.0004),
+    "gpt-4.1-mini": (0.0004, 0.0016),
+    "gpt-4.1": (0.002, 0.008),
+    "gemini-2.0-flash-lite": (0.000075, 0.0003),
+    "gemini-2.0-flash": (0.0001, 0.0004),
+    "gemini-2.5-flash": (0.0003, 0.0025),
+    "gemini-2.5-pro": (0.00125, 0.01),
+}
+
+
+def create_model_client(model: str) -> BaseLlm:
+    """
+    Build the concrete model client for a model string.
+
+    Azure/OpenAI-style names go through LiteLlm (imported here because litellm
+    alone takes seconds to import); Gemini names use ADK's registry; fake/*
+    names give the local FakeLlm.
+    """
+    if model.startswith("fake/"):
+        return FakeLlm(model=model)
+    if re.findall(AZURE_OPENAI_MODEL_PATTERN, model) or "/" in model:
+        from google.adk.models.lite_llm import LiteLlm
+
+        return LiteLlm(model=model)
+    if re.findall(GEMINI_MODEL_PATTERN, model):
+        from google.adk.models.registry import LLMRegistry
+
+        return LLMRegistry.new_llm(model)
+    raise ValueError(f"Unsupported model format: {model}")
+
+
+def default_model_name() -> str:
+    """Model used by the agent chain, derived from the MODEL setting."""
+    if MODEL and "/" not in MODEL and re.findall(AZURE_OPENAI_MODEL_PATTERN, MODEL):
+        return "azure/gpt-4o"
+    return MODEL or ""
+
+
+def model_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a call; 0 for models without a price entry."""
+    name = model.rsplit("/", 1)[-1]
+    # Longest matching prefix, so gpt-4o-mini is not priced as gpt-4o
+    for prefix in sorted(MODEL_PRICES_PER_1K, key=len, reverse=True):
+        if name.startswith(prefix):
+            prompt_price, completion_price = MODEL_PRICES_PER_1K[prefix]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+    return 0.0
+
+
+# --- Ledger ---
+@dataclass
+class ModelCall:
+    """One model request made on behalf of an agent."""
+
+    agent_name: str
+    model: str
+    tier: str
+    duration_s: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    escalated: bool = False
+
+
+class ModelLedger:
+    """Recent model calls with per-stage latency, token and cost totals."""
+
+    def __init__(self, max_calls: int = 10000):
+        self.calls: Deque[ModelCall] = deque(maxlen=max_calls)
+        self._lock = threading.Lock()
+
+    def record(self, call: ModelCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Totals per agent:model stage."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            calls = list(self.calls)
+        for call in calls:
+            entry = totals.setdefault(
+                f"{call.agent_name}:{call.model}",
+                {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                 "cost_usd": 0.0, "escalations": 0},
+            )
+            entry["calls"] += 1
+            entry["seconds"] += call.duration_s
+            entry["prompt_tokens"] += call.prompt_tokens
+            entry["completion_tokens"] += call.completion_tokens
+            entry["cost_usd"] += call.cost_usd
+            entry["escalations"] += int(call.escalated)
+        return totals
+
+    def to_dicts(self) -> List[Dict]:
+        with self._lock:
+            return [asdict(call) for call in self.calls]
+
+
+model_ledger = ModelLedger()
+
+
+def _agent_name(llm_request: LlmRequest) -> str:
+    labels = (llm_request.config.labels if llm_request.config else None) or {}
+    return labels.get(AGENT_NAME_LABEL, "")
+
+
+# --- Models ---
+class LazyLlm(BaseLlm):
+    """
+    Model that creates its client on the first request it serves.
+
+    Agents can be declared at import time without paying for the client
+    library import or failing on a missing MODEL until they are routed to.
+    Every completed request is recorded in model_ledger.
+    """
+
+    tier: str = "full"
+    _client: Optional[BaseLlm] = PrivateAttr(default=None)
+
+    @property
+    def client(self) -> BaseLlm:
+        if self._client is None:
+            self._client = create_model_client(self.model)
+        return self._client
+
+    def request_for(self, llm_request: LlmRequest) -> LlmRequest:
+        """The request addressed to this model; clients such as Gemini's call llm_request.model, not their own."""
+        if llm_request.model == self.model:
+            return llm_request
+        return llm_request.model_copy(update={"model": self.model})
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        async for response in self.client.generate_content_async(self.request_for(llm_request), stream):
+            if not response.partial:
+                self.record_call(llm_request, response, started)
+            yield response
+
+    def record_call(
+        self, llm_request: LlmRequest, response: LlmResponse, started: float, escalated: bool = False
+    ) -> None:
+        usage = response.usage_metadata
+        prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+        completion_tokens = (usage.candidates_token_count or 0) if usage else 0
+        model_ledger.record(
+            ModelCall(
+                agent_name=_agent_name(llm_request),
+                model=self.model,
+                tier=self.tier,
+                duration_s=time.perf_counter() - started,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost_usd=model_cost(self.model, prompt_tokens, completion_tokens),
+                escalated=escalated,
+            )
+        )
+
+
+def needs_escalation(response: LlmResponse, threshold: float = ROUTING_CONFIDENCE_THRESHOLD) -> bool:
+    """
+    Whether a fast-model reply should be redone by the full model.
+
+    Errors escalate. JSON replies escalate when they set `ambiguous` or a
+    top-level `confidence`/`confidence_score` below threshold. Function calls
+    and plain text (routing and formatting) are accepted as they are.
+    """
+    if response.error_code:
+        return True
+    parts = response.content.parts if response.content else None
+    if not parts:
+        return True
+    if any(part.function_call is not None for part in parts):
+        return False
+    text = "".join(part.text or "" for part in parts)
+    try:
+        reply = parse_json_output(text)
+    except ValueError:
+        return False
+    if not isinstance(reply, dict):
+        return False
+    if reply.get("ambiguous") is True:
+        return True
+    for key in ("confidence", "confidence_score"):
+        value = reply.get(key)
+        if isinstance(value, (int, float)) and value < threshold:
+            return True
+    return False
+
+
+class RoutedLlm(BaseLlm):
+    """
+    Tries fast_model first and escalates to model when the reply needs it.
+
+    The fast reply is buffered (streamed partials included) until it has been
+    checked, so callers only ever see one model's answer.
+    """
+
+    fast_model: str
+    confidence_threshold: float = ROUTING_CONFIDENCE_THRESHOLD
+    _fast: Optional[LazyLlm] = PrivateAttr(default=None)
+    _full: Optional[LazyLlm] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._fast = LazyLlm(model=self.fast_model, tier="fast")
+        self._full = LazyLlm(model=self.model, tier="full")
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        fast_request = self._fast.request_for(llm_request)
+        fast_responses = [r async for r in self._fast.client.generate_content_async(fast_request, stream)]
+        final = next((r for r in reversed(fast_responses) if not r.partial), None)
+        escalate = final is None or needs_escalation(final, self.confidence_threshold)
+        if final is not None:
+            self._fast.record_call(llm_request, final, started, escalated=escalate)
+        if not escalate:
+            for response in fast_responses:
+                yield response
+            return
+
+        async for response in self._full.generate_content_async(llm_request, stream):
+            yield response
+
+
+class FakeLlm(BaseLlm):
+    """
+    Local stand-in for a model, for tests and offline benchmarks.
+
+    Replies come from responder(llm_request), which may return text or an
+    LlmResponse; by default it returns a confident, unambiguous JSON echo of
+    the last user text. Token usage is estimated at ~4 characters per token.
+    """
+
+    responder: Optional[Callable[[LlmRequest], Union[str, LlmResponse]]] = None
+    latency_s: float = 0.0
+    requests: List[LlmRequest] = []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.requests.append(llm_request)
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        reply = self.responder(llm_request) if self.responder else self._echo(llm_request)
+        if isinstance(reply, str):
+            reply = LlmResponse(content=types.Content(role="model", parts=[types.Part(text=reply)]))
+        if reply.usage_metadata is None:
+            prompt_chars = sum(
+                len(part.text or "") for content in llm_request.contents for part in content.parts or []
+            )
+            completion_chars = sum(len(part.text or "") for part in (reply.content.parts if reply.content else []))
+            reply.usage_metadata = types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4, candidates_token_count=completion_chars // 4
+            )
+        yield reply
+
+    @staticmethod
+    def _echo(llm_request: LlmRequest) -> str:
+        last_text = ""
+        for content in llm_request.contents:
+            for part in content.parts or []:
+                if part.text:
+                    last_text = part.text
+        return json.dumps({"echo": last_text[:200], "confidence": 1.0, "ambiguous": False})
+
+
+def model_for_agent(agent_name: str) -> BaseLlm:
+    """Model an agent should use under MODEL_ROUTING_POLICY."""
+    full_model = default_model_name()
+    tier = MODEL_ROUTING_POLICY.get(agent_name, "full")
+    if not FAST_MODEL or tier == "full":
+        return LazyLlm(model=full_model)
+    if tier == "fast":
+        return LazyLlm(model=FAST_MODEL, tier="fast")
+    return RoutedLlm(model=full_model, fast_model=FAST_MODEL)
@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -42,9 +42,18 @@ class AuditLog(Base):
 
 class IncidentHistory(Base):
     __tablename__ = "incident_history"
+    __table_args__ = (
+        # Similarity lookups filter on type (and optionally priority) and read newest first
+        Index("ix_incident_history_type_created", "incident_type", "created_at"),
+        Index("ix_incident_history_type_priority_created", "incident_type", "priority", "created_at"),
+    )
     id = Column(Integer, primary_key=True)
     incident_id = Column(String, unique=True)
+    incident_type = Column(String, index=True)
+    priority = Column(String, index=True)
+    region = Column(String, index=True)
+    feature_vector = Column(LargeBinary)  # packed float32, see incident_store.FEATURE_NAMES
     summary_json = Column(JSON)
     resolution_json = Column(JSON)
     agent_outputs_json = Column(JSON)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
@@ -0,0 +1,256 @@
+# response_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+from .database import _apply_sqlite_pragmas
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    key TEXT PRIMARY KEY,
+    agent_name TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_response_cache_last_used ON llm_response_cache (last_used_at);
+"""
+
+
+# --- Key Construction ---
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _canonical_parts(contents: Any) -> list:
+    """
+    Reduce request contents to what determines the answer.
+
+    Function call ids are generated per call and would make every tool-using
+    turn a miss, so only names, arguments and responses are kept.
+    """
+    canonical = []
+    for content in contents or []:
+        parts = []
+        for part in content.parts or []:
+            if part.text is not None:
+                parts.append({"text": part.text.strip()})
+            elif part.function_call is not None:
+                parts.append({"call": part.function_call.name, "args": part.function_call.args})
+            elif part.function_response is not None:
+                parts.append(
+                    {"result": part.function_response.name, "response": part.function_response.response}
+                )
+        canonical.append({"role": content.role, "parts": parts})
+    return canonical
+
+
+def _instruction_text(llm_request: LlmRequest) -> str:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if instruction is None:
+        return ""
+    if isinstance(instruction, str):
+        return instruction
+    if isinstance(instruction, types.Content):
+        return "".join(part.text or "" for part in instruction.parts or [])
+    return str(instruction)
+
+
+def cache_key(agent_name: str, llm_request: LlmRequest) -> str:
+    """Key on agent, model, instruction hash, tool set and a digest of the conversation and tool results."""
+    instruction_hash = hashlib.sha256(_instruction_text(llm_request).encode()).hexdigest()
+    input_digest = hashlib.sha256(_canonical(_canonical_parts(llm_request.contents)).encode()).hexdigest()
+    return hashlib.sha256(
+        _canonical(
+            {
+                "agent": agent_name,
+                "model": llm_request.model,
+                "instruction": instruction_hash,
+                "tools": sorted(llm_request.tools_dict),
+                "input": input_digest,
+            }
+        ).encode()
+    ).hexdigest()
+
+
+def _cacheable_content(llm_response: LlmResponse) -> Optional[types.Content]:
+    """Content worth storing: complete, error-free, with function call ids stripped."""
+    if llm_response.partial or llm_response.error_code or not llm_response.content:
+        return None
+    content = llm_response.content.model_copy(deep=True)
+    for part in content.parts or []:
+        if part.function_call is not None:
+            # ADK assigns a fresh id to calls without one when the response is replayed
+            part.function_call.id = None
+    return content
+
+
+# --- Store ---
+class LlmResponseCache:
+    """
+    On-disk cache of final model responses, consulted through ADK model callbacks.
+
+    before_model() returns a stored response for an identical request (which
+    makes ADK skip the model call); after_model() stores fresh responses.
+    Entries expire after ttl seconds, and least-recently-used entries are
+    evicted once the stored responses exceed max_bytes.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL_SECONDS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # Keys of requests that missed, waiting for their response
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            _apply_sqlite_pragmas(conn, None)
+            conn.executescript(_SCHEMA)
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_response_cache"
+            ).fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[types.Content]:
+        now = now if now is not None else time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM llm_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl:
+                self._delete(key)
+                return None
+            self.conn.execute(
+                "UPDATE llm_response_cache SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+        return types.Content.model_validate_json(response)
+
+    def put(self, key: str, agent_name: str, content: types.Content, now: Optional[float] = None) -> None:
+        now = now if now is not None else time.time()
+        response = content.model_dump_json(exclude_none=True)
+        size = len(response)
+        with self._lock:
+            previous = self.conn.execute(
+                "SELECT size FROM llm_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, agent_name, response, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(now)
+
+    def _delete(self, key: str) -> None:
+        row = self.conn.execute(
+            "SELECT size FROM llm_response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones down to 90% of max_bytes."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = conn.execute(
+                "DELETE FROM llm_response_cache WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_response_cache"
+            ).fetchone()[0]
+            target = int(self.max_bytes * 0.9)
+            if self._total_bytes > target:
+                victims = []
+                excess = self._total_bytes - target
+                for key, size in conn.execute(
+                    "SELECT key, size FROM llm_response_cache ORDER BY last_used_at"
+                ):
+                    if excess <= 0:
+                        break
+                    victims.append((key,))
+                    excess -= size
+                    self._total_bytes -= size
+                conn.executemany("DELETE FROM llm_response_cache WHERE key = ?", victims)
+                removed += len(victims)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.stats["evictions"] += removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM llm_response_cache")
+            self._total_bytes = 0
+
+    # --- ADK callbacks ---
+    def before_model(self, callback_context, llm_request) -> Optional[LlmResponse]:
+        if not self.enabled:
+            return None
+        key = cache_key(callback_context.agent_name, llm_request)
+        try:
+            content = self.get(key)
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache lookup failed: {e}")
+            return None
+        if content is None:
+            self.stats["misses"] += 1
+            self._pending[(callback_context.invocation_id, callback_context.agent_name)] = key
+            return None
+        self.stats["hits"] += 1
+        return LlmResponse(content=content, custom_metadata={"cache_hit": True})
+
+    def after_model(self, callback_context, llm_response) -> None:
+        if not self.enabled or llm_response.partial:
+            return None
+        key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        content = _cacheable_content(llm_response) if key else None
+        if content is None:
+            return None
+        try:
+            self.put(key, callback_context.agent_name, content)
+            self.stats["stores"] += 1
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache store failed: {e}")
+        return None
+
+
+response_cache = LlmResponseCache()
@@ -0,0 +1,361 @@
+# schemas.py
+
+import json
+import re
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+
+class _Schema(BaseModel):
+    # Agents may add fields the contract does not know about; drop them rather than fail
+    model_config = ConfigDict(extra="ignore")
+
+
+# --- Detector ---
+class ErrorTypeCount(_Schema):
+    failure_type: str
+    count: int = 0
+    regions: List[str] = []
+
+
+class RecentError(_Schema):
+    experiment_id: Optional[str] = None
+    failure_type: Optional[str] = None
+    severity: Optional[str] = None
+    impact_level: Optional[str] = None
+    region: Optional[str] = None
+    timestamp: Optional[str] = None
+    confidence_score: Optional[float] = None
+    potential_root_cause: Optional[str] = None
+
+
+class TrendAnalysis(_Schema):
+    error_rate_change: Optional[str] = None
+    comparison_period: Optional[str] = None
+
+
+class DetectorSummary(_Schema):
+    """detector_summary: the detector agent's aggregate view of the logs."""
+
+    report_generated_at: Optional[str] = None
+    total_error_logs: int = 0
+    environments_considered: List[str] = []
+    errors_grouped_by_region: Dict[str, Dict[str, int]] = {}
+    errors_grouped_by_severity: Dict[str, int] = {}
+    most_frequent_error_types: List[ErrorTypeCount] = []
+    recent_errors: List[RecentError] = []
+    trend_analysis: Optional[TrendAnalysis] = None
+    ambiguous: bool = False
+    missing_fields: List[str] = []
+
+
+# --- Planner ---
+class IncidentSummary(_Schema):
+    incident_type: Optional[str] = None
+    priority: Optional[str] = None
+    impact_assessment: Dict[str, Any] = {}
+    root_cause_hypothesis: List[Dict[str, Any]] = []
+    affected_services: List[str] = []
+    business_impact: Dict[str, Any] = {}
+
+
+class PlanSteps(_Schema):
+    immediate_actions: List[str] = []
+    mitigation_steps: List[str] = []
+    prevention_measures: List[str] = []
+
+
+class AutomatedAction(_Schema):
+    action: str
+    description: Optional[str] = None
+    automation_level: Optional[str] = None
+    requires_approval: Optional[bool] = None
+
+
+class ResponsePlan(_Schema):
+    """plan: the planner agent's incident response plan."""
+
+    incident_id: Optional[str] = None
+    created_at: Optional[str] = None
+    incident_summary: IncidentSummary = IncidentSummary()
+    response_plan: PlanSteps = PlanSteps()
+    escalation_procedure: Dict[str, Any] = {}
+    communication_plan: Dict[str, Any] = {}
+    success_criteria: List[str] = []
+    automated_actions: List[AutomatedAction] = []
+    similar_incidents: List[Dict[str, Any]] = []
+
+
+# --- Action Recommender ---
+class RecommendedAction(_Schema):
+    action: str
+    description: Optional[str] = None
+    automation_level: Optional[str] = None
+    estimated_time: Optional[str] = None
+    risk_level: Optional[str] = None
+    success_rate: Optional[float] = None
+    effectiveness_score: Optional[float] = None
+    priority_score: Optional[int] = None
+    reasoning: Optional[str] = None
+
+    @field_validator("automation_level", "risk_level", mode="before")
+    @classmethod
+    def _enum_value(cls, value: Any) -> Any:
+        return value.value if isinstance(value, Enum) else value
+
+
+class ActionRecommendations(_Schema):
+    """recommendations: the action recommender agent's ranked actions."""
+
+    incident_analysis: Dict[str, Any] = {}
+    recommended_actions: List[RecommendedAction] = []
+    automation_context: Dict[str, Any] = {}
+    success_probability: Optional[float] = None
+    estimated_resolution_time: Optional[str] = None
+    risk_assessment: Dict[str, Any] = {}
+    past_resolutions: List[Dict[str, Any]] = []
+
+
+# --- Fixer ---
+class SafeTask(_Schema):
+    task_id: str
+    description: Optional[str] = None
+    execution_mode: Optional[str] = None
+    justification: Optional[str] = None
+    expected_cost_impact: Optional[str] = None
+    cost_estimate_usd: Optional[float] = None
+    risk_level: Optional[str] = None
+    fallback_action: Optional[str] = None
+    monitoring_metrics: List[str] = []
+
+
+class EscalationTask(_Schema):
+    task_id: str
+    description: Optional[str] = None
+    reason: Optional[str] = None
+    recommended_escalation_team: Optional[str] = None
+    urgency: Optional[str] = None
+    risk_level: Optional[str] = None
+    ambiguity_detected: List[str] = []
+    missing_context_query: Optional[str] = None
+
+
+class FixCounts(_Schema):
+    total_tasks_analyzed: int = 0
+    tasks_safe_to_execute: int = 0
+    tasks_escalated: int = 0
+
+
+class FixerSummary(_Schema):
+    """fixer_summary: the fixer agent's execution review."""
+
+    fix_execution_reviewed_at: Optional[str] = None
+    source_actions_id: Optional[str] = None
+    safe_to_execute_tasks: List[SafeTask] = []
+    escalation_required: List[EscalationTask] = []
+    summary: FixCounts = FixCounts()
+    ambiguous: bool = False
+
+
+# --- Contracts ---
+# Session state key (the producing agent's output_key) -> schema
+OUTPUT_SCHEMAS: Dict[str, Type[_Schema]] = {
+    "detector_summary": DetectorSummary,
+    "plan": ResponsePlan,
+    "recommendations": ActionRecommendations,
+    "fixer_summary": FixerSummary,
+}
+
+# Producing agent -> its output_key
+OUTPUT_KEYS: Dict[str, str] = {
+    "detector": "detector_summary",
+    "planner": "plan",
+    "action_recommender": "recommendations",
+    "fixer": "fixer_summary",
+}
+
+# Consuming agent -> {state key: pydantic include spec}; only these fields reach its prompt
+PROJECTIONS: Dict[str, Dict[str, Any]] = {
+    "planner": {
+        "detector_summary": {
+            "total_error_logs": True,
+            "errors_grouped_by_region": True,
+            "errors_grouped_by_severity": True,
+            "most_frequent_error_types": True,
+            "recent_errors": True,
+            "trend_analysis": True,
+            "ambiguous": True,
+            "missing_fields": True,
+        },
+    },
+    "action_recommender": {
+        "detector_summary": {
+            "errors_grouped_by_severity": True,
+            "most_frequent_error_types": True,
+            "ambiguous": True,
+        },
+        "plan": {
+            "incident_id": True,
+            "incident_summary": {"incident_type", "priority", "root_cause_hypothesis", "affected_services"},
+            "response_plan": True,
+            "automated_actions": True,
+            "similar_incidents": True,
+        },
+    },
+    "fixer": {
+        "plan": {
+            "incident_id": True,
+            "incident_summary": {"incident_type", "priority", "affected_services"},
+        },
+        "recommendations": {
+            "recommended_actions": True,
+            "estimated_resolution_time": True,
+            "risk_assessment": True,
+        },
+    },
+    "notifier": {
+        "plan": {
+            "incident_id": True,
+            "created_at": True,
+            "incident_summary": {"incident_type", "priority", "affected_services"},
+            "communication_plan": True,
+        },
+        "fixer_summary": True,
+    },
+}
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+# ADK replays another agent's event as user content: "For context:", then "[author] said: ..." parts
+_FOREIGN_PREFIX = "For context:"
+_FOREIGN_AUTHOR = re.compile(r"^\[([^\]]+)\] ")
+
+
+def compact_json(value: Any) -> str:
+    """Serialise without indentation or padding; every byte here ends up as prompt tokens."""
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def parse_json_output(text: str) -> Any:
+    """Parse an agent's JSON reply, tolerating a surrounding ```json fence."""
+    return json.loads(_CODE_FENCE.sub("", text))
+
+
+def validate_output(state_key: str, value: Any) -> Dict[str, Any]:
+    """Validate an agent output (JSON text or dict) against its contract and return the compact dict."""
+    schema = OUTPUT_SCHEMAS[state_key]
+    if isinstance(value, str):
+        value = parse_json_output(value)
+    return schema.model_validate(value).model_dump(mode="json", exclude_none=True)
+
+
+def _prune(value: Any) -> Any:
+    """Drop empty lists and dicts; absent and empty mean the same to the model."""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v != [] and v != {}}
+    if isinstance(value, list):
+        return [_prune(v) for v in value]
+    return value
+
+
+def project_state(state: Any, consumer: str) -> Dict[str, Any]:
+    """Fields of the upstream outputs in state that the consumer agent needs."""
+    projected = {}
+    for state_key, include in PROJECTIONS.get(consumer, {}).items():
+        value = state.get(state_key)
+        if not value:
+            continue
+        try:
+            model = OUTPUT_SCHEMAS[state_key].model_validate(
+                parse_json_output(value) if isinstance(value, str) else value
+            )
+        except (ValueError, ValidationError):
+            continue
+        projected[state_key] = _prune(
+            model.model_dump(mode="json", include=None if include is True else include, exclude_none=True)
+        )
+    return projected
+
+
+def contract_instruction(
+    consumer: str,
+    instruction: str = "",
+    refine: Optional[Callable[[Dict[str, Any], Any], Dict[str, Any]]] = None,
+) -> Callable[[Any], str]:
+    """
+    Instruction provider that appends the consumer's projection of upstream outputs.
+
+    Downstream agents then work from a few hundred bytes of typed fields instead
+    of re-reading every upstream reply in full; strip_upstream_replies removes
+    those replies from the history so the projection replaces them. refine,
+    when given, gets the projection and the session state and returns the
+    projection to render.
+    """
+
+    def provider(readonly_context: Any) -> str:
+        context = project_state(readonly_context.state, consumer)
+        if refine is not None and context:
+            context = refine(context, readonly_context.state)
+        if not context:
+            return instruction
+        return (
+            f"{instruction}\n\nUpstream agent outputs (compact JSON, only the fields you need):\n"
+            f"{compact_json(context)}"
+        )
+
+    return provider
+
+
+def _foreign_author(content: Any) -> Optional[str]:
+    """The agent whose replayed event this content is, or None for user and own contents."""
+    parts = getattr(content, "parts", None) or []
+    if content.role != "user" or len(parts) < 2 or parts[0].text != _FOREIGN_PREFIX:
+        return None
+    match = _FOREIGN_AUTHOR.match(parts[1].text or "")
+    return match.group(1) if match else None
+
+
+# --- ADK callbacks ---
+def strip_upstream_replies(callback_context, llm_request) -> None:
+    """
+    Drop other contract agents' replies (and their tool calls) from a consumer's request.
+
+    The consumer's instruction already carries the projected fields it needs.
+    A reply is kept only when the consumer needs its output but the output
+    could not be projected (it did not match its contract), so nothing is
+    lost. User messages and the agent's own tool exchanges are untouched.
+    """
+    consumer = callback_context.agent_name
+    if consumer not in PROJECTIONS or not llm_request.contents:
+        return None
+    projected = project_state(callback_context.state, consumer)
+    unprojected = {key for key in PROJECTIONS[consumer] if key not in projected}
+    llm_request.contents = [
+        content
+        for content in llm_request.contents
+        if OUTPUT_KEYS.get(_foreign_author(content), "") in ("", *unprojected)
+    ]
+    return None
+
+
+def store_structured_output(callback_context) -> None:
+    """
+    Replace an agent's raw JSON reply in state with its validated compact form.
+
+    Runs after the agent finishes, once output_key has saved the reply text.
+    Replies that do not parse are left as text.
+    """
+    state_key = OUTPUT_KEYS.get(callback_context.agent_name)
+    if state_key not in OUTPUT_SCHEMAS:
+        return None
+    value = callback_context.state.get(state_key)
+    if not isinstance(value, str):
+        return None
+    try:
+        callback_context.state[state_key] = validate_output(state_key, value)
+    except (ValueError, ValidationError) as e:
+        print(f"⚠️ {callback_context.agent_name} output does not match the {state_key} contract: {e}")
+    return None
@@ -0,0 +1,30 @@
+# sub_agents
+
+import importlib
+from typing import Dict, Iterable, List, Optional
+
+from google.adk.agents import Agent
+
+# Agent name -> "module:factory"; modules are imported only when the agent is built
+SUB_AGENT_FACTORIES: Dict[str, str] = {
+    "detector": "agent_manager.sub_agents.detector.agent:build_detector_agent",
+    "planner": "agent_manager.sub_agents.planner.agent:build_planner_agent",
+    "action_recommender": "agent_manager.sub_agents.action_recommender.agent:build_action_recommender_agent",
+    "fixer": "agent_manager.sub_agents.fixer.agent:build_fixer_agent",
+    "notifier": "agent_manager.sub_agents.notifier.agent:build_notifier_agent",
+}
+
+
+def build_sub_agent(name: str) -> Agent:
+    """Build a fresh instance of a registered sub-agent."""
+    try:
+        target = SUB_AGENT_FACTORIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown sub-agent: {name}") from None
+    module_name, factory_name = target.split(":")
+    return getattr(importlib.import_module(module_name), factory_name)()
+
+
+def build_sub_agents(names: Optional[Iterable[str]] = None) -> List[Agent]:
+    """Build the named sub-agents (all of them by default) in workflow order."""
+    return [build_sub_agent(name) for name in (names or SUB_AGENT_FACTORIES)]
@@ -1,26 +1,37 @@
 # chaos_commander.py
 
-import os
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Union
 from enum import Enum
-from toolbox_core import ToolboxSyncClient
-from agent_manager.config import TOOLBOX_URL
+from agent_manager.callbacks import agent_callbacks
+from agent_manager.feedback_scores import feedback_scores
+from agent_manager.incident_store import get_incident_store
+from agent_manager.llm import model_for_agent
+from agent_manager.schemas import contract_instruction
+from agent_manager.toolsets import LazyToolboxToolset
+from agent_manager.tools.log_batch import LogBatch, stream_count_by
 
-from dotenv import load_dotenv
+from .executor import REMEDIATION_HANDLERS, ExecutionReport, RemediationExecutor
+from .scheduler import DEFAULT_ESTIMATED_TIME, RemediationSchedule, schedule_actions
 
 
-load_dotenv()
+# --- Agent: Action Recommender ---
+# Ranks remediation actions for the planned incident. Its reply is stored in session
+# state as `recommendations` and validated against schemas.ActionRecommendations.
+instruction = """
+You are the Action Recommender agent.
 
-toolbox = ToolboxSyncClient(TOOLBOX_URL)
-tools = toolbox.load_toolset("action_recommender_toolset")
+Your task is to recommend and rank remediation actions for the incident in the plan, using the
+detector findings and any similar past incidents.
 
+Output *only* JSON, compactly on a single line, with these top-level keys:
+`incident_analysis`, `recommended_actions` (each with `action`, `description`, `automation_level`,
+`estimated_time`, `risk_level` and `reasoning`), `success_probability`,
+`estimated_resolution_time` and `risk_assessment`.
 
-AZURE_API_KEY = os.getenv("AZURE_API_KEY")
-AZURE_API_BASE = os.getenv("AZURE_API_BASE")
-AZURE_API_VERSION = os.getenv("AZURE_API_VERSION")
+Do NOT invent data. Only use what is available from the tools, the schema and the upstream outputs.
+"""
 
 
 class ActionType(Enum):
@@ -204,10 +215,11 @@ class IntelligentActionRecommender:
         # Prioritize actions
         prioritized_actions = self._prioritize_actions(recommendations, priority)
 
-        # Add automation context
-        automation_context = self._create_automation_context(prioritized_actions)
+        # Schedule the actions as a dependency DAG, then add automation context
+        schedule = schedule_actions(prioritized_actions)
+        automation_context = self._create_automation_context(prioritized_actions, schedule)
 
-        return {
+        recommendation = {
             "incident_analysis": {
                 "type": incident_type,
                 "priority": priority,
@@ -218,11 +230,67 @@ class IntelligentActionRecommender:
             "success_probability": self._calculate_success_probability(
                 prioritized_actions
             ),
-            "estimated_resolution_time": self._estimate_resolution_time(
-                prioritized_actions
-            ),
+            "estimated_resolution_time": schedule.resolution_time,
             "risk_assessment": self._assess_action_risks(prioritized_actions),
         }
+        recommendation["past_resolutions"] = self._record_and_recall_resolutions(
+            planner_data, recommendation
+        )
+
+        return recommendation
+
+    async def execute_recommendations(self, recommendations: Dict, **options: Any) -> ExecutionReport:
+        """
+        Run the auto-executable steps of analyze_incident_for_actions() output with the registered handlers.
+
+        options go to RemediationExecutor (concurrency, action_timeout, levels, rollback_all...);
+        steps without a registered handler fail with "No handler for <action>".
+        """
+        handlers = {action: handler for action, handler in REMEDIATION_HANDLERS.items() if action is not None}
+        options.setdefault("default_handler", REMEDIATION_HANDLERS.get(None))
+        executor = RemediationExecutor(handlers=handlers, **options)
+        return await executor.run_recommendations(recommendations)
+
+    def _record_and_recall_resolutions(
+        self, planner_data: Dict, recommendation: Dict
+    ) -> List[Dict]:
+        """Store this recommendation as the incident's resolution and return past ones"""
+        incident_summary = planner_data.get("incident_summary", {})
+        incident_id = planner_data.get("incident_id")
+        try:
+            store = get_incident_store()
+            similar = planner_data.get("similar_incidents")
+            if similar is None:
+                # The planner's summary has no detector features; rank by the vector stored with the incident
+                vector = store.feature_vector(incident_id) if incident_id else None
+                similar = (
+                    store.find_similar(
+                        incident_summary.get("incident_type", ""),
+                        vector=vector,
+                        exclude_incident_id=incident_id,
+                    )
+                    if vector is not None
+                    else []
+                )
+
+            if planner_data.get("incident_id"):
+                store.record_resolution(
+                    planner_data["incident_id"],
+                    {
+                        "recommended_actions": [
+                            a.get("action") for a in recommendation["recommended_actions"]
+                        ],
+                        "success_probability": recommendation["success_probability"],
+                        "estimated_resolution_time": recommendation[
+                            "estimated_resolution_time"
+                        ],
+                    },
+                )
+        except Exception as e:
+            print(f"⚠️ Incident history unavailable: {e}")
+            return []
+
+        return [incident for incident in similar if incident.get("resolution")]
 
     def _find_matching_playbook(self, patterns: List[Dict], incident_type: str) -> Dict:
         """Find the best matching automation playbook"""
@@ -352,9 +420,12 @@ class IntelligentActionRecommender:
             elif action.get("automation_level") == ActionType.SEMI_AUTOMATED:
                 priority_score += 15
 
-            # Success rate bonus
-            success_rate = action.get("success_rate", 0.5)
-            priority_score += int(success_rate * 30)
+            # Effectiveness bonus: feedback-weighted, falling back to the playbook success rate
+            effectiveness = feedback_scores.action_score(
+                action.get("action", ""), prior=action.get("success_rate", 0.5)
+            )
+            action["effectiveness_score"] = round(effectiveness, 3)
+            priority_score += int(effectiveness * 30)
 
             # Time efficiency bonus
             estimated_time = action.get("estimated_time", "1_hour")
@@ -368,7 +439,9 @@ class IntelligentActionRecommender:
         # Sort by priority score
         return sorted(actions, key=lambda x: x.get("priority_score", 0), reverse=True)
 
-    def _create_automation_context(self, actions: List[Dict]) -> Dict[str, Any]:
+    def _create_automation_context(
+        self, actions: List[Dict], schedule: RemediationSchedule
+    ) -> Dict[str, Any]:
         """Create context for automated execution"""
         automated_actions = [
             a for a in actions if a.get("automation_level") == ActionType.AUTOMATED
@@ -381,23 +454,28 @@ class IntelligentActionRecommender:
             "can_auto_execute": len(automated_actions) > 0,
             "automated_actions_count": len(automated_actions),
             "semi_automated_count": len(semi_automated),
-            "execution_plan": self._create_execution_plan(actions),
+            "execution_plan": self._create_execution_plan(schedule),
+            "schedule": schedule.summary(),
             "rollback_strategy": self._create_rollback_strategy(actions),
             "monitoring_requirements": self._define_monitoring_requirements(actions),
         }
 
-    def _create_execution_plan(self, actions: List[Dict]) -> List[Dict]:
-        """Create detailed execution plan for actions"""
+    def _create_execution_plan(self, schedule: RemediationSchedule) -> List[Dict]:
+        """Create detailed execution plan for actions, in dependency order with their parallel wave"""
         execution_plan = []
 
-        for i, action in enumerate(actions):
+        for i, step in enumerate(schedule.steps):
+            action = step.action
             plan_step = {
                 "step_number": i + 1,
-                "action": action.get("action"),
+                "action": step.name,
                 "description": action.get("description"),
                 "automation_level": action.get("automation_level"),
-                "estimated_time": action.get("estimated_time", "30_minutes"),
-                "dependencies": self._identify_dependencies(action, actions),
+                "estimated_time": action.get("estimated_time", DEFAULT_ESTIMATED_TIME),
+                "dependencies": step.dependencies,
+                "wave": step.wave + 1,
+                "earliest_start_minutes": step.earliest_start,
+                "on_critical_path": step.critical,
                 "validation_steps": self._create_validation_steps(action),
                 "rollback_trigger": self._define_rollback_trigger(action),
             }
@@ -405,23 +483,6 @@ class IntelligentActionRecommender:
 
         return execution_plan
 
-    def _identify_dependencies(
-        self, action: Dict, all_actions: List[Dict]
-    ) -> List[str]:
-        """Identify dependencies between actions"""
-        dependencies = []
-        action_name = action.get("action", "")
-
-        # Define dependency rules
-        if "scale" in action_name:
-            dependencies.append("check_current_resources")
-        elif "restart" in action_name:
-            dependencies.append("backup_service_state")
-        elif "investigate" in action_name:
-            dependencies.append("collect_logs")
-
-        return dependencies
-
     def _create_validation_steps(self, action: Dict) -> List[str]:
         """Create validation steps for action execution"""
         action_name = action.get("action", "")
@@ -514,26 +575,6 @@ class IntelligentActionRecommender:
 
         return total_probability / len(actions)
 
-    def _estimate_resolution_time(self, actions: List[Dict]) -> str:
-        """Estimate total resolution time"""
-        total_minutes = 0
-
-        for action in actions:
-            estimated_time = action.get("estimated_time", "30_minutes")
-            if "minutes" in estimated_time:
-                minutes = int(estimated_time.split("_")[0])
-                total_minutes += minutes
-            elif "hour" in estimated_time:
-                hours = int(estimated_time.split("_")[0])
-                total_minutes += hours * 60
-
-        if total_minutes < 60:
-            return f"{total_minutes}_minutes"
-        else:
-            hours = total_minutes // 60
-            minutes = total_minutes % 60
-            return f"{hours}_hours_{minutes}_minutes"
-
     def _assess_action_risks(self, actions: List[Dict]) -> Dict[str, Any]:
         """Assess risks associated with recommended actions"""
         risk_factors = {
@@ -570,30 +611,37 @@ class IntelligentActionRecommender:
 
 
 # Enhanced action recommender agent
-action_recommender_agent = Agent(
-    name="action_recommender",
-    model=LiteLlm(model="azure/gpt-4o"),
-    description="Action recommender using only schema-compliant fields from BigQuery logs.",
-    tools=tools,
-)
-
-
-def recommend_actions_from_logs(logs: list) -> dict:
+def build_action_recommender_agent() -> Agent:
+    """Build the action recommender agent; its model client and toolset load on first use."""
+    return Agent(
+        name="action_recommender",
+        model=model_for_agent("action_recommender"),
+        output_key="recommendations",
+        description="Action recommender using only schema-compliant fields from BigQuery logs.",
+        instruction=contract_instruction("action_recommender", instruction),
+        tools=[LazyToolboxToolset("action_recommender_toolset")],
+        **agent_callbacks(),
+    )
+
+
+def recommend_actions_from_logs(logs: Union[LogBatch, Iterable[dict]]) -> dict:
     """
     Recommend actions based on most frequent error/critical messages and agent activity using only available schema fields.
+
+    logs may be a LogBatch or any iterable of rows (e.g. the rows of
+    successive *_page tool results). An iterable is consumed once, in
+    LogBatch chunks counted per distinct (agent, experiment, message,
+    severity) combination, so only one chunk is held in memory at a time.
     """
     action_counts = {}
-    for log in logs:
-        agent_id = log.get("agent_id")
-        experiment_id = log.get("experiment_id")
-        message = log.get("message")
-        severity = log.get("severity")
+    combinations = stream_count_by(logs, "agent_id", "experiment_id", "message", "severity")
+    for (agent_id, experiment_id, message, severity), count in combinations.items():
         if not agent_id or not experiment_id or not message:
             continue
         key = (agent_id, experiment_id, message)
         if key not in action_counts:
             action_counts[key] = {"count": 0, "severities": set()}
-        action_counts[key]["count"] += 1
+        action_counts[key]["count"] += count
         if severity:
             action_counts[key]["severities"].add(severity)
     # Convert sets to lists for JSON serialization
@@ -0,0 +1,285 @@
+# executor.py
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from agent_manager.config import (
+    REMEDIATION_ACTION_TIMEOUT_SECONDS,
+    REMEDIATION_CONCURRENCY,
+    REMEDIATION_ROLLBACK_TIMEOUT_SECONDS,
+)
+
+from .scheduler import automation_level, parse_minutes
+
+# Automation levels executed without a human; semi-automated steps need approval first
+AUTO_EXECUTE_LEVELS = frozenset({"automated"})
+
+
+class RemediationHandler:
+    """
+    Performs remediation actions against one kind of target (Kubernetes, a database, a CDN...).
+
+    Subclasses implement execute() and usually rollback(); validate() runs
+    once per validation step of the execution plan ("Verify service is
+    running") and should return False when the check fails. Raising from
+    any of them counts as a failure of that phase.
+    """
+
+    async def execute(self, step: Dict[str, Any]) -> Any:
+        raise NotImplementedError
+
+    async def validate(self, step: Dict[str, Any], check: str) -> bool:
+        return True
+
+    async def rollback(self, step: Dict[str, Any], rollback_action: str) -> None:
+        raise NotImplementedError
+
+
+class FakeServiceHandler(RemediationHandler):
+    """
+    In-memory stand-in for the services under remediation, for tests and benchmarks.
+
+    Each action takes its plan estimate scaled by seconds_per_minute, so
+    "30_minutes" runs in 0.3s at the default. Actions named in fail raise,
+    those in fail_validation fail their first check and those in hang never
+    finish. applied holds the actions currently in effect; calls records
+    every execute, validate and rollback in order.
+    """
+
+    def __init__(
+        self,
+        seconds_per_minute: float = 0.01,
+        fail: Iterable[str] = (),
+        fail_validation: Iterable[str] = (),
+        hang: Iterable[str] = (),
+    ):
+        self.seconds_per_minute = seconds_per_minute
+        self.fail = set(fail)
+        self.fail_validation = set(fail_validation)
+        self.hang = set(hang)
+        self.applied: Set[str] = set()
+        self.calls: List[tuple] = []
+
+    async def execute(self, step: Dict[str, Any]) -> Any:
+        action = step["action"]
+        self.calls.append(("execute", action))
+        if action in self.hang:
+            await asyncio.Event().wait()
+        await asyncio.sleep(parse_minutes(step.get("estimated_time")) * self.seconds_per_minute)
+        if action in self.fail:
+            raise RuntimeError(f"{action} failed on the fake service")
+        self.applied.add(action)
+        return {"applied": action}
+
+    async def validate(self, step: Dict[str, Any], check: str) -> bool:
+        self.calls.append(("validate", step["action"], check))
+        return step["action"] not in self.fail_validation
+
+    async def rollback(self, step: Dict[str, Any], rollback_action: str) -> None:
+        self.calls.append(("rollback", step["action"], rollback_action))
+        self.applied.discard(step["action"])
+
+
+# Handlers the recommender executes plans with, by action name; None holds the fallback handler
+REMEDIATION_HANDLERS: Dict[Optional[str], RemediationHandler] = {}
+
+
+def register_handler(handler: RemediationHandler, actions: Iterable[str] = ()) -> None:
+    """Register handler for the named actions, or as the fallback for every other action when none are named."""
+    for action in list(actions) or [None]:
+        REMEDIATION_HANDLERS[action] = handler
+
+
+@dataclass
+class StepOutcome:
+    action: str
+    # 'succeeded', 'failed', 'timeout', 'validation_failed', 'skipped' (a dependency did not
+    # succeed) or 'blocked' (waits for a step that is not auto-executed)
+    status: str
+    started_s: float = 0.0  # Seconds from the start of the run
+    duration_s: float = 0.0
+    result: Any = None
+    failed_checks: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    rollback_action: Optional[str] = None
+    rolled_back: bool = False
+    rollback_error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "succeeded"
+
+
+@dataclass
+class ExecutionReport:
+    outcomes: List[StepOutcome] = field(default_factory=list)
+    duration_s: float = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return all(outcome.succeeded for outcome in self.outcomes)
+
+    def outcome(self, action: str) -> StepOutcome:
+        return next(o for o in self.outcomes if o.action == action)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "succeeded": self.succeeded,
+            "duration_s": round(self.duration_s, 3),
+            "outcomes": [asdict(outcome) for outcome in self.outcomes],
+        }
+
+
+class RemediationExecutor:
+    """
+    Runs the auto-executable steps of a recommender execution plan concurrently, with rollback.
+
+    A step starts as soon as every dependency has succeeded, under a global
+    concurrency cap, so independent steps overlap instead of running one
+    after another. Each step gets action_timeout seconds to execute and pass
+    its validation_steps; when it raises, times out or fails a check, and its
+    rollback_trigger enables that condition, its rollback_plan action (from
+    the plan's rollback_strategy) runs. Steps depending on a failed step are
+    skipped, and steps depending on one that is not auto-executed are
+    blocked; with rollback_all, a failure also stops new steps and rolls
+    back every completed one, newest first.
+
+    Handlers are looked up by action name, falling back to default_handler.
+    """
+
+    def __init__(
+        self,
+        handlers: Optional[Dict[str, RemediationHandler]] = None,
+        default_handler: Optional[RemediationHandler] = None,
+        concurrency: int = REMEDIATION_CONCURRENCY,
+        action_timeout: float = REMEDIATION_ACTION_TIMEOUT_SECONDS,
+        rollback_timeout: Optional[float] = None,
+        levels: Iterable[str] = AUTO_EXECUTE_LEVELS,
+        rollback_all: bool = False,
+    ):
+        self.handlers = handlers or {}
+        self.default_handler = default_handler
+        self.concurrency = concurrency
+        self.action_timeout = action_timeout
+        self.rollback_timeout = rollback_timeout
+        self.levels = set(levels)
+        self.rollback_all = rollback_all
+
+    def handler_for(self, action: str) -> Optional[RemediationHandler]:
+        return self.handlers.get(action, self.default_handler)
+
+    async def _execute_and_validate(self, handler: RemediationHandler, step: Dict[str, Any], outcome: StepOutcome) -> None:
+        outcome.result = await handler.execute(step)
+        for check in step.get("validation_steps", []):
+            if not await handler.validate(step, check):
+                outcome.failed_checks.append(check)
+                # Later checks assume the earlier ones passed
+                break
+
+    async def _rollback(self, handler: RemediationHandler, step: Dict[str, Any], outcome: StepOutcome, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(handler.rollback(step, outcome.rollback_action), timeout)
+            outcome.rolled_back = True
+        except asyncio.TimeoutError:
+            outcome.rollback_error = f"Rollback timed out after {timeout:g}s"
+        except Exception as e:
+            outcome.rollback_error = str(e)
+
+    async def _run_step(
+        self, step: Dict[str, Any], outcome: StepOutcome, semaphore: asyncio.Semaphore, started: float, rollback_timeout: float
+    ) -> StepOutcome:
+        handler = self.handler_for(outcome.action)
+        async with semaphore:
+            outcome.started_s = time.perf_counter() - started
+            trigger = None
+            if handler is None:
+                outcome.status, outcome.error = "failed", f"No handler for {outcome.action}"
+            else:
+                try:
+                    await asyncio.wait_for(self._execute_and_validate(handler, step, outcome), self.action_timeout)
+                    if outcome.failed_checks:
+                        outcome.status, trigger = "validation_failed", "validation_failed"
+                        outcome.error = f"Validation failed: {outcome.failed_checks[0]}"
+                    else:
+                        outcome.status = "succeeded"
+                except asyncio.TimeoutError:
+                    outcome.status, trigger = "timeout", "timeout_exceeded"
+                    outcome.error = f"Timed out after {self.action_timeout:g}s"
+                except Exception as e:
+                    outcome.status, trigger, outcome.error = "failed", "error_threshold_exceeded", str(e)
+
+            # Triggers absent from the plan default to rolling back, as _define_rollback_trigger enables them all
+            if trigger and outcome.rollback_action and step.get("rollback_trigger", {}).get(trigger, True):
+                await self._rollback(handler, step, outcome, rollback_timeout)
+            outcome.duration_s = time.perf_counter() - started - outcome.started_s
+            return outcome
+
+    async def run(self, execution_plan: List[Dict[str, Any]], rollback_strategy: Optional[Dict[str, Any]] = None) -> ExecutionReport:
+        """Execute a plan (automation_context["execution_plan"], in dependency order) and report per-step outcomes."""
+        started = time.perf_counter()
+        rollback_strategy = rollback_strategy or {}
+        rollback_actions = {r["original_action"]: r["rollback_action"] for r in rollback_strategy.get("rollback_actions", [])}
+        rollback_timeout = self.rollback_timeout
+        if rollback_timeout is None:
+            rollback_timeout = (
+                parse_minutes(rollback_strategy["rollback_timeout"]) * 60
+                if rollback_strategy.get("rollback_timeout")
+                else REMEDIATION_ROLLBACK_TIMEOUT_SECONDS
+            )
+
+        planned = {step["action"]: step for step in execution_plan}
+        steps = {name: step for name, step in planned.items() if automation_level(step) in self.levels}
+        outcomes = {name: StepOutcome(name, "pending", rollback_action=rollback_actions.get(name)) for name in steps}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        running: Dict[asyncio.Task, str] = {}
+        completed: List[str] = []
+        aborted = False
+
+        def launch_ready() -> None:
+            # The plan is topologically ordered, so one pass settles chains of skipped steps
+            for name, step in steps.items():
+                outcome = outcomes[name]
+                if outcome.status != "pending":
+                    continue
+                dependencies = step.get("dependencies", [])
+                manual = [dep for dep in dependencies if dep not in steps]
+                unsuccessful = [dep for dep in dependencies if dep in steps and outcomes[dep].status not in ("pending", "running", "succeeded")]
+                if manual:
+                    outcome.status, outcome.error = "blocked", f"Waits for {', '.join(manual)}, which is not auto-executed"
+                elif unsuccessful or aborted:
+                    outcome.status = "skipped"
+                    outcome.error = f"Dependency {unsuccessful[0]} did not succeed" if unsuccessful else "Run aborted after a failure"
+                elif all(outcomes[dep].succeeded for dep in dependencies):
+                    outcome.status = "running"
+                    task = asyncio.create_task(self._run_step(step, outcome, semaphore, started, rollback_timeout))
+                    running[task] = name
+
+        try:
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    completed.append(name)
+                    if not task.result().succeeded and self.rollback_all:
+                        aborted = True
+                launch_ready()
+        finally:
+            for task in running:
+                task.cancel()
+
+        if aborted:
+            for name in reversed(completed):
+                outcome = outcomes[name]
+                handler = self.handler_for(name)
+                if outcome.succeeded and outcome.rollback_action and handler is not None:
+                    await self._rollback(handler, steps[name], outcome, rollback_timeout)
+
+        return ExecutionReport(outcomes=list(outcomes.values()), duration_s=time.perf_counter() - started)
+
+    async def run_recommendations(self, recommendations: Dict[str, Any]) -> ExecutionReport:
+        """Execute the plan in a recommender output (the `recommendations` state value or analyze_incident_for_actions())."""
+        context = recommendations.get("automation_context", {})
+        return await self.run(context.get("execution_plan", []), context.get("rollback_strategy"))
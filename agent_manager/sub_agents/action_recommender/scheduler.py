@@ -0,0 +1,212 @@
+# scheduler.py
+
+import heapq
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+# Estimate used for actions without one (playbook automations carry none)
+DEFAULT_ESTIMATED_TIME = "30_minutes"
+
+# (action name substring, system the action changes, phase). Changes to one system run one at a
+# time, in phase order (contain, then add capacity, then restart onto it) and then in the
+# recommender's ranking; changes to different systems, and read-only work, run in parallel.
+ACTION_RULES: Tuple[Tuple[str, str, int], ...] = (
+    ("block", "network", 0),
+    ("monitoring", "monitoring", 0),
+    ("rate_limit", "api", 0),
+    ("caching", "api", 0),
+    ("timeout", "application", 0),
+    ("scale_database", "database", 1),
+    ("scale", "application", 1),
+    ("connection_pool", "database", 2),
+    ("restart", "application", 2),
+)
+
+# Automation levels that only read or investigate; everything else changes the system it targets
+READ_ONLY_LEVELS = {"manual"}
+
+_DURATION = re.compile(r"(\d+)_(minute|hour)")
+
+
+def parse_minutes(estimated_time: Optional[str]) -> int:
+    """Minutes in an estimate such as "30_minutes", "2_hours" or "1_hours_15_minutes"."""
+    parts = _DURATION.findall(estimated_time or DEFAULT_ESTIMATED_TIME)
+    if not parts:
+        parts = _DURATION.findall(DEFAULT_ESTIMATED_TIME)
+    return sum(int(n) * (60 if unit == "hour" else 1) for n, unit in parts)
+
+
+def format_minutes(total_minutes: int) -> str:
+    """Estimate string in the recommender's format ("45_minutes", "2_hours_30_minutes")."""
+    if total_minutes < 60:
+        return f"{total_minutes}_minutes"
+    return f"{total_minutes // 60}_hours_{total_minutes % 60}_minutes"
+
+
+def automation_level(action: Dict[str, Any]) -> str:
+    """An action's automation level as a string, whether it holds an ActionType or (from JSON) its value."""
+    level = action.get("automation_level")
+    # Playbook manual actions carry a priority but no automation level
+    if level is None:
+        return "manual"
+    return level.value if isinstance(level, Enum) else str(level)
+
+
+def _target(action: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+    """(system, phase) the action changes; None for read-only actions."""
+    if automation_level(action) in READ_ONLY_LEVELS:
+        return None
+    name = action.get("action") or ""
+    for keyword, system, phase in ACTION_RULES:
+        if keyword in name:
+            return system, phase
+    # An unrecognised change only conflicts with itself
+    return name, 0
+
+
+@dataclass
+class ScheduledAction:
+    """One node of the remediation DAG with its place in the schedule (times in minutes from start)."""
+
+    name: str
+    action: Dict[str, Any]
+    duration: int
+    dependencies: List[str] = field(default_factory=list)
+    wave: int = 0
+    earliest_start: int = 0
+    earliest_finish: int = 0
+    slack: int = 0
+
+    @property
+    def critical(self) -> bool:
+        return self.slack == 0
+
+
+@dataclass
+class RemediationSchedule:
+    """Recommended actions as a dependency DAG, grouped into waves that can run concurrently."""
+
+    # Topological order: ranking order, except that an action always follows its dependencies
+    steps: List[ScheduledAction] = field(default_factory=list)
+    waves: List[List[str]] = field(default_factory=list)
+    critical_path: List[str] = field(default_factory=list)
+    makespan_minutes: int = 0
+    serial_minutes: int = 0
+
+    @property
+    def resolution_time(self) -> str:
+        return format_minutes(self.makespan_minutes)
+
+    def step(self, name: str) -> ScheduledAction:
+        return next(s for s in self.steps if s.name == name)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "parallel_waves": self.waves,
+            "critical_path": self.critical_path,
+            "critical_path_time": self.resolution_time,
+            "serial_time": format_minutes(self.serial_minutes),
+        }
+
+
+def _dependencies(actions: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Predecessors of each action: earlier changes to the same system, in (phase, rank) order."""
+    by_system: Dict[str, List[Tuple[int, int, str]]] = {}
+    for rank, action in enumerate(actions):
+        target = _target(action)
+        if target is not None:
+            system, phase = target
+            by_system.setdefault(system, []).append((phase, rank, action["action"]))
+
+    dependencies: Dict[str, List[str]] = {action["action"]: [] for action in actions}
+    for changes in by_system.values():
+        changes.sort()
+        # A chain per system: each change waits only for the one before it
+        for (_, _, before), (_, _, after) in zip(changes, changes[1:]):
+            dependencies[after].append(before)
+    return dependencies
+
+
+def schedule_actions(actions: List[Dict[str, Any]]) -> RemediationSchedule:
+    """
+    Schedule ranked actions as a DAG: parallel waves, earliest start times and the critical path.
+
+    Actions are deduplicated by name, keeping the highest-ranked one. Each
+    action's wave is one past the latest wave among its dependencies, so
+    every wave can run concurrently once the previous ones are done. The
+    makespan is the length of the critical path (the longest duration-
+    weighted chain), which is the resolution time when independent actions
+    run in parallel; serial_minutes is the one-at-a-time total for comparison.
+    Raises ValueError if the dependencies form a cycle.
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for action in actions:
+        name = action.get("action")
+        if name and name not in unique:
+            unique[name] = action
+    ranked = list(unique.values())
+    dependencies = _dependencies(ranked)
+
+    # Kahn's algorithm, always taking the highest-ranked ready action
+    nodes = {
+        name: ScheduledAction(name, action, parse_minutes(action.get("estimated_time")), dependencies[name])
+        for name, action in unique.items()
+    }
+    dependents: Dict[str, List[str]] = {name: [] for name in nodes}
+    waiting = {name: len(deps) for name, deps in dependencies.items()}
+    for name, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(name)
+    rank = {name: i for i, name in enumerate(nodes)}
+    ready = [(rank[name], name) for name in nodes if not waiting[name]]
+    heapq.heapify(ready)
+    order: List[ScheduledAction] = []
+    while ready:
+        node = nodes[heapq.heappop(ready)[1]]
+        upstream = [nodes[dep] for dep in node.dependencies]
+        node.wave = max((dep.wave + 1 for dep in upstream), default=0)
+        node.earliest_start = max((dep.earliest_finish for dep in upstream), default=0)
+        node.earliest_finish = node.earliest_start + node.duration
+        order.append(node)
+        for name in dependents[node.name]:
+            waiting[name] -= 1
+            if not waiting[name]:
+                heapq.heappush(ready, (rank[name], name))
+    if len(order) < len(nodes):
+        cycle = sorted((name for name in nodes if waiting[name]), key=rank.get)
+        raise ValueError(f"Dependency cycle among {', '.join(cycle)}")
+
+    makespan = max((node.earliest_finish for node in order), default=0)
+
+    # Backward pass: latest finish that does not delay the makespan
+    latest_finish = {name: makespan for name in nodes}
+    for node in reversed(order):
+        for dep in node.dependencies:
+            latest_finish[dep] = min(latest_finish[dep], latest_finish[node.name] - node.duration)
+    for node in order:
+        node.slack = latest_finish[node.name] - node.earliest_finish
+
+    waves: List[List[str]] = [[] for _ in range(max((node.wave for node in order), default=-1) + 1)]
+    for node in order:
+        waves[node.wave].append(node.name)
+
+    # Walk back from the last action to finish through dependencies that finish exactly when it starts
+    critical_path: List[str] = []
+    current = max(order, key=lambda node: node.earliest_finish, default=None)
+    while current is not None:
+        critical_path.append(current.name)
+        current = next(
+            (nodes[dep] for dep in current.dependencies if nodes[dep].earliest_finish == current.earliest_start),
+            None,
+        )
+    critical_path.reverse()
+
+    return RemediationSchedule(
+        steps=order,
+        waves=waves,
+        critical_path=critical_path,
+        makespan_minutes=makespan,
+        serial_minutes=sum(node.duration for node in order),
+    )
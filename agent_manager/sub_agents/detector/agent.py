@@ -2,18 +2,22 @@
 
 import os
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 
 import json
 import re
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Mapping, Optional, Union
 from agent_manager.config import *
+from agent_manager.callbacks import agent_callbacks
+from agent_manager.llm import model_for_agent
+from agent_manager.schemas import compact_json
+from agent_manager.toolsets import LazyToolboxToolset
+from agent_manager.tools.log_batch import LogBatch, as_log_batch, format_ms
+from agent_manager.tools.heavy_hitters import HeavyHitters
+from agent_manager.tools.log_reader import parse_logs, read_logs
+from agent_manager.tools.sketches import ImpactSketches
 
-# Load all the tools
-detector_toolset = toolbox.load_toolset("detector_toolset")
-
-detector_agent = None
 # --- Agent: Detector ---
 # This agent analyzes chaos logs and system health metrics to detect anomalies and summarize findings.
 # It is responsible for identifying patterns, frequencies, and severities of events across the system.
@@ -26,7 +30,15 @@ detector_agent = None
 instruction = """
 You are the Detector agent.
 
-Your task is to analyze chaos logs and telemetry data stored in the BigQuery table `aceti-462716.bqexport.chaospilot_fake_logs_20250620`.
+Your task is to analyze chaos logs and telemetry data stored in the daily BigQuery tables `aceti-462716.bqexport.chaospilot_fake_logs_YYYYMMDD`.
+
+Every query tool takes a time window: `start_time` and `end_time` (RFC 3339 UTC, e.g. "2025-06-20T00:00:00Z"; `end_time` is exclusive).
+- Always pass the incident window when the request gives one (an incident time, "last 2 hours", an experiment's run).
+- Otherwise leave both empty: aggregate tools then cover the last 24 hours, experiment lookups the last 7 days.
+- Use the same window for every tool in one analysis, and only widen it (e.g. for trend comparison with the previous period) when needed.
+- Counting tools (totals, groupings, trends, failure rates) are served from pre-aggregated buckets and round the window out to whole minutes (whole hours for edges older than yesterday); don't treat small differences against row-level tools as discrepancies.
+
+`*_page` tools return bounded pages. Fetch the next page only when the rows so far are not enough, by passing the last row's `cursor_timestamp`/`cursor_id` as `after_timestamp`/`after_id`.
 
 Use ONLY the following fields from the dataset (nested inside `jsonPayload` unless specified otherwise):
 
@@ -43,13 +55,14 @@ Use ONLY the following fields from the dataset (nested inside `jsonPayload` unle
 Respond **only** when explicitly asked by the user. Do not trigger analysis independently.
 
 You MUST output your response in **JSON format only** — with no explanation, logs, or comments before or after. The structure should match the sample below.
+Emit the JSON compactly on a single line (no indentation); the sample is only indented for readability. Keep `recent_errors` to the 10 most recent entries.
 
 **Additional Requirements:**
 - Detect and report trends over time (e.g., compare error rates to previous periods).
 - For each anomaly, include a `confidence_score` (0-1).
 - Allow for customizable severity thresholds (e.g., only report if CRITICAL > N in last X minutes; use defaults if not specified).
 - Add a `potential_root_cause` field if enough context is available, otherwise set to null.
-- If data is insufficient or ambiguous, set `ambiguous` to true and explain which fields are missing.
+- If data is insufficient or ambiguous, set `ambiguous` to true and list the missing fields in `missing_fields`.
 - Do NOT invent data. Only use what is available from the tools and schema.
 
 Ensure all fields are extracted using the correct BigQuery schema. Format timestamps in ISO 8601 (UTC). Aggregate, count, group, and deduplicate where necessary.
@@ -116,16 +129,19 @@ Example output:
 ⚠️ Only use jsonPayload keys for nested values.
 ⚠️ Do not invent values. Use real data and proper aggregation from the query tools.
 """
-detector_agent = Agent(
-    name="detector",
-    model=LiteLlm(model="azure/gpt-4o"),
-    output_key="detector_summary",
-    description="The Detector Agent is an AI-powered bot that analyzes chaos logs in BigQuery to identify critical errors, failure patterns, and system anomalies in real time.",
-    instruction=instruction,
-    tools=detector_toolset,
-)
 
-print(f"✅ Agent '{detector_agent.name}' created using model '{detector_agent.model}'.")
+
+def build_detector_agent() -> Agent:
+    """Build the detector agent; its model client and toolset load on first use."""
+    return Agent(
+        name="detector",
+        model=model_for_agent("detector"),
+        output_key="detector_summary",
+        description="The Detector Agent is an AI-powered bot that analyzes chaos logs in BigQuery to identify critical errors, failure patterns, and system anomalies in real time.",
+        instruction=instruction,
+        tools=[LazyToolboxToolset("detector_toolset")],
+        **agent_callbacks(),
+    )
 
 
 class EnhancedLogDetector:
@@ -170,8 +186,22 @@ class EnhancedLogDetector:
             "low": ["info", "debug", "trace", "notice"],
         }
 
-    def analyze_log_patterns(self, log_data: List[Dict]) -> Dict[str, Any]:
-        """Advanced pattern analysis with correlation detection"""
+    def analyze_log_patterns(
+        self,
+        log_data: Union[LogBatch, Iterable[Dict]],
+        error_baseline: Optional[Mapping[str, int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Advanced pattern analysis with correlation detection.
+
+        log_data may be a LogBatch or any iterable of log dicts (encoded into
+        one first). Patterns are matched once per distinct message and then
+        expanded to the rows carrying it. error_baseline holds per-hour error
+        counts (hourly_error_counts) seen before this batch; spikes are then
+        judged against those hours too, so a batch covering a single hour can
+        still be flagged.
+        """
+        batch = as_log_batch(log_data)
         analysis = {
             "patterns_found": [],
             "anomalies": [],
@@ -181,37 +211,57 @@ class EnhancedLogDetector:
         }
 
         # Pattern matching
-        for log in log_data:
-            message = log.get("message", "").lower()
-            timestamp = log.get("timestamp", "")
-
-            for category, patterns in self.patterns.items():
-                for pattern in patterns:
-                    if re.search(pattern, message, re.IGNORECASE):
-                        analysis["patterns_found"].append(
-                            {
-                                "category": category,
-                                "pattern": pattern,
-                                "message": message,
-                                "timestamp": timestamp,
-                                "severity": self._determine_severity(message),
-                            }
-                        )
+        matches = self._match_messages(batch)
+        timestamps = batch.timestamps
+        for i, code in enumerate(batch.codes["message"]):
+            found = matches.get(code)
+            if not found:
+                continue
+            timestamp = format_ms(timestamps[i]) or ""
+            for category, pattern, message, severity in found:
+                analysis["patterns_found"].append(
+                    {
+                        "category": category,
+                        "pattern": pattern,
+                        "message": message,
+                        "timestamp": timestamp,
+                        "severity": severity,
+                    }
+                )
 
         # Anomaly detection
-        analysis["anomalies"] = self._detect_anomalies(log_data)
+        analysis["anomalies"] = self._detect_anomalies(batch, error_baseline)
 
         # Correlation analysis
         analysis["correlations"] = self._find_correlations(analysis["patterns_found"])
 
         # Trend analysis
-        analysis["trends"] = self._analyze_trends(log_data)
+        analysis["trends"] = self._analyze_trends(batch)
 
         # Generate recommendations
         analysis["recommendations"] = self._generate_recommendations(analysis)
 
         return analysis
 
+    def _match_messages(self, batch: LogBatch) -> Dict[int, List[tuple]]:
+        """(category, pattern, lowercased message, severity) matches per message code, for messages with any."""
+        compiled = [
+            (category, pattern, re.compile(pattern, re.IGNORECASE))
+            for category, patterns in self.patterns.items()
+            for pattern in patterns
+        ]
+        matches = {}
+        for code, message in enumerate(batch.values["message"]):
+            message = (message or "").lower()
+            found = [
+                (category, pattern, message, self._determine_severity(message))
+                for category, pattern, regex in compiled
+                if regex.search(message)
+            ]
+            if found:
+                matches[code] = found
+        return matches
+
     def _determine_severity(self, message: str) -> str:
         """Intelligent severity classification"""
         message_lower = message.lower()
@@ -223,22 +273,31 @@ class EnhancedLogDetector:
 
         return "low"
 
-    def _detect_anomalies(self, log_data: List[Dict]) -> List[Dict]:
+    @staticmethod
+    def hourly_error_counts(batch: LogBatch) -> Counter:
+        """Rows whose message mentions an error, per hour key, grouped over the code arrays."""
+        error_codes = batch.codes_where("message", lambda message: "error" in message.lower())
+        return Counter(
+            hour
+            for hour, code in zip(batch.hour_keys(), batch.codes["message"])
+            if code in error_codes
+        )
+
+    def _detect_anomalies(self, batch: LogBatch, baseline: Optional[Mapping[str, int]] = None) -> List[Dict]:
         """Detect unusual patterns and spikes"""
         anomalies = []
 
-        # Time-based anomaly detection
-        error_counts = {}
-        for log in log_data:
-            if "error" in log.get("message", "").lower():
-                hour = log.get("timestamp", "")[:13]  # Get hour
-                error_counts[hour] = error_counts.get(hour, 0) + 1
+        # Time-based anomaly detection: error rows per hour, on top of the earlier hours when given
+        batch_counts = self.hourly_error_counts(batch)
+        error_counts = Counter(baseline or {})
+        error_counts.update(batch_counts)
 
-        # Detect spikes
+        # Detect spikes, only in the hours this batch contributed to
         avg_errors = (
             sum(error_counts.values()) / len(error_counts) if error_counts else 0
         )
-        for hour, count in error_counts.items():
+        for hour in batch_counts:
+            count = error_counts[hour]
             if count > avg_errors * 2:  # Spike threshold
                 anomalies.append(
                     {
@@ -279,7 +338,7 @@ class EnhancedLogDetector:
 
         return correlations
 
-    def _analyze_trends(self, log_data: List[Dict]) -> List[Dict]:
+    def _analyze_trends(self, log_data: LogBatch) -> List[Dict]:
         """Analyze trends over time"""
         trends = []
 
@@ -290,7 +349,7 @@ class EnhancedLogDetector:
 
         return trends
 
-    def _calculate_error_trend(self, log_data: List[Dict]) -> Dict:
+    def _calculate_error_trend(self, log_data: LogBatch) -> Dict:
         """Calculate error frequency trend"""
         # Implementation for trend calculation
         return {
@@ -354,58 +413,47 @@ class EnhancedLogDetector:
         return recommendations
 
 
-# Enhanced detector agent
-detector_agent = Agent(
-    name="enhanced_detector",
-    model=LiteLlm(model="azure/gpt-4o"),
-    description="Advanced log analysis agent with pattern recognition, anomaly detection, and intelligent classification",
-    tools=detector_toolset,
-)
-
-
 # @detector_agent.tool()
 def analyze_logs_comprehensive(log_data: str) -> str:
     """
     Comprehensive log analysis with advanced pattern recognition and anomaly detection.
 
     Args:
-        log_data: JSON string containing log entries with message and timestamp fields
+        log_data: JSON array (or NDJSON) of log entries with message and timestamp fields
 
     Returns:
         Detailed analysis including patterns, anomalies, correlations, and recommendations
     """
     try:
-        # Parse log data
-        logs = json.loads(log_data)
+        return _comprehensive_analysis(parse_logs(log_data))
 
-        # Initialize enhanced detector
-        detector = EnhancedLogDetector()
+    except Exception as e:
+        return json.dumps(
+            {
+                "error": f"Analysis failed: {str(e)}",
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
 
-        # Perform comprehensive analysis
-        analysis = detector.analyze_log_patterns(logs)
 
-        # Format response
-        response = {
-            "analysis_type": "comprehensive_log_analysis",
-            "timestamp": datetime.now().isoformat(),
-            "summary": {
-                "total_logs_analyzed": len(logs),
-                "patterns_found": len(analysis["patterns_found"]),
-                "anomalies_detected": len(analysis["anomalies"]),
-                "correlations_found": len(analysis["correlations"]),
-                "recommendations_generated": len(analysis["recommendations"]),
-            },
-            "detailed_analysis": analysis,
-            "confidence_score": 0.92,
-            "next_actions": [
-                "Review high-priority recommendations",
-                "Investigate detected anomalies",
-                "Monitor correlated issues",
-                "Implement suggested fixes",
-            ],
-        }
+# @detector_agent.tool()
+def analyze_log_files(path: str) -> str:
+    """
+    Comprehensive log analysis of local NDJSON log exports.
 
-        return json.dumps(response, indent=2)
+    Args:
+        path: An NDJSON export file (optionally .gz) or a directory of them
+
+    Returns:
+        Detailed analysis including patterns, anomalies, correlations, and recommendations,
+        plus sketched user and agent impact and the most frequent error types (with error bounds)
+    """
+    try:
+        sketches = ImpactSketches()
+        # The whole export, however old, is the window
+        hitters = HeavyHitters(window_hours=0)
+        logs = read_logs(path, sketches=sketches, hitters=hitters)
+        return _comprehensive_analysis(logs, impact=_impact_summary(sketches), hitters=hitters)
 
     except Exception as e:
         return json.dumps(
@@ -416,19 +464,69 @@ def analyze_logs_comprehensive(log_data: str) -> str:
         )
 
 
+def _impact_summary(sketches: ImpactSketches, experiments: int = 10) -> Dict[str, Any]:
+    """Sketched impact section: per-severity summary, users affected by errors and the most affected experiments."""
+    return {
+        "system_chaos_summary": sketches.system_chaos_summary(),
+        "user_impact_summary": sketches.user_impact_summary()[0],
+        "user_impact_by_experiment": sketches.user_impact_by_experiment()[:experiments],
+    }
+
+
+def _comprehensive_analysis(
+    logs: LogBatch, impact: Optional[Dict[str, Any]] = None, hitters: Optional[HeavyHitters] = None
+) -> str:
+    """
+    Response shared by analyze_logs_comprehensive and analyze_log_files.
+
+    With hitters (already fed the same logs), most_frequent_error_types is
+    read from its top-k summaries.
+    """
+    # Initialize enhanced detector
+    detector = EnhancedLogDetector()
+
+    # Perform comprehensive analysis
+    analysis = detector.analyze_log_patterns(logs)
+
+    # Format response
+    response = {
+        "analysis_type": "comprehensive_log_analysis",
+        "timestamp": datetime.now().isoformat(),
+        "summary": {
+            "total_logs_analyzed": len(logs),
+            "patterns_found": len(analysis["patterns_found"]),
+            "anomalies_detected": len(analysis["anomalies"]),
+            "correlations_found": len(analysis["correlations"]),
+            "recommendations_generated": len(analysis["recommendations"]),
+        },
+        "detailed_analysis": analysis,
+        **({"impact": impact} if impact is not None else {}),
+        **({"most_frequent_error_types": hitters.most_frequent_error_types()} if hitters is not None else {}),
+        "confidence_score": 0.92,
+        "next_actions": [
+            "Review high-priority recommendations",
+            "Investigate detected anomalies",
+            "Monitor correlated issues",
+            "Implement suggested fixes",
+        ],
+    }
+
+    return compact_json(response)
+
+
 # @detector_agent.tool()
 def detect_real_time_anomalies(log_stream: str) -> str:
     """
     Real-time anomaly detection for streaming log data.
 
     Args:
-        log_stream: JSON string containing recent log entries
+        log_stream: JSON array (or NDJSON) of recent log entries
 
     Returns:
         Real-time anomaly detection results
     """
     try:
-        logs = json.loads(log_stream)
+        logs = parse_logs(log_stream)
         detector = EnhancedLogDetector()
 
         # Focus on recent anomalies
@@ -454,7 +552,7 @@ def detect_real_time_anomalies(log_stream: str) -> str:
             "anomalies": recent_anomalies,
         }
 
-        return json.dumps(response, indent=2)
+        return compact_json(response)
 
     except Exception as e:
         return json.dumps(
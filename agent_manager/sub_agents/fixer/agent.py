@@ -2,11 +2,12 @@
 
 import os
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from agent_manager.config import *
+from agent_manager.callbacks import agent_callbacks
+from agent_manager.llm import model_for_agent
+from agent_manager.schemas import contract_instruction
 
 
-fixer_agent = None
 # --- Agent: Fixer ---
 # This agent is responsible for advising on cost-optimized recovery actions when the recovery plan has high confidence.
 # It synthesizes inputs from the planner agent, action recommender agent, and cost optimizer agent to produce clear, cost-aware fix recommendations.
@@ -28,12 +29,7 @@ fixer_agent = None
 # act upon (e.g., execution agents or human engineers).
 # It is designed to work in conjunction with other agents like planner_agent, action_recommender_agent, and cost_optimizer_agent.
 # It is the final step in the incident response workflow, providing
-fixer_agent = Agent(
-    name="fixer",
-    output_key="fixer_summary",
-    model=LiteLlm(model="azure/gpt-4o"),
-    description="Agent responsible for advising the possible fixes for the actions recommended by the action recommender agent then send to notifier agent.",
-    instruction="""
+instruction = """
 You are the Fixer Agent.
 
 Your task is to:
@@ -46,9 +42,9 @@ Your task is to:
 - If ambiguity is detected or information is missing, specify which context is missing and suggest a query to resolve it
 - Do NOT invent data. Only use what is available from the tools and schema.
 
-The user will provide the action recommendations in their message. Look for JSON content or structured action recommendations information in the user's message.
+The plan and action recommendations are appended below as compact JSON when available. Otherwise, look for JSON content or structured action recommendations information in the user's message.
 
-Output *only* in JSON format. 
+Output *only* in JSON format, compactly on a single line (the example is indented for readability only).
 Do not add any other text before or after the json.
 
 Output example:
@@ -93,8 +89,17 @@ Output example:
   "ambiguous": false
 }
 
-""",
-    tools=[],
-)
+"""
 
-print(f"✅ Agent '{fixer_agent.name}' created using model '{fixer_agent.model}'.")
+
+def build_fixer_agent() -> Agent:
+    """Build the fixer agent; its model client is created on first use."""
+    return Agent(
+        name="fixer",
+        output_key="fixer_summary",
+        model=model_for_agent("fixer"),
+        description="Agent responsible for advising the possible fixes for the actions recommended by the action recommender agent then send to notifier agent.",
+        instruction=contract_instruction("fixer", instruction),
+        tools=[],
+        **agent_callbacks(),
+    )
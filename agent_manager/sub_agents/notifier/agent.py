@@ -2,22 +2,20 @@
 
 import os
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from agent_manager.config import *
+from agent_manager.alerting import coalesce_notifications, only_new_alerts
+from agent_manager.callbacks import agent_callbacks
+from agent_manager.llm import model_for_agent
+from agent_manager.schemas import compact_json, contract_instruction
 
 
-notifier_agent = None
-notifier_agent = Agent(
-    name="notifier",
-    model=LiteLlm(model="azure/gpt-4o"),
-    description="Agent responsible for escalating unresolved, risky, or critical chaos engineering issues to human stakeholders through structured alerts.",
-    instruction="""
+instruction = """
 You are the Notifier Agent, a human escalation interface in a distributed resilience automation system.
 
 Your task is to generate clear, actionable alerts for human operators based on system events and agent outputs.
 You will receive structured inputs and must format them into human-readable alerts.
 
-The user will provide the fixer summary or other agent outputs in their message. Look for JSON content or structured information in the user's message.
+The plan and fixer summary are appended below as compact JSON when available. Otherwise, look for JSON content or structured information in the user's message.
 
 **Requirements:**
 - For each alert, include:
@@ -73,6 +71,30 @@ Task ID: `task-002`
 
 Please respond promptly if escalation is needed, or monitor for confirmation of successful auto-recovery.
 
-""",
-)
-print(f"✅ Agent '{notifier_agent.name}' created using model '{notifier_agent.model}'.")
+"""
+
+
+def notifier_instruction(readonly_context) -> str:
+    """Contract instruction (only the tasks coalescing let through) plus the alert windows closed since the last notification."""
+    text = contract_instruction("notifier", instruction, refine=only_new_alerts)(readonly_context)
+    digest = readonly_context.state.get("alert_digest")
+    if not digest:
+        return text
+    return (
+        f"{text}\n\nAlerts coalesced since the last notification (one entry per dedup window; "
+        f"cover them in the summary of recent incidents):\n{compact_json(digest)}"
+    )
+
+
+def build_notifier_agent() -> Agent:
+    """Build the notifier agent; its model client is created on first use."""
+    callbacks = agent_callbacks()
+    # Coalescing runs first: a storm of repeated alerts then skips the agent without being measured as a run
+    callbacks["before_agent_callback"] = [coalesce_notifications, *callbacks["before_agent_callback"]]
+    return Agent(
+        name="notifier",
+        model=model_for_agent("notifier"),
+        description="Agent responsible for escalating unresolved, risky, or critical chaos engineering issues to human stakeholders through structured alerts.",
+        instruction=notifier_instruction,
+        **callbacks,
+    )
@@ -3,14 +3,41 @@
 import os
 from datetime import datetime, timedelta
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 import json
-from typing import Dict, List, Any, Optional
+import uuid
+from typing import Dict, Iterable, List, Any, Optional, Union
 from enum import Enum
 from agent_manager.config import *
+from agent_manager.callbacks import agent_callbacks
+from agent_manager.llm import model_for_agent
+from agent_manager.schemas import compact_json, contract_instruction
+from agent_manager.toolsets import LazyToolboxToolset
+from agent_manager.incident_features import IncidentFeatures
+from agent_manager.incident_store import get_incident_store
+from agent_manager.tools.log_batch import LogBatch, stream_count_by
 
 
-planner_toolset = toolbox.load_toolset("planner_toolset")
+# --- Agent: Planner ---
+# Turns the detector's summary into an incident response plan. Its reply is stored
+# in session state as `plan` and validated against schemas.ResponsePlan.
+instruction = """
+You are the Planner agent.
+
+Your task is to turn the detector's findings into an incident response plan: classify the
+incident, set its priority, list root cause hypotheses and affected services, and give
+immediate actions, mitigation steps and prevention measures.
+
+Output *only* JSON, compactly on a single line, with these top-level keys:
+`incident_id`, `created_at`, `incident_summary` (`incident_type`, `priority`, `impact_assessment`,
+`root_cause_hypothesis`, `affected_services`, `business_impact`), `response_plan`
+(`immediate_actions`, `mitigation_steps`, `prevention_measures`), `escalation_procedure`,
+`communication_plan`, `success_criteria` and `automated_actions`.
+
+`incidents_by_agent_and_experiment_page` returns the largest groups first, up to 200 per page. Fetch the next page only
+when the rows so far are not enough, by passing the last row's `log_count`/`cursor_id` as `after_log_count`/`after_id`.
+
+Do NOT invent data. Only use what is available from the tools, the schema and the detector output.
+"""
 
 
 class IncidentPriority(Enum):
@@ -123,27 +150,32 @@ class IntelligentIncidentPlanner:
             },
         }
 
-    def analyze_incident_context(self, detector_data: Dict) -> Dict[str, Any]:
-        """Intelligent analysis of incident context and impact"""
+    def analyze_incident_context(
+        self, detector_data: Dict, features: Optional[IncidentFeatures] = None
+    ) -> Dict[str, Any]:
+        """
+        Intelligent analysis of incident context and impact.
+
+        The detector's patterns are scanned once into IncidentFeatures (pass
+        features to reuse an existing extraction); every assessment below
+        reads only that summary, so planning stays linear in pattern hits.
+        """
+        features = features or IncidentFeatures.from_detector_data(detector_data)
+        priority = self._determine_priority(features)
         analysis = {
-            "incident_type": self._classify_incident(detector_data),
-            "priority": self._determine_priority(detector_data),
-            "impact_assessment": self._assess_impact(detector_data),
-            "root_cause_hypothesis": self._generate_root_cause_hypothesis(
-                detector_data
-            ),
-            "affected_services": self._identify_affected_services(detector_data),
-            "business_impact": self._assess_business_impact(detector_data),
+            "incident_type": self._classify_incident(features),
+            "priority": priority,
+            "impact_assessment": self._assess_impact(features),
+            "root_cause_hypothesis": self._generate_root_cause_hypothesis(features),
+            "affected_services": self._identify_affected_services(features),
+            "business_impact": self._assess_business_impact(priority),
         }
 
         return analysis
 
-    def _classify_incident(self, detector_data: Dict) -> str:
+    def _classify_incident(self, features: IncidentFeatures) -> str:
         """Classify incident type based on patterns"""
-        patterns = detector_data.get("detailed_analysis", {}).get("patterns_found", [])
-
-        for pattern in patterns:
-            category = pattern.get("category", "")
+        for category in features.categories:
             if "database" in category:
                 return IncidentType.DATABASE_FAILURE.value
             elif "api" in category:
@@ -155,12 +187,10 @@ class IntelligentIncidentPlanner:
 
         return IncidentType.INFRASTRUCTURE_FAILURE.value
 
-    def _determine_priority(self, detector_data: Dict) -> str:
+    def _determine_priority(self, features: IncidentFeatures) -> str:
         """Determine incident priority based on severity and impact"""
-        patterns = detector_data.get("detailed_analysis", {}).get("patterns_found", [])
-
-        critical_count = sum(1 for p in patterns if p.get("severity") == "critical")
-        high_count = sum(1 for p in patterns if p.get("severity") == "high")
+        critical_count = features.severity("critical")
+        high_count = features.severity("high")
 
         if critical_count > 0:
             return IncidentPriority.CRITICAL.value
@@ -171,35 +201,26 @@ class IntelligentIncidentPlanner:
         else:
             return IncidentPriority.LOW.value
 
-    def _assess_impact(self, detector_data: Dict) -> Dict[str, Any]:
+    def _assess_impact(self, features: IncidentFeatures) -> Dict[str, Any]:
         """Assess technical and business impact"""
-        patterns = detector_data.get("detailed_analysis", {}).get("patterns_found", [])
-        anomalies = detector_data.get("detailed_analysis", {}).get("anomalies", [])
-
         return {
-            "affected_users": self._estimate_affected_users(patterns),
-            "service_degradation": self._assess_service_degradation(patterns),
-            "data_risk": self._assess_data_risk(patterns),
-            "recovery_time_estimate": self._estimate_recovery_time(patterns, anomalies),
+            "affected_users": self._estimate_affected_users(features),
+            "service_degradation": self._assess_service_degradation(features),
+            "data_risk": self._assess_data_risk(features),
+            "recovery_time_estimate": self._estimate_recovery_time(features),
         }
 
-    def _generate_root_cause_hypothesis(self, detector_data: Dict) -> List[Dict]:
+    def _generate_root_cause_hypothesis(self, features: IncidentFeatures) -> List[Dict]:
         """Generate intelligent root cause hypotheses"""
-        patterns = detector_data.get("detailed_analysis", {}).get("patterns_found", [])
-        correlations = detector_data.get("detailed_analysis", {}).get(
-            "correlations", []
-        )
-
         hypotheses = []
 
         # Database-related hypotheses
-        db_patterns = [p for p in patterns if p.get("category") == "database_errors"]
-        if db_patterns:
+        if features.count("database_errors"):
             hypotheses.append(
                 {
                     "hypothesis": "Database connection pool exhaustion",
                     "confidence": 0.85,
-                    "evidence": [p.get("message") for p in db_patterns],
+                    "evidence": list(features.evidence["database_errors"]),
                     "investigation_steps": [
                         "Check connection pool metrics",
                         "Review database load",
@@ -209,13 +230,12 @@ class IntelligentIncidentPlanner:
             )
 
         # API-related hypotheses
-        api_patterns = [p for p in patterns if p.get("category") == "api_errors"]
-        if api_patterns:
+        if features.count("api_errors"):
             hypotheses.append(
                 {
                     "hypothesis": "API rate limiting or authentication issues",
                     "confidence": 0.75,
-                    "evidence": [p.get("message") for p in api_patterns],
+                    "evidence": list(features.evidence["api_errors"]),
                     "investigation_steps": [
                         "Check API rate limits",
                         "Verify authentication tokens",
@@ -226,28 +246,12 @@ class IntelligentIncidentPlanner:
 
         return hypotheses
 
-    def _identify_affected_services(self, detector_data: Dict) -> List[str]:
+    def _identify_affected_services(self, features: IncidentFeatures) -> List[str]:
         """Identify services affected by the incident"""
-        patterns = detector_data.get("detailed_analysis", {}).get("patterns_found", [])
-        services = set()
-
-        for pattern in patterns:
-            message = pattern.get("message", "").lower()
-            if "api" in message:
-                services.add("api_gateway")
-            if "database" in message or "sql" in message:
-                services.add("database")
-            if "auth" in message or "login" in message:
-                services.add("authentication")
-            if "payment" in message:
-                services.add("payment_processing")
-
-        return list(services)
-
-    def _assess_business_impact(self, detector_data: Dict) -> Dict[str, Any]:
-        """Assess business impact of the incident"""
-        priority = self._determine_priority(detector_data)
+        return list(features.services)
 
+    def _assess_business_impact(self, priority: str) -> Dict[str, Any]:
+        """Assess business impact of the incident"""
         impact_levels = {
             IncidentPriority.CRITICAL.value: {
                 "customer_experience": "severely_impacted",
@@ -277,9 +281,9 @@ class IntelligentIncidentPlanner:
 
         return impact_levels.get(priority, impact_levels[IncidentPriority.LOW.value])
 
-    def _estimate_affected_users(self, patterns: List[Dict]) -> str:
+    def _estimate_affected_users(self, features: IncidentFeatures) -> str:
         """Estimate number of affected users"""
-        total_errors = len(patterns)
+        total_errors = features.pattern_count
         if total_errors > 100:
             return "large_scale"
         elif total_errors > 50:
@@ -289,9 +293,9 @@ class IntelligentIncidentPlanner:
         else:
             return "limited_scale"
 
-    def _assess_service_degradation(self, patterns: List[Dict]) -> str:
+    def _assess_service_degradation(self, features: IncidentFeatures) -> str:
         """Assess level of service degradation"""
-        critical_count = sum(1 for p in patterns if p.get("severity") == "critical")
+        critical_count = features.severity("critical")
         if critical_count > 5:
             return "severe_degradation"
         elif critical_count > 2:
@@ -301,21 +305,16 @@ class IntelligentIncidentPlanner:
         else:
             return "no_degradation"
 
-    def _assess_data_risk(self, patterns: List[Dict]) -> str:
+    def _assess_data_risk(self, features: IncidentFeatures) -> str:
         """Assess data security and integrity risk"""
-        security_patterns = [
-            p for p in patterns if p.get("category") == "security_events"
-        ]
-        if security_patterns:
+        if features.count("security_events"):
             return "high_risk"
         else:
             return "low_risk"
 
-    def _estimate_recovery_time(
-        self, patterns: List[Dict], anomalies: List[Dict]
-    ) -> str:
+    def _estimate_recovery_time(self, features: IncidentFeatures) -> str:
         """Estimate recovery time based on incident complexity"""
-        complexity_score = len(patterns) + len(anomalies)
+        complexity_score = features.pattern_count + features.anomaly_count
         if complexity_score > 20:
             return "4-8_hours"
         elif complexity_score > 10:
@@ -335,7 +334,7 @@ class IntelligentIncidentPlanner:
         escalation = self.escalation_matrix.get(IncidentPriority(priority), {})
 
         plan = {
-            "incident_id": f"INC-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+            "incident_id": f"INC-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:4]}",
             "created_at": datetime.now().isoformat(),
             "incident_summary": incident_analysis,
             "response_plan": {
@@ -431,24 +430,31 @@ class IntelligentIncidentPlanner:
 
 
 # --- Refactored Planner Agent for Schema Compliance ---
-planner_agent = Agent(
-    name="planner",
-    model=LiteLlm(model="azure/gpt-4o"),
-    description="Incident response planner using only schema-compliant fields from BigQuery logs.",
-    tools=planner_toolset,
-)
-
-
-def summarize_incidents_by_agent_and_experiment(logs: list) -> dict:
+def build_planner_agent() -> Agent:
+    """Build the planner agent; its model client and toolset load on first use."""
+    return Agent(
+        name="planner",
+        model=model_for_agent("planner"),
+        output_key="plan",
+        description="Incident response planner using only schema-compliant fields from BigQuery logs.",
+        instruction=contract_instruction("planner", instruction),
+        tools=[LazyToolboxToolset("planner_toolset")],
+        **agent_callbacks(),
+    )
+
+
+def summarize_incidents_by_agent_and_experiment(logs: Union[LogBatch, Iterable[dict]]) -> dict:
     """
     Summarize incidents by agent and experiment using only available schema fields.
+
+    logs may be a LogBatch or any iterable of rows, such as the rows of
+    successive get_experiment_logs_page results. An iterable is consumed
+    once, in LogBatch chunks grouped over their code arrays, so only one
+    chunk is held in memory at a time.
     """
     summary = {}
-    for log in logs:
-        agent_id = log.get("agent_id")
-        experiment_id = log.get("experiment_id")
-        severity = log.get("severity")
-        region = log.get("region")
+    combinations = stream_count_by(logs, "agent_id", "experiment_id", "severity", "region")
+    for (agent_id, experiment_id, severity, region), count in combinations.items():
         if not agent_id or not experiment_id:
             continue
         key = (agent_id, experiment_id)
@@ -460,15 +466,15 @@ def summarize_incidents_by_agent_and_experiment(logs: list) -> dict:
                 "regions": set(),
                 "severities": set(),
             }
-        summary[key]["total_logs"] += 1
+        summary[key]["total_logs"] += count
         if severity == "ERROR":
-            summary[key]["error_count"] += 1
+            summary[key]["error_count"] += count
         if severity == "CRITICAL":
-            summary[key]["critical_count"] += 1
-        if region:
-            summary[key]["regions"].add(region)
+            summary[key]["critical_count"] += count
         if severity:
             summary[key]["severities"].add(severity)
+        if region:
+            summary[key]["regions"].add(region)
     # Convert sets to lists for JSON serialization
     for key in summary:
         summary[key]["regions"] = list(summary[key]["regions"])
@@ -476,9 +482,11 @@ def summarize_incidents_by_agent_and_experiment(logs: list) -> dict:
     return summary
 
 
-def planner_summary(logs: list) -> dict:
+def planner_summary(logs: Union[LogBatch, Iterable[dict]]) -> dict:
     """
     Generate a planner summary using only schema-compliant fields.
+
+    logs may be a LogBatch or any iterable of rows; it is consumed once, in chunks.
     """
     summary = summarize_incidents_by_agent_and_experiment(logs)
     return {
@@ -505,13 +513,32 @@ def create_intelligent_response_plan(detector_data: str) -> str:
         # Initialize intelligent planner
         planner = IntelligentIncidentPlanner()
 
-        # Analyze incident context
-        incident_analysis = planner.analyze_incident_context(detector_analysis)
+        # Analyze incident context; the features are reused for the similarity vector below
+        features = IncidentFeatures.from_detector_data(detector_analysis)
+        incident_analysis = planner.analyze_incident_context(detector_analysis, features)
 
         # Create response plan
         response_plan = planner.create_response_plan(incident_analysis)
 
-        return json.dumps(response_plan, indent=2)
+        # Attach similar past incidents, then persist this one for future lookups
+        try:
+            store = get_incident_store()
+            response_plan["similar_incidents"] = store.find_similar(
+                incident_analysis["incident_type"], detector_analysis, features=features
+            )
+            store.record_incident(
+                response_plan["incident_id"],
+                incident_analysis["incident_type"],
+                incident_analysis["priority"],
+                detector_analysis,
+                summary=incident_analysis,
+                agent_outputs={"planner": response_plan},
+                features=features,
+            )
+        except Exception as e:
+            print(f"⚠️ Incident history unavailable: {e}")
+
+        return compact_json(response_plan)
 
     except Exception as e:
         return json.dumps(
@@ -561,7 +588,7 @@ def suggest_proactive_measures(historical_data: str) -> str:
             "expected_impact": "reduce_incidents_by_60%",
         }
 
-        return json.dumps(proactive_measures, indent=2)
+        return compact_json(proactive_measures)
 
     except Exception as e:
         return json.dumps(
@@ -0,0 +1,249 @@
+# telemetry.py
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from opentelemetry import trace
+from prometheus_client import Histogram
+
+
+@dataclass
+class StageRecord:
+    """One timed agent, model or tool invocation in the agent chain."""
+
+    kind: str  # 'agent', 'model' or 'tool'
+    agent_name: str
+    invocation_id: str
+    start_time: float  # epoch seconds
+    duration_s: float
+    tool_name: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# --- Exporters ---
+class InMemoryExporter:
+    """Keeps every record in a list; used by tests and local benchmarks."""
+
+    def __init__(self):
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+
+    def export(self, record: StageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Total seconds, calls and tokens per (kind, agent[, tool]) stage."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            stage = f"{record.kind}:{record.agent_name}"
+            if record.tool_name:
+                stage += f":{record.tool_name}"
+            entry = totals.setdefault(
+                stage, {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+            )
+            entry["calls"] += 1
+            entry["seconds"] += record.duration_s
+            entry["prompt_tokens"] += record.prompt_tokens
+            entry["completion_tokens"] += record.completion_tokens
+        return totals
+
+
+class OpenTelemetryExporter:
+    """Emits each record as a span on the globally configured tracer provider."""
+
+    def __init__(self, tracer_name: str = "chaospilot"):
+        self.tracer = trace.get_tracer(tracer_name)
+
+    def export(self, record: StageRecord) -> None:
+        name = f"{record.kind} {record.tool_name or record.agent_name}"
+        span = self.tracer.start_span(name, start_time=int(record.start_time * 1e9))
+        span.set_attribute("chaospilot.agent", record.agent_name)
+        span.set_attribute("chaospilot.invocation_id", record.invocation_id)
+        if record.tool_name:
+            span.set_attribute("chaospilot.tool", record.tool_name)
+        span.set_attribute("chaospilot.prompt_tokens", record.prompt_tokens)
+        span.set_attribute("chaospilot.completion_tokens", record.completion_tokens)
+        span.set_attribute("chaospilot.request_bytes", record.request_bytes)
+        span.set_attribute("chaospilot.response_bytes", record.response_bytes)
+        span.end(end_time=int((record.start_time + record.duration_s) * 1e9))
+
+
+class PrometheusExporter:
+    """Feeds per-stage latency, token and payload histograms served at /metrics."""
+
+    def __init__(self, registry: Any = None):
+        kwargs = {"registry": registry} if registry is not None else {}
+        self.latency = Histogram(
+            "chaospilot_stage_latency_seconds",
+            "Wall time per agent, model and tool invocation.",
+            ["kind", "agent", "tool"],
+            buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+            **kwargs,
+        )
+        self.tokens = Histogram(
+            "chaospilot_model_tokens",
+            "Prompt and completion tokens per model call.",
+            ["agent", "direction"],
+            buckets=(64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072),
+            **kwargs,
+        )
+        self.payload = Histogram(
+            "chaospilot_payload_bytes",
+            "Request and response payload sizes per model and tool invocation.",
+            ["kind", "agent", "direction"],
+            buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+            **kwargs,
+        )
+
+    def export(self, record: StageRecord) -> None:
+        self.latency.labels(record.kind, record.agent_name, record.tool_name or "").observe(
+            record.duration_s
+        )
+        if record.kind == "model":
+            self.tokens.labels(record.agent_name, "prompt").observe(record.prompt_tokens)
+            self.tokens.labels(record.agent_name, "completion").observe(record.completion_tokens)
+        if record.kind in ("model", "tool"):
+            self.payload.labels(record.kind, record.agent_name, "request").observe(
+                record.request_bytes
+            )
+            self.payload.labels(record.kind, record.agent_name, "response").observe(
+                record.response_bytes
+            )
+
+
+# --- Payload Sizing ---
+def _content_bytes(contents: Any) -> int:
+    """Approximate size of genai Content(s) from their text, function call and response parts."""
+    if contents is None:
+        return 0
+    if not isinstance(contents, list):
+        contents = [contents]
+    size = 0
+    for content in contents:
+        for part in getattr(content, "parts", None) or []:
+            if part.text:
+                size += len(part.text)
+            elif part.function_call is not None:
+                size += _json_bytes(part.function_call.args)
+            elif part.function_response is not None:
+                size += _json_bytes(part.function_response.response)
+    return size
+
+
+def _json_bytes(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class StageInstrumentation:
+    """
+    Times every agent, model and tool invocation through ADK callbacks.
+
+    Start times are keyed per invocation (and per function call for tools) so
+    concurrent sessions do not interfere; each finished stage becomes a
+    StageRecord sent to every exporter.
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters: List[Any] = list(exporters or [])
+        self._starts: Dict[Tuple[str, ...], Tuple[float, float, int]] = {}
+
+    def add_exporter(self, exporter: Any) -> None:
+        self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter: Any) -> None:
+        self.exporters.remove(exporter)
+
+    def _start(self, key: Tuple[str, ...], request_bytes: int = 0) -> None:
+        self._starts[key] = (time.time(), time.perf_counter(), request_bytes)
+
+    def _finish(self, key: Tuple[str, ...], **fields: Any) -> None:
+        started = self._starts.pop(key, None)
+        if started is None:
+            return
+        start_time, start_counter, request_bytes = started
+        record = StageRecord(
+            start_time=start_time,
+            duration_s=time.perf_counter() - start_counter,
+            request_bytes=request_bytes,
+            **fields,
+        )
+        for exporter in self.exporters:
+            try:
+                exporter.export(record)
+            except Exception as e:
+                print(f"⚠️ Telemetry exporter {type(exporter).__name__} failed: {e}")
+
+    # --- ADK callbacks ---
+    def before_agent(self, callback_context) -> None:
+        self._start(("agent", callback_context.invocation_id, callback_context.agent_name))
+
+    def after_agent(self, callback_context) -> None:
+        self._finish(
+            ("agent", callback_context.invocation_id, callback_context.agent_name),
+            kind="agent",
+            agent_name=callback_context.agent_name,
+            invocation_id=callback_context.invocation_id,
+        )
+
+    def before_model(self, callback_context, llm_request) -> None:
+        self._start(
+            ("model", callback_context.invocation_id, callback_context.agent_name),
+            request_bytes=_content_bytes(llm_request.contents),
+        )
+
+    def after_model(self, callback_context, llm_response) -> None:
+        if llm_response.partial:
+            return
+        usage = llm_response.usage_metadata
+        self._finish(
+            ("model", callback_context.invocation_id, callback_context.agent_name),
+            kind="model",
+            agent_name=callback_context.agent_name,
+            invocation_id=callback_context.invocation_id,
+            prompt_tokens=(usage.prompt_token_count or 0) if usage else 0,
+            completion_tokens=(usage.candidates_token_count or 0) if usage else 0,
+            response_bytes=_content_bytes(llm_response.content),
+        )
+
+    def before_tool(self, tool, args: Dict[str, Any], tool_context) -> None:
+        self._start(
+            ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name),
+            request_bytes=_json_bytes(args),
+        )
+
+    def after_tool(self, tool, args: Dict[str, Any], tool_context, tool_response: Any) -> None:
+        self._finish(
+            ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name),
+            kind="tool",
+            agent_name=tool_context.agent_name,
+            invocation_id=tool_context.invocation_id,
+            tool_name=tool.name,
+            response_bytes=_json_bytes(tool_response),
+        )
+
+
+instrumentation = StageInstrumentation(exporters=[OpenTelemetryExporter(), PrometheusExporter()])
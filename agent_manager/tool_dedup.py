@@ -0,0 +1,96 @@
+# tool_dedup.py
+
+import asyncio
+import contextvars
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class _Abandoned(Exception):
+    """The call a waiter was sharing ended without a result."""
+
+
+class ToolCallDeduplicator:
+    """
+    Shares tool results between concurrent agent runs.
+
+    The first run to call a tool with given arguments executes it; runs that
+    make the same call while it is in flight await its result, and later runs
+    reuse it. Scope one instance to a batch so results never outlive the data
+    they were read from.
+    """
+
+    def __init__(self, tool_names: Optional[Iterable[str]] = None):
+        self.tool_names: Optional[Set[str]] = set(tool_names) if tool_names is not None else None
+        self._calls: Dict[str, asyncio.Future] = {}
+        # session id -> keys of calls that session is executing
+        self._owners: Dict[str, List[str]] = {}
+        self._owned_by_call: Dict[Tuple[str, str], str] = {}
+        self.stats = {"executed": 0, "shared": 0}
+
+    @staticmethod
+    def _key(tool_name: str, args: Dict[str, Any]) -> str:
+        return tool_name + ":" + json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+    async def before_tool(self, tool, args: Dict[str, Any], tool_context) -> Optional[Any]:
+        if self.tool_names is not None and tool.name not in self.tool_names:
+            return None
+        key = self._key(tool.name, args)
+        call = self._calls.get(key)
+        if call is None:
+            session_id = tool_context._invocation_context.session.id
+            self._calls[key] = asyncio.get_running_loop().create_future()
+            self._owners.setdefault(session_id, []).append(key)
+            self._owned_by_call[(session_id, tool_context.function_call_id)] = key
+            self.stats["executed"] += 1
+            return None
+        try:
+            # shield: a waiter timing out must not cancel the result for everyone else
+            result = await asyncio.shield(call)
+        except _Abandoned:
+            return None  # run it ourselves
+        self.stats["shared"] += 1
+        return result
+
+    def after_tool(self, tool, args: Dict[str, Any], tool_context, tool_response: Any) -> None:
+        session_id = tool_context._invocation_context.session.id
+        key = self._owned_by_call.pop((session_id, tool_context.function_call_id), None)
+        if key is None:
+            return None
+        call = self._calls[key]
+        if not call.done():
+            # ADK only uses a truthy before_tool result, so wrap empty results
+            call.set_result(tool_response if tool_response else {"result": tool_response})
+        self._owners.get(session_id, []).remove(key)
+        return None
+
+    def release(self, session_id: str) -> None:
+        """Fail calls a finished (or timed out) session never completed so their waiters run them."""
+        for key in self._owners.pop(session_id, []):
+            call = self._calls.pop(key)
+            if not call.done():
+                call.set_exception(_Abandoned())
+                call.exception()  # mark retrieved even if nobody was waiting
+        for owned in [k for k in self._owned_by_call if k[0] == session_id]:
+            del self._owned_by_call[owned]
+
+
+# Deduplicator for the agent runs in the current context (set by batch runs)
+active_deduplicator: contextvars.ContextVar[Optional[ToolCallDeduplicator]] = contextvars.ContextVar(
+    "active_deduplicator", default=None
+)
+
+
+# --- ADK callbacks ---
+async def dedup_before_tool(tool, args: Dict[str, Any], tool_context) -> Optional[Any]:
+    deduplicator = active_deduplicator.get()
+    if deduplicator is None:
+        return None
+    return await deduplicator.before_tool(tool, args, tool_context)
+
+
+def dedup_after_tool(tool, args: Dict[str, Any], tool_context, tool_response: Any) -> None:
+    deduplicator = active_deduplicator.get()
+    if deduplicator is not None:
+        deduplicator.after_tool(tool, args, tool_context, tool_response)
+    return None
@@ -0,0 +1,305 @@
+# heavy_hitters.py
+
+import heapq
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..config import HEAVY_HITTER_CAPACITY, HEAVY_HITTER_WINDOW_HOURS
+from .rollups import ERROR_SEVERITIES, hour_bucket, log_field, message_template, parse_epoch_seconds, sort_key
+
+# Summary scopes: every error, or the errors of one region or agent
+Scope = Optional[Tuple[str, Any]]
+
+
+class SpaceSaving:
+    """
+    Top-k counter (Space-Saving) over a stream of items, in at most capacity counters.
+
+    A new item takes over the smallest counter once all are in use,
+    inheriting its count as error, so counts never undercount and overcount
+    by at most error <= total / capacity. Every item more frequent than
+    total / capacity is guaranteed to be tracked, so top(n) is exact in
+    membership for n well below capacity on skewed streams. Updates may be
+    weighted (pre-aggregated counts), and summaries merge (Agarwal et al.),
+    so shards and time buckets can be summarised separately.
+    """
+
+    __slots__ = ("capacity", "counts", "errors", "total", "_heap", "_seq")
+
+    def __init__(self, capacity: int = HEAVY_HITTER_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f"SpaceSaving capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self.total = 0
+        # (count, seq, item) entries; stale ones (count no longer current) are skipped when popped
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._seq = 0
+
+    def _push(self, item: Hashable, count: int) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (count, self._seq, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._reheap()
+
+    def _reheap(self) -> None:
+        self._heap = [(count, seq, item) for seq, (item, count) in enumerate(self.counts.items())]
+        self._seq = len(self._heap)
+        heapq.heapify(self._heap)
+
+    def _min_entry(self) -> Tuple[int, Hashable]:
+        heap, counts = self._heap, self.counts
+        while True:
+            count, _, item = heap[0]
+            if counts.get(item) == count:
+                return count, item
+            heapq.heappop(heap)
+
+    def min_count(self) -> int:
+        """Smallest tracked count once full (the bound on any untracked item's count), else 0."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._min_entry()[0]
+
+    def add(self, item: Hashable, count: int = 1) -> None:
+        counts = self.counts
+        self.total += count
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            floor, victim = self._min_entry()
+            heapq.heappop(self._heap)
+            del counts[victim], self.errors[victim]
+            counts[item] = floor + count
+            self.errors[item] = floor
+        self._push(item, counts[item])
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Fold another summary into this one (in place); returns self."""
+        mine, theirs = self.min_count(), other.min_count()
+        counts: Dict[Hashable, int] = {}
+        errors: Dict[Hashable, int] = {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, mine) + other.counts.get(item, theirs)
+            errors[item] = self.errors.get(item, mine) + other.errors.get(item, theirs)
+        if len(counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, counts.items(), key=lambda kv: kv[1])
+            counts = dict(kept)
+            errors = {item: errors[item] for item in counts}
+        self.counts, self.errors = counts, errors
+        self.total += other.total
+        self._reheap()
+        return self
+
+    def copy(self) -> "SpaceSaving":
+        return SpaceSaving(self.capacity).merge(self)
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """The n largest (item, count, error), by count then item."""
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], sort_key(kv[0])))[:n]
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __repr__(self) -> str:
+        return f"SpaceSaving(capacity={self.capacity}, tracked={len(self.counts)}, total={self.total})"
+
+
+class HeavyHitters:
+    """
+    Streaming top-k error messages and message templates, overall and per region and per agent.
+
+    Answers most_frequent_error_types and frequent_failure_patterns (same
+    names and columns as the toolbox tools, plus a `<count>_error` overcount
+    bound) from Space-Saving summaries of ERROR/CRITICAL logs instead of a
+    group-by over every row. Summaries are kept per (hour, kind, scope) and,
+    for the whole retained window, as live summaries updated on ingest, so
+    the default query reads one summary of capacity counters however many
+    logs or hours it covers; an explicit since/until merges the hour buckets
+    in range. Hour buckets older than window_hours behind the newest one (0
+    keeps them all) are dropped and the live summaries rebuilt from the rest.
+    """
+
+    def __init__(self, capacity: int = HEAVY_HITTER_CAPACITY, window_hours: float = HEAVY_HITTER_WINDOW_HOURS):
+        self.capacity = capacity
+        self.window_s = int(window_hours * 3600)
+        # Summaries per (hour, kind, scope); kinds are "template" (most_frequent_error_types)
+        # and "message" (frequent_failure_patterns)
+        self.hours: Dict[Tuple[Optional[int], str, Scope], SpaceSaving] = {}
+        self.live: Dict[Tuple[str, Scope], SpaceSaving] = {}
+        self.rows_ingested = 0
+        self._latest_hour: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # --- Ingest ---
+    def ingest(self, logs: Iterable[Dict[str, Any]]) -> int:
+        """Add logs (export rows or flat log dicts); only ERROR and CRITICAL ones are counted. Returns how many were seen."""
+        # Pre-aggregated per call, so each summary sees one weighted update per distinct message
+        counts: Dict[Tuple[Optional[int], Any, Any, Any], int] = defaultdict(int)
+        hours: Dict[str, Optional[int]] = {}
+        seen = 0
+        for entry in logs:
+            seen += 1
+            if entry.get("severity") not in ERROR_SEVERITIES:
+                continue
+            hour = hour_bucket(log_field(entry, "timestamp"), hours)
+            counts[(hour, log_field(entry, "message"), log_field(entry, "region"), log_field(entry, "agent_id"))] += 1
+
+        templates: Dict[Any, Optional[str]] = {}
+        updates: Dict[Tuple[Optional[int], str, Scope, Any], int] = defaultdict(int)
+        for (hour, message, region, agent), count in counts.items():
+            if message not in templates:
+                templates[message] = message_template(message)
+            for kind, item in (("template", templates[message]), ("message", message)):
+                updates[(hour, kind, None, item)] += count
+                if region is not None:
+                    updates[(hour, kind, ("region", region), item)] += count
+                if agent is not None:
+                    updates[(hour, kind, ("agent", agent), item)] += count
+
+        with self._lock:
+            # Largest first, so the summaries evict the rare items rather than the frequent ones
+            for (hour, kind, scope, item), count in sorted(updates.items(), key=lambda kv: -kv[1]):
+                self._summary(self.hours, (hour, kind, scope)).add(item, count)
+                self._summary(self.live, (kind, scope)).add(item, count)
+                if hour is not None and (self._latest_hour is None or hour > self._latest_hour):
+                    self._latest_hour = hour
+            self.rows_ingested += seen
+            self._expire()
+        return seen
+
+    def _summary(self, summaries: Dict[Any, SpaceSaving], key: Any) -> SpaceSaving:
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = SpaceSaving(self.capacity)
+        return summary
+
+    def _expire(self) -> None:
+        if self._latest_hour is None or not self.window_s:
+            return
+        cutoff = self._latest_hour - self.window_s
+        expired = [key for key in self.hours if key[0] is not None and key[0] < cutoff]
+        if not expired:
+            return
+        for key in expired:
+            del self.hours[key]
+        self._rebuild_live()
+
+    def _rebuild_live(self) -> None:
+        self.live = {}
+        for (_, kind, scope), summary in self.hours.items():
+            self._merge_into(self.live, (kind, scope), summary)
+
+    @staticmethod
+    def _merge_into(target: Dict[Any, SpaceSaving], key: Any, summary: SpaceSaving) -> None:
+        if key in target:
+            target[key].merge(summary)
+        else:
+            target[key] = summary.copy()
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        """Fold another shard's summaries into these (in place); returns self."""
+        with self._lock:
+            for key, summary in list(other.hours.items()):
+                self._merge_into(self.hours, key, summary)
+            self.rows_ingested += other.rows_ingested
+            if other._latest_hour is not None and (self._latest_hour is None or other._latest_hour > self._latest_hour):
+                self._latest_hour = other._latest_hour
+            self._rebuild_live()
+            self._expire()
+        return self
+
+    # --- Queries (mirror mcp-toolbox/tools.yaml) ---
+    def _top(
+        self,
+        kind: str,
+        dimension: str,
+        limit: int,
+        since: Optional[int],
+        until: Optional[int],
+        region: Optional[str],
+        agent_id: Optional[str],
+    ) -> List[Tuple[Any, int, int, Optional[str]]]:
+        """
+        (item, count, error, scopes) for the top items of one kind, overall or in one region or agent.
+
+        scopes lists the regions or agents (per dimension) whose summaries
+        track the item. Without since/until the live summaries are read in
+        place; otherwise the hour buckets in range are merged first.
+        """
+        scope = ("agent", agent_id) if agent_id is not None else ("region", region) if region is not None else None
+        with self._lock:
+            if since is None and until is None:
+                summaries = {s: summary for (k, s), summary in self.live.items() if k == kind}
+            else:
+                summaries = {}
+                for (hour, k, s), summary in self.hours.items():
+                    if k == kind and hour is not None and (since is None or hour >= since) and (until is None or hour < until):
+                        self._merge_into(summaries, s, summary)
+            summary = summaries.get(scope)
+            if summary is None:
+                return []
+            scoped = [(s[1], summaries[s]) for s in summaries if s is not None and s[0] == dimension]
+            return [
+                (item, count, error, ",".join(sorted(str(name) for name, other in scoped if item in other)) or None)
+                for item, count, error in summary.top(limit)
+            ]
+
+    def most_frequent_error_types(
+        self,
+        limit: int = 5,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        region: Optional[str] = None,
+        agent_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top error message templates, overall or in one region or agent; regions are those whose summary tracks it."""
+        return [
+            {"failure_type": item, "count": count, "count_error": error, "regions": regions}
+            for item, count, error, regions in self._top("template", "region", limit, since, until, region, agent_id)
+        ]
+
+    def frequent_failure_patterns(
+        self,
+        limit: int = 10,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        region: Optional[str] = None,
+        agent_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top error messages, overall or in one region or agent; involved agents are those whose summary tracks it."""
+        return [
+            {"failure_message": item, "occurrences": count, "occurrences_error": error, "involved_agents": agents}
+            for item, count, error, agents in self._top("message", "agent", limit, since, until, region, agent_id)
+        ]
+
+    def as_tools(self) -> List[Callable[..., List[Dict[str, Any]]]]:
+        """The top-k queries as functions named like their toolbox tools, for FunctionTool (see LogRollups.as_tools)."""
+
+        def make_tool(name: str, description: str) -> Callable[..., List[Dict[str, Any]]]:
+            method = getattr(self, name)
+
+            def tool(start_time: str = "", end_time: str = "") -> List[Dict[str, Any]]:
+                return method(since=parse_epoch_seconds(start_time), until=parse_epoch_seconds(end_time))
+
+            tool.__name__ = name
+            tool.__doc__ = description
+            return tool
+
+        return [make_tool(name, description) for name, description in HEAVY_HITTER_TOOLS.items()]
+
+
+# Toolbox tools that HeavyHitters can answer (counts may overcount by *_error), with their descriptions
+HEAVY_HITTER_TOOLS: Dict[str, str] = {
+    "most_frequent_error_types": "Most frequent error message templates by count (± count_error overcount) and their regions.",
+    "frequent_failure_patterns": "Top recurring error messages (± occurrences_error overcount) and the agents reporting them.",
+}
@@ -0,0 +1,278 @@
+# log_batch.py
+
+from array import array
+from collections import Counter
+from itertools import islice
+from datetime import datetime, timezone
+from operator import getitem
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Categorical columns the local engines read; each is stored as integer codes into a string dictionary
+COLUMNS: Tuple[str, ...] = ("agent_id", "experiment_id", "region", "severity", "message")
+# Code 0 is reserved for a missing value in every column
+MISSING_CODE = 0
+# Timestamp of a log without a parseable one
+MISSING_TS = -(2**63)
+
+# Rows encoded per LogBatch when an iterable of rows is streamed through iter_log_batches()
+STREAM_CHUNK_ROWS = 50_000
+
+_CODE_TYPE = "I"  # 4-byte unsigned codes: up to ~4 billion distinct values per column
+_TS_TYPE = "q"  # int64 epoch milliseconds
+
+
+def epoch_ms(value: Any) -> int:
+    """Epoch milliseconds from an RFC 3339 string, datetime (naive means UTC) or epoch seconds; MISSING_TS if unparseable."""
+    if value is None or value == "":
+        return MISSING_TS
+    if isinstance(value, (int, float)):
+        return int(value * 1000)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return MISSING_TS
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return MISSING_TS
+
+
+def format_ms(ts: int) -> Optional[str]:
+    """RFC 3339 UTC string with milliseconds, as in the log exports; None for MISSING_TS."""
+    if ts == MISSING_TS:
+        return None
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class LogRow:
+    """Read-only dict-like view of one row of a LogBatch, for code that expects log dicts."""
+
+    __slots__ = ("_batch", "_i")
+
+    def __init__(self, batch: "LogBatch", i: int):
+        self._batch = batch
+        self._i = i
+
+    def get(self, name: str, default: Any = None) -> Any:
+        batch = self._batch
+        if name == "timestamp":
+            value = format_ms(batch.timestamps[self._i])
+        elif name in batch.codes:
+            value = batch.values[name][batch.codes[name][self._i]]
+        else:
+            return default
+        return default if value is None else value
+
+    def __getitem__(self, name: str) -> Any:
+        if name != "timestamp" and name not in self._batch.codes:
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name == "timestamp" or name in self._batch.codes
+
+    def keys(self) -> Tuple[str, ...]:
+        return COLUMNS + ("timestamp",)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: self.get(name) for name in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"LogRow({self.to_dict()!r})"
+
+
+class LogBatch:
+    """
+    Columnar, dictionary-encoded batch of logs.
+
+    Each categorical column (COLUMNS) is an array of integer codes into a
+    per-column list of distinct strings, so a value repeated across millions
+    of rows is stored once; timestamps are an int64 array of epoch
+    milliseconds. count_by() groups on the code arrays and only decodes the
+    distinct keys. Iterating yields LogRow views, so code written for lists
+    of log dicts (log.get("region")) keeps working unchanged.
+    """
+
+    __slots__ = ("codes", "values", "timestamps", "_lookup")
+
+    def __init__(self):
+        self.codes: Dict[str, array] = {name: array(_CODE_TYPE) for name in COLUMNS}
+        self.values: Dict[str, List[Optional[str]]] = {name: [None] for name in COLUMNS}
+        self.timestamps: array = array(_TS_TYPE)
+        # Missing values are pre-seeded so append() resolves them without the slow path
+        self._lookup: Dict[str, Dict[Optional[str], int]] = {name: {None: MISSING_CODE, "": MISSING_CODE} for name in COLUMNS}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "LogBatch":
+        """Batch from export rows ({"jsonPayload": {...}, "severity": ...}) or flat log dicts."""
+        batch = cls()
+        batch.extend(rows)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable["LogBatch"]) -> "LogBatch":
+        """One batch holding the rows of all batches, with merged dictionaries."""
+        merged = cls()
+        for batch in batches:
+            merged.append_batch(batch)
+        return merged
+
+    # --- Building ---
+    def encode(self, name: str, value: Any) -> int:
+        """Code of value in column name, adding it to the dictionary if new."""
+        if value is None or value == "":
+            return MISSING_CODE
+        if not isinstance(value, str):
+            value = str(value)
+        lookup = self._lookup[name]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.values[name])
+            self.values[name].append(value)
+        return code
+
+    def append(self, row: Dict[str, Any]) -> None:
+        # log_field() and encode() inlined: this runs once per column per row
+        payload = row.get("jsonPayload")
+        if not isinstance(payload, dict):
+            payload = row
+        lookups = self._lookup
+        for name, column in self.codes.items():
+            value = payload.get(name, row.get(name))
+            try:
+                code = lookups[name][value]
+            except (KeyError, TypeError):
+                code = self.encode(name, value)
+            column.append(code)
+        self.timestamps.append(epoch_ms(payload.get("timestamp", row.get("timestamp"))))
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Append rows; returns how many were added."""
+        if isinstance(rows, LogBatch):
+            return self.append_batch(rows)
+        start = len(self.timestamps)
+        for row in rows:
+            self.append(row)
+        return len(self.timestamps) - start
+
+    def append_batch(self, other: "LogBatch") -> int:
+        """Append another batch's rows, re-coding through a per-column translation table."""
+        for name in COLUMNS:
+            table = [self.encode(name, value) for value in other.values[name]]
+            self.codes[name].extend(array(_CODE_TYPE, map(table.__getitem__, other.codes[name])))
+        self.timestamps.extend(other.timestamps)
+        return len(other)
+
+    # --- Reading ---
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, i: int) -> LogRow:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return LogRow(self, i)
+
+    def __iter__(self) -> Iterator[LogRow]:
+        for i in range(len(self)):
+            yield LogRow(self, i)
+
+    def column(self, name: str) -> List[Optional[str]]:
+        """Decoded values of one column (materialises a list; prefer codes/values for large batches)."""
+        if name == "timestamp":
+            return [format_ms(ts) for ts in self.timestamps]
+        return list(map(self.values[name].__getitem__, self.codes[name]))
+
+    def codes_where(self, name: str, predicate) -> set:
+        """Codes of column name whose (non-missing) value satisfies predicate; evaluated once per distinct value."""
+        return {code for code, value in enumerate(self.values[name]) if value is not None and predicate(value)}
+
+    def count_by(
+        self, *names: str, where: Optional[Dict[str, Union[set, Sequence[str]]]] = None
+    ) -> Counter:
+        """
+        Row counts per distinct combination of the named columns, keyed by decoded value tuples.
+
+        where restricts rows by column: {"severity": {"ERROR", "CRITICAL"}}
+        keeps rows whose severity is one of those values. Grouping runs over
+        the integer codes (filter columns included), and only the distinct
+        keys are decoded and filtered.
+        """
+        where = where or {}
+        filtered = [name for name in where if name not in names]
+        columns = [self.codes[name] for name in (*names, *filtered)]
+        counts = Counter(zip(*columns)) if len(columns) > 1 else Counter((code,) for code in columns[0])
+        decoders = [self.values[name] for name in (*names, *filtered)]
+        if not where:
+            return Counter({tuple(map(getitem, decoders, key)): count for key, count in counts.items()})
+        allowed = [(position, set(where[name])) for position, name in enumerate((*names, *filtered)) if name in where]
+        result: Counter = Counter()
+        for key, count in counts.items():
+            decoded = tuple(map(getitem, decoders, key))
+            if all(decoded[position] in values for position, values in allowed):
+                result[decoded[: len(names)]] += count
+        return result
+
+    def hour_keys(self) -> List[str]:
+        """Per-row UTC hour as "YYYY-MM-DDTHH" (the timestamp[:13] prefix), "" where the timestamp is missing."""
+        cache: Dict[int, str] = {}
+        keys = []
+        for ts in self.timestamps:
+            if ts == MISSING_TS:
+                keys.append("")
+                continue
+            hour = ts // 3_600_000
+            key = cache.get(hour)
+            if key is None:
+                key = cache[hour] = datetime.fromtimestamp(hour * 3600, tz=timezone.utc).strftime("%Y-%m-%dT%H")
+            keys.append(key)
+        return keys
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and dictionaries."""
+        size = self.timestamps.itemsize * len(self.timestamps)
+        for name in COLUMNS:
+            size += self.codes[name].itemsize * len(self.codes[name])
+            size += sum(len(value) for value in self.values[name][1:])
+        return size
+
+    def __repr__(self) -> str:
+        distinct = ", ".join(f"{name}={len(self.values[name]) - 1}" for name in COLUMNS)
+        return f"LogBatch(rows={len(self)}, distinct: {distinct})"
+
+
+def as_log_batch(logs: Union[LogBatch, Iterable[Dict[str, Any]]]) -> LogBatch:
+    """logs as a LogBatch, encoding them if they are not one already."""
+    return logs if isinstance(logs, LogBatch) else LogBatch.from_rows(logs)
+
+
+def iter_log_batches(
+    logs: Union[LogBatch, Iterable[Dict[str, Any]]], chunk_rows: int = STREAM_CHUNK_ROWS
+) -> Iterator[LogBatch]:
+    """logs as LogBatches of up to chunk_rows rows, encoded as they are consumed; a LogBatch is yielded whole."""
+    if isinstance(logs, LogBatch):
+        yield logs
+        return
+    rows = iter(logs)
+    while True:
+        batch = LogBatch()
+        if not batch.extend(islice(rows, chunk_rows)):
+            return
+        yield batch
+
+
+def stream_count_by(
+    logs: Union[LogBatch, Iterable[Dict[str, Any]]],
+    *names: str,
+    where: Optional[Dict[str, Union[set, Sequence[str]]]] = None,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> Counter:
+    """LogBatch.count_by summed over iter_log_batches(logs), so at most one chunk of rows is held at a time."""
+    counts: Counter = Counter()
+    for batch in iter_log_batches(logs, chunk_rows):
+        counts.update(batch.count_by(*names, where=where))
+    return counts
@@ -0,0 +1,325 @@
+# rollups.py
+
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..config import ROLLUP_MINUTE_RETENTION_HOURS
+
+ERROR_SEVERITIES = ("ERROR", "CRITICAL")
+
+# Same substitutions, in the same order, as message_template in mcp-toolbox/rollups.sql.
+# Three-digit numbers survive so "500 Internal Error" and "503 ..." stay distinct templates.
+_TEMPLATE_RULES = (
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "<uuid>"),
+    (re.compile(r"\b[0-9]{1,3}(?:\.[0-9]{1,3}){3}\b"), "<ip>"),
+    (re.compile(r"\b[0-9]+\.[0-9]+\b|\b[0-9]{4,}\b"), "<num>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b"), "<hex>"),
+)
+
+# (bucket_start, agent_id, region, severity, experiment_id, message_template)
+RollupKey = Tuple[Optional[int], Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+def message_template(message: Optional[str]) -> Optional[str]:
+    """Message with ids, addresses and long numbers replaced by placeholders."""
+    if message is None:
+        return None
+    for pattern, placeholder in _TEMPLATE_RULES:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+def log_field(entry: Dict[str, Any], name: str) -> Any:
+    """A payload field from a BigQuery export row ({"jsonPayload": {...}}) or a flat log dict."""
+    payload = entry.get("jsonPayload")
+    if isinstance(payload, dict) and name in payload:
+        return payload[name]
+    return entry.get(name)
+
+
+def parse_epoch_seconds(value: Any) -> Optional[int]:
+    """Epoch seconds from an RFC 3339 string, datetime (naive means UTC) or number; None if unparseable."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return None
+
+
+def log_epoch_seconds(entry: Dict[str, Any]) -> Optional[int]:
+    """Event time of a log: the payload timestamp, falling back to the LogEntry timestamp."""
+    return parse_epoch_seconds(log_field(entry, "timestamp"))
+
+
+def round2(value: float) -> float:
+    """ROUND(x, 2) as BigQuery does it (half away from zero), not Python's banker's rounding."""
+    return float(Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+def format_hour(bucket_start: Optional[int]) -> Optional[str]:
+    if bucket_start is None:
+        return None
+    return datetime.fromtimestamp(bucket_start, tz=timezone.utc).strftime("%Y-%m-%d %H:00:00")
+
+
+def hour_bucket(timestamp: Any, cache: Dict[str, Optional[int]]) -> Optional[int]:
+    """Start of the UTC hour of a log timestamp; "...Z" strings are parsed once per hour prefix in cache."""
+    if isinstance(timestamp, str) and timestamp.endswith("Z") and timestamp[10:11] == "T":
+        prefix = timestamp[:13]
+        if prefix not in cache:
+            ts = parse_epoch_seconds(timestamp)
+            cache[prefix] = None if ts is None else ts - ts % 3600
+        return cache[prefix]
+    ts = parse_epoch_seconds(timestamp)
+    return None if ts is None else ts - ts % 3600
+
+
+def sort_key(value: Any) -> Tuple[bool, Any]:
+    """Tie-break key that sorts NULLs last, like the toolbox rows' ORDER BY ... DESC."""
+    return (value is None, value if value is not None else "")
+
+
+class LogRollups:
+    """
+    Per-minute and per-hour log counts by agent, region, severity, experiment and message template.
+
+    ingest() folds new logs in as they arrive; the query methods mirror the
+    aggregate toolbox tools (same names, columns and ordering) but read the
+    buckets, so their cost grows with distinct bucket keys rather than log
+    rows. Minute buckets older than minute_retention_hours (0 keeps them all)
+    are dropped; hour buckets are kept.
+    """
+
+    def __init__(self, minute_retention_hours: float = ROLLUP_MINUTE_RETENTION_HOURS):
+        self.minute_retention_s = int(minute_retention_hours * 3600)
+        self.minutes: Counter = Counter()
+        self.hours: Counter = Counter()
+        self.rows_ingested = 0
+        self._latest_minute: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # --- Ingest ---
+    @staticmethod
+    def _key(entry: Dict[str, Any], bucket_start: Optional[int]) -> RollupKey:
+        return (
+            bucket_start,
+            log_field(entry, "agent_id"),
+            log_field(entry, "region"),
+            entry.get("severity"),
+            log_field(entry, "experiment_id"),
+            message_template(log_field(entry, "message")),
+        )
+
+    def ingest(self, logs: Iterable[Dict[str, Any]]) -> int:
+        """Add logs to the rollups; returns how many were added."""
+        minutes: Counter = Counter()
+        added = 0
+        for entry in logs:
+            ts = log_epoch_seconds(entry)
+            minutes[self._key(entry, None if ts is None else ts - ts % 60)] += 1
+            added += 1
+        with self._lock:
+            for key, count in minutes.items():
+                self.minutes[key] += count
+                minute = key[0]
+                self.hours[(None if minute is None else minute - minute % 3600,) + key[1:]] += count
+                if minute is not None and (self._latest_minute is None or minute > self._latest_minute):
+                    self._latest_minute = minute
+            self.rows_ingested += added
+            self._expire_minutes()
+        return added
+
+    def _expire_minutes(self) -> None:
+        if self._latest_minute is None or not self.minute_retention_s:
+            return
+        cutoff = self._latest_minute - self.minute_retention_s
+        for key in [k for k in self.minutes if k[0] is not None and k[0] < cutoff]:
+            del self.minutes[key]
+
+    def buckets(
+        self, granularity: str = "hour", since: Optional[int] = None, until: Optional[int] = None
+    ) -> List[Tuple[RollupKey, int]]:
+        """Snapshot of (key, count) buckets with since <= bucket_start < until."""
+        with self._lock:
+            items = list((self.minutes if granularity == "minute" else self.hours).items())
+        if since is None and until is None:
+            return items
+        return [
+            (key, count)
+            for key, count in items
+            if key[0] is not None
+            and (since is None or key[0] >= since)
+            and (until is None or key[0] < until)
+        ]
+
+    def window_buckets(self, since: Optional[int] = None, until: Optional[int] = None) -> List[Tuple[RollupKey, int]]:
+        """
+        Snapshot of the buckets covering since <= t < until, like chaospilot_log_rollup_window in rollups.sql.
+
+        Whole hours come from the hour buckets and the partial hours at either
+        edge from the minute buckets, so the window is rounded out to the
+        minute; an edge whose minute buckets have expired is rounded out to
+        its hour instead.
+        """
+        if since is None and until is None:
+            return self.buckets()
+        with self._lock:
+            minutes_from = (
+                self._latest_minute - self.minute_retention_s
+                if self._latest_minute is not None and self.minute_retention_s
+                else None
+            )
+
+        def has_minutes(hour: int) -> bool:
+            return minutes_from is None or hour >= minutes_from
+
+        hour_from = hour_to = None
+        if since is not None:
+            hour_from = since - since % 3600
+            if since != hour_from and has_minutes(hour_from):
+                hour_from += 3600
+        if until is not None:
+            hour_to = until - until % 3600
+            if until != hour_to and not has_minutes(hour_to):
+                hour_to += 3600
+        edges = [
+            (key, count)
+            for key, count in self.buckets("minute", None if since is None else since - since % 60, until)
+            if (hour_from is not None and key[0] < hour_from) or (hour_to is not None and key[0] >= hour_to)
+        ]
+        if hour_from is not None and hour_to is not None and hour_from >= hour_to:
+            return edges
+        return self.buckets("hour", hour_from, hour_to) + edges
+
+    def _group(
+        self,
+        fields: Callable[[RollupKey], tuple],
+        errors_only: bool = False,
+        **window: Optional[int],
+    ) -> Dict[tuple, int]:
+        groups: Dict[tuple, int] = defaultdict(int)
+        for key, count in self.window_buckets(**window):
+            if errors_only and key[3] not in ERROR_SEVERITIES:
+                continue
+            groups[fields(key)] += count
+        return groups
+
+    # --- Queries (mirror mcp-toolbox/tools.yaml) ---
+    def total_error_logs(self, **window) -> List[Dict[str, Any]]:
+        total = sum(self._group(lambda k: (), errors_only=True, **window).values())
+        return [{"total_error_logs": total}]
+
+    def errors_logs_grouped_by_severity(self, **window) -> List[Dict[str, Any]]:
+        groups = self._group(lambda k: (k[3],), errors_only=True, **window)
+        return [{"severity": severity, "count": count} for (severity,), count in groups.items()]
+
+    def critical_error_logs_grouped_by_region(self, **window) -> List[Dict[str, Any]]:
+        groups = self._group(lambda k: (k[2], k[3]), errors_only=True, **window)
+        return [
+            {"region": region, "severity": severity, "count": count}
+            for (region, severity), count in groups.items()
+        ]
+
+    def most_frequent_error_types(self, limit: int = 5, **window) -> List[Dict[str, Any]]:
+        groups = self._group(lambda k: (k[5], k[2]), errors_only=True, **window)
+        counts: Dict[Optional[str], int] = defaultdict(int)
+        regions: Dict[Optional[str], List[str]] = defaultdict(list)
+        for (template, region), count in groups.items():
+            counts[template] += count
+            if region is not None:
+                regions[template].append(region)
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], sort_key(item[0])))[:limit]
+        return [
+            {"failure_type": template, "count": count, "regions": ",".join(sorted(regions[template])) or None}
+            for template, count in ranked
+        ]
+
+    def agent_failure_rate(self, **window) -> List[Dict[str, Any]]:
+        totals = self._group(lambda k: (k[1],), **window)
+        errors = self._group(lambda k: (k[1],), errors_only=True, **window)
+        rows = [
+            {
+                "agent_id": agent_id,
+                "total_logs": total,
+                "error_count": errors.get((agent_id,), 0),
+                "failure_rate": round2(errors.get((agent_id,), 0) / total),
+            }
+            for (agent_id,), total in totals.items()
+        ]
+        return sorted(rows, key=lambda r: (-r["failure_rate"], sort_key(r["agent_id"])))
+
+    def incidents_by_agent_and_experiment(self, **window) -> List[Dict[str, Any]]:
+        groups = self._group(lambda k: (k[1], k[4], k[3], k[2]), **window)
+        rows = [
+            {"agent_id": agent, "experiment_id": experiment, "severity": severity, "region": region, "log_count": count}
+            for (agent, experiment, severity, region), count in groups.items()
+        ]
+        return sorted(rows, key=lambda r: (-r["log_count"], *(sort_key(r[c]) for c in ("agent_id", "experiment_id", "severity", "region"))))
+
+    def error_trends_by_agent(self, **window) -> List[Dict[str, Any]]:
+        groups = self._group(
+            lambda k: (k[1], k[3], None if k[0] is None else k[0] - k[0] % 3600), errors_only=True, **window
+        )
+        rows = [
+            {"agent_id": agent, "severity": severity, "hour": format_hour(hour), "count": count}
+            for (agent, severity, hour), count in groups.items()
+        ]
+        rows.sort(key=lambda r: (sort_key(r["agent_id"]), sort_key(r["severity"])))
+        rows.sort(key=lambda r: r["count"], reverse=True)
+        rows.sort(key=lambda r: (r["hour"] is not None, r["hour"] or ""), reverse=True)
+        return rows
+
+    def top_regions_by_error(self, **window) -> List[Dict[str, Any]]:
+        groups = self._group(lambda k: (k[2], k[3]), errors_only=True, **window)
+        rows = [
+            {"region": region, "severity": severity, "error_count": count}
+            for (region, severity), count in groups.items()
+        ]
+        return sorted(rows, key=lambda r: (-r["error_count"], sort_key(r["region"]), sort_key(r["severity"])))
+
+    def as_tools(self) -> List[Callable[..., List[Dict[str, Any]]]]:
+        """
+        The query methods as functions named like their toolbox tools, for FunctionTool.
+
+        They take the same start_time/end_time window parameters as the toolbox
+        tools; empty means unbounded here, since local rollups only hold what
+        was ingested.
+        """
+
+        def make_tool(name: str, description: str) -> Callable[..., List[Dict[str, Any]]]:
+            method = getattr(self, name)
+
+            def tool(start_time: str = "", end_time: str = "") -> List[Dict[str, Any]]:
+                return method(since=parse_epoch_seconds(start_time), until=parse_epoch_seconds(end_time))
+
+            tool.__name__ = name
+            tool.__doc__ = description
+            return tool
+
+        return [make_tool(name, description) for name, description in ROLLUP_TOOLS.items()]
+
+
+# Toolbox tools that LogRollups (and the rollup tables in BigQuery) can answer, with their descriptions
+ROLLUP_TOOLS: Dict[str, str] = {
+    "total_error_logs": "Total ERROR and CRITICAL logs.",
+    "errors_logs_grouped_by_severity": "Errors grouped by severity.",
+    "critical_error_logs_grouped_by_region": "Count of errors by region and severity.",
+    "most_frequent_error_types": "Most frequent error message templates by count (ids and numbers collapsed).",
+    "agent_failure_rate": "Failure rate per agent.",
+    "incidents_by_agent_and_experiment": "Count of logs by agent and experiment, grouped by severity and region.",
+    "error_trends_by_agent": "Error and critical log trends by agent over time.",
+    "top_regions_by_error": "Top regions by error and critical log count.",
+}
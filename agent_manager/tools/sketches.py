@@ -0,0 +1,543 @@
+# sketches.py
+
+import hashlib
+import math
+import threading
+from array import array
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from ..config import SKETCH_CMS_DELTA, SKETCH_CMS_EPSILON, SKETCH_HLL_PRECISION, SKETCH_RETENTION_HOURS
+from .rollups import ERROR_SEVERITIES, hour_bucket, log_field, parse_epoch_seconds
+
+# Standard errors reported as error bounds (~95% confidence for HyperLogLog)
+CONFIDENCE_SIGMAS = 2
+
+
+def hash64(value: Any) -> int:
+    """Stable 64-bit hash (unlike hash(), the same in every process, so sketches from different shards merge)."""
+    data = value if isinstance(value, bytes) else str(value).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch in at most 2**precision one-byte registers (16 KiB at the default precision 14).
+
+    The estimate's relative standard error is 1.04 / sqrt(2**precision),
+    about 0.8% at precision 14, however many values are added. Small
+    sketches stay sparse, as a packed array of the registers set so far
+    (4 bytes each), and switch to dense registers once that would be
+    smaller, so a sketch per experiment-hour costs little when each sees a
+    few hundred users. Sketches with the same precision merge by taking
+    register maxima, so shards and time buckets can be sketched separately
+    and combined afterwards.
+    """
+
+    __slots__ = ("precision", "registers", "_sparse")
+
+    def __init__(self, precision: int = SKETCH_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        # Dense registers, or None while the sketch is sparse
+        self.registers: Optional[bytearray] = None
+        # Sparse entries packed as index << 6 | rank, possibly repeating an index until compacted
+        self._sparse: Optional[array] = array("I")
+
+    def _set(self, index: int, rank: int) -> None:
+        registers = self.registers
+        if registers is not None:
+            if rank > registers[index]:
+                registers[index] = rank
+            return
+        sparse = self._sparse
+        sparse.append(index << 6 | rank)
+        # Compact once the array holds as many bytes as the dense registers would
+        if len(sparse) * 4 > 1 << self.precision:
+            self._compact()
+
+    def _compact(self) -> None:
+        best: Dict[int, int] = {}
+        for packed in self._sparse:
+            index, rank = packed >> 6, packed & 63
+            if rank > best.get(index, 0):
+                best[index] = rank
+        if len(best) * 8 > 1 << self.precision:
+            self.registers = bytearray(1 << self.precision)
+            for index, rank in best.items():
+                self.registers[index] = rank
+            self._sparse = None
+        else:
+            self._sparse = array("I", sorted(index << 6 | rank for index, rank in best.items()))
+
+    def _densify(self) -> bytearray:
+        if self.registers is None:
+            registers = bytearray(1 << self.precision)
+            for packed in self._sparse:
+                index, rank = packed >> 6, packed & 63
+                if rank > registers[index]:
+                    registers[index] = rank
+            self.registers, self._sparse = registers, None
+        return self.registers
+
+    def add(self, value: Any) -> None:
+        if value is None or value == "":
+            return
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h: int) -> None:
+        """Add a value by its hash64(), for callers that hash each value once for several sketches."""
+        suffix_bits = 64 - self.precision
+        # Rank: position of the first 1 bit in the bits after the register index
+        self._set(h >> suffix_bits, suffix_bits - (h & ((1 << suffix_bits) - 1)).bit_length() + 1)
+
+    def update(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold other into this sketch (in place); returns self."""
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLogs of the same precision can be merged")
+        if other.registers is None:
+            for packed in other._sparse:
+                self._set(packed >> 6, packed & 63)
+        else:
+            self.registers = bytearray(map(max, self._densify(), other.registers))
+        return self
+
+    def copy(self) -> "HyperLogLog":
+        sketch = HyperLogLog(self.precision)
+        if self.registers is None:
+            sketch._sparse = array("I", self._sparse)
+        else:
+            sketch.registers, sketch._sparse = bytearray(self.registers), None
+        return sketch
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.registers) if self.registers is not None else 4 * len(self._sparse)
+
+    def estimate(self) -> float:
+        m = 1 << self.precision
+        if self.registers is None:
+            self._compact()
+        if self.registers is None:
+            # At most m/8 registers are set: linear counting over the empty ones
+            return m * math.log(m / (m - len(self._sparse)))
+        registers = self.registers
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        # Registers hold small ranks, so sum 2**-rank per distinct rank rather than per register
+        harmonic = sum(registers.count(rank) * 2.0**-rank for rank in set(registers))
+        raw = alpha * m * m / harmonic
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            return m * math.log(m / zeros)
+        return raw
+
+    def count(self) -> int:
+        return round(self.estimate())
+
+    def error_bound(self) -> int:
+        """± bound on count() at CONFIDENCE_SIGMAS standard errors."""
+        return math.ceil(CONFIDENCE_SIGMAS * self.relative_error * self.estimate())
+
+    def to_bytes(self) -> bytes:
+        """Dense serialised form: precision byte, then the registers."""
+        return bytes([self.precision]) + bytes(self.copy()._densify())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(data[0])
+        sketch.registers, sketch._sparse = bytearray(data[1:]), None
+        return sketch
+
+    def __repr__(self) -> str:
+        return f"HyperLogLog(precision={self.precision}, estimate={self.count()})"
+
+
+class CountMinSketch:
+    """
+    Frequency sketch: depth rows of width counters, sized from (epsilon, delta).
+
+    estimate(key) never undercounts, and overcounts by more than
+    epsilon * total only with probability delta. Sketches with the same
+    dimensions merge by adding counters. Memory is 8 * width * depth bytes
+    (about 106 KiB at epsilon 0.001, delta 0.01) whatever the number of keys.
+    """
+
+    __slots__ = ("width", "depth", "counters", "total")
+
+    def __init__(self, epsilon: float = SKETCH_CMS_EPSILON, delta: float = SKETCH_CMS_DELTA):
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.counters = array("Q", bytes(8 * self.width * self.depth))
+        self.total = 0
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _cells(self, key: Hashable) -> List[int]:
+        # Double hashing: row i uses h1 + i * h2, from one 128-bit digest
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        counters = self.counters
+        for cell in self._cells(key):
+            counters[cell] += count
+        self.total += count
+
+    def estimate(self, key: Hashable) -> int:
+        counters = self.counters
+        return min(counters[cell] for cell in self._cells(key))
+
+    def error_bound(self) -> int:
+        """Maximum overcount of estimate(), except with probability delta."""
+        return math.ceil(self.epsilon * self.total)
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        """Fold other into this sketch (in place); returns self."""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Only Count-Min sketches of the same width and depth can be merged")
+        self.counters = array("Q", map(int.__add__, self.counters, other.counters))
+        self.total += other.total
+        return self
+
+    def copy(self) -> "CountMinSketch":
+        sketch = CountMinSketch.__new__(CountMinSketch)
+        sketch.width, sketch.depth, sketch.total = self.width, self.depth, self.total
+        sketch.counters = array("Q", self.counters)
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        header = self.width.to_bytes(4, "little") + self.depth.to_bytes(4, "little") + self.total.to_bytes(8, "little")
+        return header + self.counters.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinSketch":
+        sketch = cls.__new__(cls)
+        sketch.width = int.from_bytes(data[0:4], "little")
+        sketch.depth = int.from_bytes(data[4:8], "little")
+        sketch.total = int.from_bytes(data[8:16], "little")
+        sketch.counters = array("Q")
+        sketch.counters.frombytes(data[16:])
+        return sketch
+
+
+def log_user_id(entry: Dict[str, Any]) -> Any:
+    """jsonPayload.details.user_id of a log, or None."""
+    details = log_field(entry, "details")
+    return details.get("user_id") if isinstance(details, dict) else None
+
+
+def _merge_into(target: Dict[Any, Any], key: Any, sketch: Any) -> None:
+    if key in target:
+        target[key].merge(sketch)
+    else:
+        target[key] = sketch.copy()
+
+
+class SeveritySketch:
+    """Events of one severity in one hour: exact count and regions, sketched agents, experiments and users."""
+
+    __slots__ = ("count", "regions", "agents", "experiments", "users")
+
+    def __init__(self, precision: int):
+        self.count = 0
+        self.regions: Set[str] = set()
+        self.agents = HyperLogLog(precision)
+        self.experiments = HyperLogLog(precision)
+        self.users = HyperLogLog(precision)
+
+    def merge(self, other: "SeveritySketch") -> "SeveritySketch":
+        self.count += other.count
+        self.regions |= other.regions
+        self.agents.merge(other.agents)
+        self.experiments.merge(other.experiments)
+        self.users.merge(other.users)
+        return self
+
+    def copy(self) -> "SeveritySketch":
+        return SeveritySketch(self.agents.precision).merge(self)
+
+
+class ExperimentSketch:
+    """Events with a user id for one experiment in one hour, and its sketched distinct users."""
+
+    __slots__ = ("events", "users")
+
+    def __init__(self, precision: int):
+        self.events = 0
+        self.users = HyperLogLog(precision)
+
+    def merge(self, other: "ExperimentSketch") -> "ExperimentSketch":
+        self.events += other.events
+        self.users.merge(other.users)
+        return self
+
+    def copy(self) -> "ExperimentSketch":
+        return ExperimentSketch(self.users.precision).merge(self)
+
+
+class ImpactSketches:
+    """
+    Hourly sketches behind the user-impact and chaos-summary aggregates.
+
+    Mirrors system_chaos_summary, user_impact_by_experiment and
+    user_impact_summary from mcp-toolbox/tools.yaml without a set of user,
+    agent or experiment ids per key: distinct counts come from HyperLogLogs
+    and per-user event counts from Count-Min sketches, each a fixed size per
+    (hour, severity) or (hour, experiment) bucket. Every estimated column
+    has a matching `<column>_error` bound (± for distinct counts at
+    CONFIDENCE_SIGMAS standard errors, maximum overcount for per-user
+    counts). Buckets and whole ImpactSketches merge, so shards can be
+    sketched separately; hour buckets older than retention_hours behind
+    the newest one (0 keeps them all) are dropped.
+    """
+
+    def __init__(
+        self,
+        precision: int = SKETCH_HLL_PRECISION,
+        epsilon: float = SKETCH_CMS_EPSILON,
+        delta: float = SKETCH_CMS_DELTA,
+        retention_hours: float = SKETCH_RETENTION_HOURS,
+    ):
+        self.precision = precision
+        self.epsilon = epsilon
+        self.delta = delta
+        self.retention_s = int(retention_hours * 3600)
+        self.severities: Dict[Tuple[Optional[int], Optional[str]], SeveritySketch] = {}
+        self.experiments: Dict[Tuple[Optional[int], Optional[str]], ExperimentSketch] = {}
+        # Error events per user, per (hour, severity) for ERROR and CRITICAL
+        self.user_events: Dict[Tuple[Optional[int], str], CountMinSketch] = {}
+        self.rows_ingested = 0
+        self._latest_hour: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # --- Ingest ---
+    def ingest(self, logs: Iterable[Dict[str, Any]]) -> int:
+        """Add logs (export rows or flat log dicts); returns how many were added."""
+        # Values are deduplicated per bucket within the call, and each distinct value is
+        # hashed once, so a call costs one hash per distinct user rather than per row
+        counts: Dict[tuple, int] = defaultdict(int)
+        values: Dict[tuple, Set[Any]] = defaultdict(set)
+        experiment_events: Dict[tuple, int] = defaultdict(int)
+        user_events: Dict[tuple, Dict[Any, int]] = defaultdict(lambda: defaultdict(int))
+        hours: Dict[str, Optional[int]] = {}
+        added = 0
+        for entry in logs:
+            hour = hour_bucket(log_field(entry, "timestamp"), hours)
+            severity = entry.get("severity")
+            key = (hour, severity)
+            counts[key] += 1
+            region = log_field(entry, "region")
+            if region is not None:
+                values[key + ("region",)].add(region)
+            values[key + ("agent",)].add(log_field(entry, "agent_id"))
+            experiment = log_field(entry, "experiment_id")
+            values[key + ("experiment",)].add(experiment)
+            user = log_user_id(entry)
+            if user is not None:
+                values[key + ("user",)].add(user)
+                values[(hour, experiment, "experiment_user")].add(user)
+                experiment_events[(hour, experiment)] += 1
+                if severity in ERROR_SEVERITIES:
+                    user_events[key][user] += 1
+            added += 1
+
+        hashes: Dict[Any, int] = {}
+
+        def add_all(sketch: HyperLogLog, distinct: Iterable[Any]) -> None:
+            for value in distinct:
+                if value is None or value == "":
+                    continue
+                h = hashes.get(value)
+                if h is None:
+                    h = hashes[value] = hash64(value)
+                sketch.add_hash(h)
+
+        with self._lock:
+            for key, count in counts.items():
+                sketch = self.severities.get(key)
+                if sketch is None:
+                    sketch = self.severities[key] = SeveritySketch(self.precision)
+                sketch.count += count
+                sketch.regions |= values.get(key + ("region",), set())
+                add_all(sketch.agents, values.get(key + ("agent",), ()))
+                add_all(sketch.experiments, values.get(key + ("experiment",), ()))
+                add_all(sketch.users, values.get(key + ("user",), ()))
+                hour = key[0]
+                if hour is not None and (self._latest_hour is None or hour > self._latest_hour):
+                    self._latest_hour = hour
+            for key, events in experiment_events.items():
+                sketch = self.experiments.get(key)
+                if sketch is None:
+                    sketch = self.experiments[key] = ExperimentSketch(self.precision)
+                sketch.events += events
+                add_all(sketch.users, values[key + ("experiment_user",)])
+            for key, per_user in user_events.items():
+                sketch = self.user_events.get(key)
+                if sketch is None:
+                    sketch = self.user_events[key] = CountMinSketch(self.epsilon, self.delta)
+                for user, count in per_user.items():
+                    sketch.add(user, count)
+            self.rows_ingested += added
+            self._expire()
+        return added
+
+    def _expire(self) -> None:
+        if self._latest_hour is None or not self.retention_s:
+            return
+        cutoff = self._latest_hour - self.retention_s
+        for buckets in (self.severities, self.experiments, self.user_events):
+            for key in [k for k in buckets if k[0] is not None and k[0] < cutoff]:
+                del buckets[key]
+
+    def merge(self, other: "ImpactSketches") -> "ImpactSketches":
+        """Fold another shard's sketches into these (in place); returns self."""
+        with self._lock:
+            for mine, theirs in (
+                (self.severities, other.severities),
+                (self.experiments, other.experiments),
+                (self.user_events, other.user_events),
+            ):
+                for key, sketch in list(theirs.items()):
+                    _merge_into(mine, key, sketch)
+            self.rows_ingested += other.rows_ingested
+            if other._latest_hour is not None and (self._latest_hour is None or other._latest_hour > self._latest_hour):
+                self._latest_hour = other._latest_hour
+            self._expire()
+        return self
+
+    # --- Queries (mirror mcp-toolbox/tools.yaml) ---
+    def _window(self, buckets: Dict[tuple, Any], since: Optional[int], until: Optional[int]) -> Dict[Any, Any]:
+        """Buckets with since <= hour < until, merged per key without the hour."""
+        with self._lock:
+            items = [
+                (key, sketch)
+                for key, sketch in buckets.items()
+                if (since is None and until is None)
+                or (key[0] is not None and (since is None or key[0] >= since) and (until is None or key[0] < until))
+            ]
+            merged: Dict[Any, Any] = {}
+            for key, sketch in items:
+                _merge_into(merged, key[1], sketch)
+        return merged
+
+    def system_chaos_summary(self, since: Optional[int] = None, until: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = []
+        for severity, sketch in self._window(self.severities, since, until).items():
+            rows.append(
+                {
+                    "severity": severity,
+                    "count": sketch.count,
+                    "affected_agents": sketch.agents.count(),
+                    "affected_agents_error": sketch.agents.error_bound(),
+                    "affected_experiments": sketch.experiments.count(),
+                    "affected_experiments_error": sketch.experiments.error_bound(),
+                    "involved_regions": ",".join(sorted(sketch.regions)) or None,
+                }
+            )
+        return sorted(rows, key=lambda r: r["count"], reverse=True)
+
+    def user_impact_by_experiment(self, since: Optional[int] = None, until: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = [
+            {
+                "experiment_id": experiment,
+                "affected_users": sketch.users.count(),
+                "affected_users_error": sketch.users.error_bound(),
+                "total_events": sketch.events,
+            }
+            for experiment, sketch in self._window(self.experiments, since, until).items()
+        ]
+        return sorted(rows, key=lambda r: r["affected_users"], reverse=True)
+
+    def user_impact_summary(
+        self, user_ids: Iterable[Any] = (), since: Optional[int] = None, until: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Error impact on users: the given users' estimated event counts, or one row for all users.
+
+        Per-user counts never undercount; `*_error` is their maximum
+        overcount (except with probability delta). Without user_ids the row
+        holds the sketched number of affected users and exact event totals.
+        """
+        severities = self._window(self.severities, since, until)
+        per_severity = self._window(self.user_events, since, until)
+        critical, error = per_severity.get("CRITICAL"), per_severity.get("ERROR")
+        user_ids = list(user_ids)
+        if not user_ids:
+            users = HyperLogLog(self.precision)
+            for severity in ERROR_SEVERITIES:
+                if severity in severities:
+                    users.merge(severities[severity].users)
+            return [
+                {
+                    "affected_users": users.count(),
+                    "affected_users_error": users.error_bound(),
+                    "total_events": sum(s.total for s in (critical, error) if s is not None),
+                    "critical_events": critical.total if critical else 0,
+                    "error_events": error.total if error else 0,
+                }
+            ]
+        rows = []
+        for user in user_ids:
+            critical_events = critical.estimate(user) if critical else 0
+            error_events = error.estimate(user) if error else 0
+            rows.append(
+                {
+                    "user_id": user,
+                    "total_events": critical_events + error_events,
+                    "critical_events": critical_events,
+                    "critical_events_error": critical.error_bound() if critical else 0,
+                    "error_events": error_events,
+                    "error_events_error": error.error_bound() if error else 0,
+                }
+            )
+        return sorted(rows, key=lambda r: r["critical_events"], reverse=True)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the sketches."""
+        with self._lock:
+            hll = sum(s.agents.nbytes + s.experiments.nbytes + s.users.nbytes for s in self.severities.values())
+            hll += sum(s.users.nbytes for s in self.experiments.values())
+            return hll + sum(len(s.counters) * s.counters.itemsize for s in self.user_events.values())
+
+    def as_tools(self) -> List[Callable[..., List[Dict[str, Any]]]]:
+        """The aggregate queries as functions named like their toolbox tools, for FunctionTool (see LogRollups.as_tools)."""
+
+        def make_tool(name: str, description: str) -> Callable[..., List[Dict[str, Any]]]:
+            method = getattr(self, name)
+
+            def tool(start_time: str = "", end_time: str = "") -> List[Dict[str, Any]]:
+                return method(since=parse_epoch_seconds(start_time), until=parse_epoch_seconds(end_time))
+
+            tool.__name__ = name
+            tool.__doc__ = description
+            return tool
+
+        return [make_tool(name, description) for name, description in SKETCH_TOOLS.items()]
+
+
+# Toolbox tools that ImpactSketches can answer (approximately, with error bounds), with their descriptions
+SKETCH_TOOLS: Dict[str, str] = {
+    "system_chaos_summary": "Per-severity log counts with estimated distinct agents and experiments (± *_error) and regions.",
+    "user_impact_by_experiment": "Estimated distinct affected users (± affected_users_error) and events per experiment.",
+    "user_impact_summary": "Estimated distinct users affected by ERROR/CRITICAL logs (± affected_users_error) and event totals.",
+}
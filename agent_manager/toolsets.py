@@ -0,0 +1,47 @@
+# toolsets.py
+
+import asyncio
+import threading
+from typing import List, Optional
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import FunctionTool
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+
+from .config import get_toolbox
+
+
+class LazyToolboxToolset(BaseToolset):
+    """
+    Toolbox toolset that is loaded over HTTP the first time an agent asks for its tools.
+
+    Replaces calling toolbox.load_toolset() at import, which made every import
+    of agent_manager depend on a reachable toolbox server.
+    """
+
+    def __init__(self, toolset_name: str):
+        super().__init__()
+        self.toolset_name = toolset_name
+        self._tools: Optional[List[BaseTool]] = None
+        # A thread lock, not asyncio.Lock: the sync wrappers run each call on a new loop
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[BaseTool]:
+        with self._lock:
+            if self._tools is None:
+                self._tools = [
+                    tool if isinstance(tool, BaseTool) else FunctionTool(func=tool)
+                    for tool in get_toolbox().load_toolset(self.toolset_name)
+                ]
+            return self._tools
+
+    async def get_tools(
+        self, readonly_context: Optional[ReadonlyContext] = None
+    ) -> List[BaseTool]:
+        if self._tools is None:
+            return await asyncio.to_thread(self._load)
+        return self._tools
+
+    async def close(self) -> None:
+        self._tools = None
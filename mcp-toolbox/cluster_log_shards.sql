@@ -0,0 +1,19 @@
+-- Re-cluster the previous day's log export shard on severity.
+--
+-- Run daily as a BigQuery scheduled query (after midnight UTC, once the sink
+-- has moved on to the new day's shard). Most tools filter on severity, so
+-- clustered shards let BigQuery skip the blocks of other severities within
+-- the days the _TABLE_SUFFIX window already selected.
+--
+-- Clustering columns must be top-level, and experiment_id only exists as
+-- jsonPayload.experiment_id in the sink schema; per-experiment queries are
+-- served from the rollup tables (rollups.sql), which cluster on it.
+-- Pass a different date to backfill older shards.
+
+DECLARE shard STRING DEFAULT FORMAT_DATE('%Y%m%d', DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY));
+
+EXECUTE IMMEDIATE FORMAT("""
+  CREATE OR REPLACE TABLE `aceti-462716.bqexport.chaospilot_fake_logs_%s`
+  CLUSTER BY severity
+  AS SELECT * FROM `aceti-462716.bqexport.chaospilot_fake_logs_%s`
+""", shard, shard);
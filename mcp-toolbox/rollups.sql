@@ -0,0 +1,80 @@
+-- Rollup tables behind the aggregate tools in tools.yaml.
+--
+-- Run this file once. Then schedule rollups_refresh.sql as a BigQuery
+-- scheduled query (every 5 minutes is plenty): it rebuilds only the
+-- buckets from the last two hours onwards, so late-arriving logs are picked up
+-- and each run scans just the newest date shards. The aggregate tools then
+-- read a few thousand bucket rows instead of every log.
+--
+-- The tables start empty, and the scheduled refresh only fills the last two
+-- hours: until rollups_refresh.sql has been run once as a backfill (with
+-- refresh_from set to the oldest shard's date), every rollup-backed tool
+-- returns empty or partial results for older windows. Run the backfill
+-- before pointing agents at the new tools.yaml.
+--
+-- most_frequent_error_types groups on message_template rather than the raw
+-- message (as it did before the rollups), so messages differing only in ids,
+-- addresses or numbers are counted as one failure type. This is a deliberate
+-- change in its output, not an equivalent rewrite.
+--
+-- message_template must stay in step with _TEMPLATE_RULES in
+-- agent_manager/tools/rollups.py (the local, in-process rollups).
+
+CREATE TABLE IF NOT EXISTS `aceti-462716.bqexport.chaospilot_log_rollup_minute` (
+  bucket_start TIMESTAMP NOT NULL,
+  agent_id STRING,
+  region STRING,
+  severity STRING,
+  experiment_id STRING,
+  message_template STRING,
+  log_count INT64 NOT NULL
+)
+PARTITION BY DATE(bucket_start)
+CLUSTER BY severity, experiment_id, agent_id, region
+OPTIONS (partition_expiration_days = 2);
+
+CREATE TABLE IF NOT EXISTS `aceti-462716.bqexport.chaospilot_log_rollup_hour` (
+  bucket_start TIMESTAMP NOT NULL,
+  agent_id STRING,
+  region STRING,
+  severity STRING,
+  experiment_id STRING,
+  message_template STRING,
+  log_count INT64 NOT NULL
+)
+PARTITION BY DATE(bucket_start)
+CLUSTER BY severity, experiment_id, agent_id, region;
+
+CREATE OR REPLACE FUNCTION `aceti-462716.bqexport.message_template`(message STRING) AS (
+  REGEXP_REPLACE(
+    REGEXP_REPLACE(
+      REGEXP_REPLACE(
+        REGEXP_REPLACE(message, r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}', '<uuid>'),
+        r'\b[0-9]{1,3}(?:\.[0-9]{1,3}){3}\b', '<ip>'),
+      r'\b[0-9]+\.[0-9]+\b|\b[0-9]{4,}\b', '<num>'),
+    r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b', '<hex>')
+);
+
+-- Rollup rows for the window [start_ts, end_ts): whole hours from the hour table,
+-- the partial hours at either edge from the minute table, so a window is rounded
+-- out to the minute rather than the hour. Minute partitions expire after two
+-- days, so an edge older than yesterday falls back to its whole hour bucket.
+-- Mirrors LogRollups.window_buckets in agent_manager/tools/rollups.py.
+CREATE OR REPLACE TABLE FUNCTION `aceti-462716.bqexport.chaospilot_log_rollup_window`(start_ts TIMESTAMP, end_ts TIMESTAMP) AS (
+  WITH edges AS (
+    SELECT
+      IF(start_ts = TIMESTAMP_TRUNC(start_ts, HOUR) OR TIMESTAMP_TRUNC(start_ts, HOUR) < minutes_from,
+        TIMESTAMP_TRUNC(start_ts, HOUR), TIMESTAMP_ADD(TIMESTAMP_TRUNC(start_ts, HOUR), INTERVAL 1 HOUR)) AS hour_from,
+      IF(end_ts = TIMESTAMP_TRUNC(end_ts, HOUR) OR TIMESTAMP_TRUNC(end_ts, HOUR) >= minutes_from,
+        TIMESTAMP_TRUNC(end_ts, HOUR), TIMESTAMP_ADD(TIMESTAMP_TRUNC(end_ts, HOUR), INTERVAL 1 HOUR)) AS hour_to
+    FROM (SELECT TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)) AS minutes_from)
+  )
+  SELECT h.*
+  FROM `aceti-462716.bqexport.chaospilot_log_rollup_hour` AS h, edges
+  WHERE h.bucket_start >= edges.hour_from AND h.bucket_start < edges.hour_to
+  UNION ALL
+  SELECT m.*
+  FROM `aceti-462716.bqexport.chaospilot_log_rollup_minute` AS m, edges
+  WHERE m.bucket_start >= TIMESTAMP_TRUNC(start_ts, MINUTE) AND m.bucket_start < end_ts
+    AND (m.bucket_start < edges.hour_from OR m.bucket_start >= edges.hour_to)
+);
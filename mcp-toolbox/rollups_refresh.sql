@@ -0,0 +1,44 @@
+-- Incremental refresh of the rollup tables created by rollups.sql; run as a scheduled query.
+-- Rebuilds every bucket from refresh_from on, so reruns are idempotent.
+-- For the first run, backfill by setting refresh_from to the oldest shard's date: hour
+-- buckets are built straight from the log shards, so the backfill covers the whole
+-- history, while minute buckets are only rebuilt for the two days their table keeps.
+DECLARE refresh_from TIMESTAMP DEFAULT TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 2 HOUR), HOUR);
+DECLARE minute_from TIMESTAMP DEFAULT GREATEST(refresh_from, TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 2 DAY), HOUR));
+
+BEGIN TRANSACTION;
+
+DELETE FROM `aceti-462716.bqexport.chaospilot_log_rollup_minute` WHERE bucket_start >= minute_from;
+
+INSERT INTO `aceti-462716.bqexport.chaospilot_log_rollup_minute`
+SELECT
+  TIMESTAMP_TRUNC(COALESCE(TIMESTAMP(jsonPayload.timestamp), timestamp), MINUTE) AS bucket_start,
+  jsonPayload.agent_id,
+  jsonPayload.region,
+  severity,
+  jsonPayload.experiment_id,
+  `aceti-462716.bqexport.message_template`(jsonPayload.message) AS message_template,
+  COUNT(*) AS log_count
+FROM `aceti-462716.bqexport.chaospilot_fake_logs_*`
+WHERE _TABLE_SUFFIX >= FORMAT_DATE('%Y%m%d', DATE(minute_from))
+  AND COALESCE(TIMESTAMP(jsonPayload.timestamp), timestamp) >= minute_from
+GROUP BY 1, 2, 3, 4, 5, 6;
+
+DELETE FROM `aceti-462716.bqexport.chaospilot_log_rollup_hour` WHERE bucket_start >= refresh_from;
+
+-- From the shards, not the minute table: minute partitions expire after two days
+INSERT INTO `aceti-462716.bqexport.chaospilot_log_rollup_hour`
+SELECT
+  TIMESTAMP_TRUNC(COALESCE(TIMESTAMP(jsonPayload.timestamp), timestamp), HOUR) AS bucket_start,
+  jsonPayload.agent_id,
+  jsonPayload.region,
+  severity,
+  jsonPayload.experiment_id,
+  `aceti-462716.bqexport.message_template`(jsonPayload.message) AS message_template,
+  COUNT(*) AS log_count
+FROM `aceti-462716.bqexport.chaospilot_fake_logs_*`
+WHERE _TABLE_SUFFIX >= FORMAT_DATE('%Y%m%d', DATE(refresh_from))
+  AND COALESCE(TIMESTAMP(jsonPayload.timestamp), timestamp) >= refresh_from
+GROUP BY 1, 2, 3, 4, 5, 6;
+
+COMMIT TRANSACTION;
@@ -0,0 +1,128 @@
+"""
+Cold-start import benchmark for the agent_manager package.
+
+Runs `python -X importtime` in fresh interpreters for a bare
+`import google.adk.agents` baseline and for `import agent_manager`, with MODEL
+unset and TOOLBOX_URL pointing at a closed port, so any import-time model
+client, toolbox call or configuration check shows up as a failure or as extra
+time. Reports median wall time per target, the overhead over the baseline and
+the slowest modules by self time.
+
+Usage (from the repository root):
+
+    python scripts/bench_import_time.py
+    python scripts/bench_import_time.py --runs 10 --top 25 --max-overhead 0.5
+
+Exits non-zero when agent_manager fails to import or its median overhead over
+the baseline exceeds --max-overhead seconds.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = "google.adk.agents"
+TARGET = "agent_manager"
+# Modules that must stay out of a cold import: model and toolbox clients, and the
+# sub-agent modules, which load when root_agent is first built
+DEFERRED_MODULES = (
+    "litellm",
+    "toolbox_core",
+    "agent_manager.sub_agents.detector.agent",
+    "agent_manager.sub_agents.planner.agent",
+    "agent_manager.sub_agents.action_recommender.agent",
+    "agent_manager.sub_agents.fixer.agent",
+    "agent_manager.sub_agents.notifier.agent",
+)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("MODEL", None)
+    env["TOOLBOX_URL"] = "http://127.0.0.1:9"
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _import_once(module: str) -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    """Import module in a fresh interpreter; returns (seconds, [(self_us, name)], deferred modules loaded)."""
+    code = (
+        "import sys\n"
+        f"import {module}\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    modules = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), name.strip()))
+        if not name[1:].startswith(" "):
+            # Top-level entries only: nested cumulative times are already included
+            total_us += int(cumulative_us)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1e6, modules, loaded
+
+
+def _measure(module: str, runs: int) -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    timings = []
+    modules: List[Tuple[int, str]] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        seconds, modules, loaded = _import_once(module)
+        timings.append(seconds)
+    return statistics.median(timings), modules, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-overhead", type=float, default=1.0,
+                        help="seconds agent_manager may add on top of the ADK baseline")
+    args = parser.parse_args()
+
+    baseline, _, _ = _measure(BASELINE, args.runs)
+    try:
+        target, modules, loaded = _measure(TARGET, args.runs)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    overhead = target - baseline
+    print(f"import {BASELINE:<20} {baseline:7.3f}s (median of {args.runs})")
+    print(f"import {TARGET:<20} {target:7.3f}s (median of {args.runs})")
+    print(f"overhead               {overhead:7.3f}s")
+
+    print(f"\nTop {args.top} modules by self time in `import {TARGET}`:")
+    for self_us, name in sorted(modules, reverse=True)[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"\n❌ Deferred modules imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if overhead > args.max_overhead:
+        print(f"\n❌ Import overhead {overhead:.3f}s exceeds {args.max_overhead:.3f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
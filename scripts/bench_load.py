@@ -0,0 +1,257 @@
+"""
+Offline end-to-end load benchmark for the agent_manager server.
+
+Runs the real agent tree, callbacks, session store and toolbox client, with
+FakeLlm standing in for the model (fixed latency, scripted replies) and
+fake_toolbox.py standing in for the toolbox server. N simulated users each
+send --turns messages in their own session, all users concurrently.
+
+Every model call follows the same script. The root agent transfers to the
+detector. An agent with toolbox tools calls one of them, then answers with
+compact JSON once the result is back.
+
+Reports per-turn latency percentiles, turns/s, tool and model call counts,
+and memory growth (process RSS; per-allocation-site growth with
+--tracemalloc, which slows the run down).
+
+Usage (from the repository root):
+
+    python scripts/bench_load.py --users 50 --turns 4
+    python scripts/bench_load.py --target api --users 20 --llm-latency-ms 300 --tool-latency-ms 150
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+APP_NAME = "agent_manager"
+TRANSFER_TOOL = "transfer_to_agent"
+FIRST_AGENT = "detector"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_environment(args: argparse.Namespace) -> str:
+    """Point agent_manager at the fakes and a scratch database; must run before it is imported."""
+    scratch = tempfile.mkdtemp(prefix="chaospilot-bench-")
+    db_url = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ.update(
+        {
+            "MODEL": "fake/bench",
+            "FAST_MODEL": "",
+            "TOOLBOX_URL": f"http://127.0.0.1:{args.toolbox_port}",
+            "SESSION_DB_URL": db_url,
+            "DATA_DB_URL": db_url,
+            "LLM_CACHE_ENABLED": "true" if args.llm_cache else "false",
+            "LLM_CACHE_PATH": os.path.join(scratch, "llm_cache.db"),
+        }
+    )
+    return scratch
+
+
+# --- Scripted model ---
+def scripted_reply(llm_request) -> Any:
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+
+    last = llm_request.contents[-1] if llm_request.contents else None
+    answered = last is not None and any(part.function_response for part in last.parts or [])
+    tools = sorted(name for name in (llm_request.tools_dict or {}) if name != TRANSFER_TOOL)
+    if not answered and tools:
+        name = tools[0]
+        declaration = llm_request.tools_dict[name]._get_declaration()
+        properties = declaration.parameters.properties if declaration and declaration.parameters else {}
+        args = {param: "exp1000" if param == "experiment_id" else "" for param in properties or {}}
+        call = types.FunctionCall(name=name, args=args)
+    elif not answered and TRANSFER_TOOL in (llm_request.tools_dict or {}):
+        call = types.FunctionCall(name=TRANSFER_TOOL, args={"agent_name": FIRST_AGENT})
+    else:
+        return json.dumps({"total_error_logs": 1, "ambiguous": False, "confidence": 1.0}, separators=(",", ":"))
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+
+
+def install_fake_model(latency_s: float) -> None:
+    from agent_manager import llm
+
+    def create_fake_client(model: str):
+        return llm.FakeLlm(model=model, responder=scripted_reply, latency_s=latency_s)
+
+    # LazyLlm resolves create_model_client on first use, so every agent gets the fake
+    llm.create_model_client = create_fake_client
+
+
+# --- Targets ---
+def payload_turn() -> Callable[[str, str, str], Awaitable[bool]]:
+    from agent_manager.agent import run_with_payload
+
+    async def turn(user_id: str, session_id: str, text: str) -> bool:
+        result = await run_with_payload(
+            {
+                "appName": APP_NAME,
+                "userId": user_id,
+                "sessionId": session_id,
+                "newMessage": {"role": "user", "parts": [{"text": text}]},
+            }
+        )
+        return bool(result.get("success"))
+
+    return turn
+
+
+def api_turn() -> Callable[[str, str, str], Awaitable[bool]]:
+    import httpx
+
+    from main import app
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+    created = set()
+
+    async def turn(user_id: str, session_id: str, text: str) -> bool:
+        if session_id not in created:
+            response = await client.post(f"/apps/{APP_NAME}/users/{user_id}/sessions/{session_id}", json={})
+            if response.status_code != 200:
+                return False
+            created.add(session_id)
+        response = await client.post(
+            "/run",
+            json={
+                "appName": APP_NAME,
+                "userId": user_id,
+                "sessionId": session_id,
+                "newMessage": {"role": "user", "parts": [{"text": text}]},
+            },
+        )
+        return response.status_code == 200
+
+    return turn
+
+
+# --- Load ---
+async def run_user(turn, user: int, turns: int, latencies: List[float], errors: List[int]) -> None:
+    user_id = f"bench-user-{user}"
+    session_id = uuid.uuid4().hex
+    for i in range(turns):
+        started = time.perf_counter()
+        try:
+            ok = await turn(user_id, session_id, f"Analyze the latest chaos logs (turn {i}).")
+        except Exception as e:
+            print(f"user {user} turn {i}: {e!r}", file=sys.stderr)
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            errors.append(user)
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def bench(args: argparse.Namespace) -> Dict[str, Any]:
+    turn = api_turn() if args.target == "api" else payload_turn()
+    # Warm-up: first-use imports, model clients and toolset manifests are not part of the measurement
+    await run_user(turn, -1, 1, [], [])
+
+    from agent_manager.llm import model_ledger
+
+    model_ledger.clear()
+    if args.tracemalloc:
+        tracemalloc.start()
+        snapshot_before = tracemalloc.take_snapshot()
+    rss_before = rss_mb()
+    latencies: List[float] = []
+    errors: List[int] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(turn, u, args.turns, latencies, errors) for u in range(args.users)))
+    elapsed = time.perf_counter() - started
+    report = {
+        "target": args.target,
+        "users": args.users,
+        "turns": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "turns_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "model_calls": len(model_ledger.calls),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+    if args.tracemalloc:
+        growth = tracemalloc.take_snapshot().compare_to(snapshot_before, "lineno")
+        report["traced_growth_mb"] = round(sum(stat.size_diff for stat in growth) / 2**20, 2)
+        report["top_growth"] = [str(stat) for stat in growth[:5]]
+        tracemalloc.stop()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end load benchmark with a fake model and toolbox.")
+    parser.add_argument("--target", choices=["payload", "api"], default="payload",
+                        help="payload: run_with_payload directly; api: POST /run on the FastAPI app from main.py")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=3, help="Messages per user, sent one after another")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--tool-latency-ms", type=float, default=100.0)
+    parser.add_argument("--toolbox-logs", type=int, default=20000, help="Synthetic logs behind the fake toolbox")
+    parser.add_argument("--llm-cache", action="store_true", help="Leave the LLM response cache on")
+    parser.add_argument("--tracemalloc", action="store_true", help="Report allocation growth by source line")
+    parser.add_argument("--json", action="store_true", help="Print the report as one JSON line")
+    args = parser.parse_args()
+    args.toolbox_port = _free_port()
+
+    configure_environment(args)
+    from fake_toolbox import FakeToolbox, serve
+
+    toolbox = FakeToolbox(log_count=args.toolbox_logs, latency_s=args.tool_latency_ms / 1000)
+    serve(toolbox, port=args.toolbox_port)
+    install_fake_model(args.llm_latency_ms / 1000)
+
+    report = asyncio.run(bench(args))
+    report["tool_calls"] = sum(toolbox.invocations.values())
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for key, value in report.items():
+            if isinstance(value, list):
+                print(f"{key}:")
+                for line in value:
+                    print(f"  {line}")
+            else:
+                print(f"{key:>16}: {value}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
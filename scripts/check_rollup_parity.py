@@ -0,0 +1,208 @@
+"""
+Check that the log rollups answer the aggregate toolbox queries exactly as the raw queries do.
+
+Generates synthetic chaos logs (BigQuery export row shape), runs a direct
+row-by-row translation of each SQL statement from mcp-toolbox/tools.yaml,
+and compares it with LogRollups fed the same logs in several ingest batches.
+Also times both paths, since the point of the rollups is that their cost
+follows the number of buckets rather than rows.
+
+most_frequent_error_types is checked against its rollup-backed statement,
+which groups on message templates. The original statement grouped on raw
+messages; that behaviour change is reported separately (how many of the top
+rows differ) and does not fail the check.
+
+Usage:
+    python scripts/check_rollup_parity.py [--rows 50000] [--batches 20] [--seed 7]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_manager.tools.rollups import (  # noqa: E402
+    ERROR_SEVERITIES,
+    ROLLUP_TOOLS,
+    LogRollups,
+    format_hour,
+    log_epoch_seconds,
+    message_template,
+    round2,
+)
+
+MESSAGES = {
+    "INFO": ["✅ 200 OK - Deployment successful", "🟢 200 OK - Health check passed"],
+    "WARNING": ["⚠️ 400 Bad Request - Invalid request payload", "🟠 400 Bad Request - Unsupported operation"],
+    "ERROR": [
+        "🔥 500 Internal Error - CPU spike",
+        "🛑 500 Internal Error - Service crashed",
+        "🛑 503 Upstream pod {pod} unreachable at 10.0.{a}.{b}",
+        "🔥 500 Request {request} took {ms}ms",
+    ],
+    "CRITICAL": ["💥 Node {pod} OOM killed after {ms} allocations"],
+}
+
+
+def generate_rows(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    start = datetime(2025, 6, 20, tzinfo=timezone.utc)
+    rows = []
+    for _ in range(n):
+        severity = rng.choices(list(MESSAGES), weights=[0.55, 0.2, 0.2, 0.05])[0]
+        message = rng.choice(MESSAGES[severity]).format(
+            pod=f"{rng.getrandbits(40):010x}", a=rng.randint(0, 255), b=rng.randint(0, 255),
+            request=rng.randint(10000, 99999), ms=rng.randint(1000, 9000),
+        )
+        when = start + timedelta(seconds=rng.randint(0, 6 * 3600))
+        payload = {
+            "timestamp": when.isoformat(timespec="microseconds").replace("+00:00", "Z"),
+            "message": message,
+            "agent_id": f"agent-{rng.randint(1, 5)}",
+            "experiment_id": f"exp{rng.randint(1000, 1020)}",
+            "region": rng.choice(["us-central1", "europe-west1", "asia-east1"]),
+        }
+        if rng.random() < 0.01:
+            payload.pop("region")  # NULL groups must match too
+        rows.append({"severity": severity, "jsonPayload": payload})
+    return rows
+
+
+# --- Raw queries: one pass over every row per call, as BigQuery would ---
+def _p(row: Dict[str, Any], name: str) -> Any:
+    return row["jsonPayload"].get(name)
+
+
+def _count(rows, fields: Callable, errors_only: bool = False) -> Dict[tuple, int]:
+    groups: Dict[tuple, int] = defaultdict(int)
+    for row in rows:
+        if errors_only and row["severity"] not in ERROR_SEVERITIES:
+            continue
+        groups[fields(row)] += 1
+    return groups
+
+
+def _nulls_last(value):
+    return (value is None, value if value is not None else "")
+
+
+def raw_total_error_logs(rows):
+    return [{"total_error_logs": sum(_count(rows, lambda r: (), True).values())}]
+
+
+def raw_errors_logs_grouped_by_severity(rows):
+    return [{"severity": s, "count": c} for (s,), c in _count(rows, lambda r: (r["severity"],), True).items()]
+
+
+def raw_critical_error_logs_grouped_by_region(rows):
+    groups = _count(rows, lambda r: (_p(r, "region"), r["severity"]), True)
+    return [{"region": g, "severity": s, "count": c} for (g, s), c in groups.items()]
+
+
+def raw_most_frequent_error_types(rows, key=lambda row: message_template(_p(row, "message"))):
+    # Grouped on the template, which is what the rollup-backed statement does
+    counts, regions = defaultdict(int), defaultdict(set)
+    for row in rows:
+        if row["severity"] in ERROR_SEVERITIES:
+            failure_type = key(row)
+            counts[failure_type] += 1
+            if _p(row, "region") is not None:
+                regions[failure_type].add(_p(row, "region"))
+    ranked = sorted(counts.items(), key=lambda i: (-i[1], _nulls_last(i[0])))[:5]
+    return [{"failure_type": t, "count": c, "regions": ",".join(sorted(regions[t])) or None} for t, c in ranked]
+
+
+def original_most_frequent_error_types(rows):
+    # The statement before the rollups: GROUP BY jsonPayload.message
+    return raw_most_frequent_error_types(rows, key=lambda row: _p(row, "message"))
+
+
+def raw_agent_failure_rate(rows):
+    totals = _count(rows, lambda r: (_p(r, "agent_id"),))
+    errors = _count(rows, lambda r: (_p(r, "agent_id"),), True)
+    out = [
+        {"agent_id": a, "total_logs": t, "error_count": errors.get((a,), 0), "failure_rate": round2(errors.get((a,), 0) / t)}
+        for (a,), t in totals.items()
+    ]
+    return sorted(out, key=lambda r: (-r["failure_rate"], _nulls_last(r["agent_id"])))
+
+
+def raw_incidents_by_agent_and_experiment(rows):
+    groups = _count(rows, lambda r: (_p(r, "agent_id"), _p(r, "experiment_id"), r["severity"], _p(r, "region")))
+    out = [
+        {"agent_id": a, "experiment_id": e, "severity": s, "region": g, "log_count": c}
+        for (a, e, s, g), c in groups.items()
+    ]
+    return sorted(out, key=lambda r: (-r["log_count"], *(_nulls_last(r[k]) for k in ("agent_id", "experiment_id", "severity", "region"))))
+
+
+def raw_error_trends_by_agent(rows):
+    def hour(row):
+        ts = log_epoch_seconds(row)
+        return format_hour(None if ts is None else ts - ts % 3600)
+
+    groups = _count(rows, lambda r: (_p(r, "agent_id"), r["severity"], hour(r)), True)
+    out = [{"agent_id": a, "severity": s, "hour": h, "count": c} for (a, s, h), c in groups.items()]
+    out.sort(key=lambda r: (_nulls_last(r["agent_id"]), _nulls_last(r["severity"])))
+    out.sort(key=lambda r: r["count"], reverse=True)
+    out.sort(key=lambda r: (r["hour"] is not None, r["hour"] or ""), reverse=True)
+    return out
+
+
+def raw_top_regions_by_error(rows):
+    groups = _count(rows, lambda r: (_p(r, "region"), r["severity"]), True)
+    out = [{"region": g, "severity": s, "error_count": c} for (g, s), c in groups.items()]
+    return sorted(out, key=lambda r: (-r["error_count"], _nulls_last(r["region"]), _nulls_last(r["severity"])))
+
+
+def _unordered(rows: List[Dict[str, Any]]) -> List[str]:
+    return sorted(repr(sorted(row.items())) for row in rows)
+
+
+# Statements without ORDER BY may return rows in any order
+UNORDERED = {"errors_logs_grouped_by_severity", "critical_error_logs_grouped_by_region"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows, random.Random(args.seed))
+    rollups = LogRollups(minute_retention_hours=0)
+    batch = max(len(rows) // args.batches, 1)
+    started = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        rollups.ingest(rows[i : i + batch])
+    ingest_s = time.perf_counter() - started
+    print(f"{len(rows)} rows -> {len(rollups.hours)} hour buckets, {len(rollups.minutes)} minute buckets "
+          f"(ingest {ingest_s * 1000:.0f}ms)")
+
+    failures = 0
+    for name in ROLLUP_TOOLS:
+        started = time.perf_counter()
+        expected = globals()[f"raw_{name}"](rows)
+        raw_s = time.perf_counter() - started
+        started = time.perf_counter()
+        actual = getattr(rollups, name)()
+        rollup_s = time.perf_counter() - started
+        same = _unordered(expected) == _unordered(actual) if name in UNORDERED else expected == actual
+        failures += not same
+        print(f"{'ok  ' if same else 'FAIL'} {name:<40} raw {raw_s * 1000:7.1f}ms  rollup {rollup_s * 1000:6.2f}ms  rows {len(actual)}")
+
+    original = original_most_frequent_error_types(rows)
+    changed = sum(a != b for a, b in zip(original, rollups.most_frequent_error_types()))
+    print(f"note most_frequent_error_types now groups on message templates: {changed} of {len(original)} "
+          f"top rows differ from the original raw-message statement (behaviour change, not checked)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
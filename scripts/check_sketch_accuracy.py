@@ -0,0 +1,148 @@
+"""
+Check that the impact sketches stay within their reported error bounds, and compare their memory with exact sets.
+
+Generates synthetic chaos logs with many distinct users, sketches them in
+several shards that are merged afterwards (as separate workers would), and
+compares system_chaos_summary, user_impact_by_experiment and
+user_impact_summary with exact COUNT(DISTINCT ...) computed from Python
+sets. Distinct counts must be within their `*_error` bound at least 90% of
+the time (the bound is two standard errors). Per-user counts must never be
+undercounted, and may exceed their bound only at about the sketch's delta
+rate.
+
+Usage:
+    python scripts/check_sketch_accuracy.py [--rows 200000] [--users 100000] [--shards 4] [--seed 7]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_manager.tools.rollups import ERROR_SEVERITIES  # noqa: E402
+from agent_manager.tools.sketches import ImpactSketches  # noqa: E402
+
+SEVERITIES = ["INFO", "WARNING", "ERROR", "CRITICAL"]
+
+
+def generate_rows(n: int, users: int, rng: random.Random) -> List[Dict[str, Any]]:
+    start = datetime(2025, 6, 20, tzinfo=timezone.utc)
+    rows = []
+    for _ in range(n):
+        when = start + timedelta(seconds=rng.randint(0, 6 * 3600))
+        payload = {
+            "timestamp": when.isoformat(timespec="microseconds").replace("+00:00", "Z"),
+            "agent_id": f"agent-{rng.randint(1, 200)}",
+            "experiment_id": f"exp{rng.randint(1000, 1200)}",
+            "region": rng.choice(["us-central1", "europe-west1", "asia-east1"]),
+            "message": "chaos event",
+        }
+        if rng.random() < 0.9:
+            # Skewed, so a few users see many events and most see one or two
+            payload["details"] = {"user_id": f"user-{int(users * rng.random() ** 3)}"}
+        rows.append({"severity": rng.choices(SEVERITIES, weights=[0.5, 0.2, 0.25, 0.05])[0], "jsonPayload": payload})
+    return rows
+
+
+def exact(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    severity: Dict[str, list] = defaultdict(lambda: [0, set(), set(), set()])
+    experiment: Dict[str, list] = defaultdict(lambda: [0, set()])
+    users = set()
+    per_user: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        payload = row["jsonPayload"]
+        s = severity[row["severity"]]
+        s[0] += 1
+        s[1].add(payload["agent_id"])
+        s[2].add(payload["experiment_id"])
+        s[3].add(payload["region"])
+        user = payload.get("details", {}).get("user_id")
+        if user is not None:
+            e = experiment[payload["experiment_id"]]
+            e[0] += 1
+            e[1].add(user)
+            if row["severity"] in ERROR_SEVERITIES:
+                users.add(user)
+                per_user[user][row["severity"]] += 1
+    return {"severity": severity, "experiment": experiment, "users": users, "per_user": per_user}
+
+
+def _set_bytes(sets) -> int:
+    return sum(sys.getsizeof(s) + sum(sys.getsizeof(v) for v in s) for s in sets)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = generate_rows(args.rows, args.users, rng)
+    truth = exact(rows)
+
+    started = time.perf_counter()
+    shards = [ImpactSketches(retention_hours=0) for _ in range(args.shards)]
+    for i, shard in enumerate(shards):
+        shard.ingest(rows[i :: args.shards])
+    sketches = shards[0]
+    for shard in shards[1:]:
+        sketches.merge(shard)
+    sketch_s = time.perf_counter() - started
+    exact_bytes = _set_bytes(
+        [s for v in truth["severity"].values() for s in v[1:3]]
+        + [v[1] for v in truth["experiment"].values()]
+        + [truth["users"]]
+    )
+    print(f"{len(rows)} rows in {args.shards} merged shards ({sketch_s * 1000:.0f}ms): "
+          f"sketches {sketches.nbytes / 1024:.0f} KiB vs exact sets ~{exact_bytes / 1024:.0f} KiB")
+
+    # (estimate, error bound, exact) for every distinct count
+    distinct = []
+    for row in sketches.system_chaos_summary():
+        s = truth["severity"][row["severity"]]
+        if row["count"] != s[0] or row["involved_regions"] != ",".join(sorted(s[3])):
+            print(f"FAIL exact columns for {row['severity']}")
+            return 1
+        distinct.append((row["affected_agents"], row["affected_agents_error"], len(s[1])))
+        distinct.append((row["affected_experiments"], row["affected_experiments_error"], len(s[2])))
+    for row in sketches.user_impact_by_experiment():
+        e = truth["experiment"][row["experiment_id"]]
+        if row["total_events"] != e[0]:
+            print(f"FAIL total_events for {row['experiment_id']}")
+            return 1
+        distinct.append((row["affected_users"], row["affected_users_error"], len(e[1])))
+    summary = sketches.user_impact_summary()[0]
+    distinct.append((summary["affected_users"], summary["affected_users_error"], len(truth["users"])))
+    within = sum(abs(estimate - actual) <= bound for estimate, bound, actual in distinct)
+    worst = max(abs(estimate - actual) / max(actual, 1) for estimate, _, actual in distinct)
+    distinct_ok = within >= 0.9 * len(distinct)
+    print(f"{'ok  ' if distinct_ok else 'FAIL'} distinct counts within bound: {within}/{len(distinct)} "
+          f"(worst relative error {worst:.2%}; affected users {summary['affected_users']} vs {len(truth['users'])})")
+
+    per_user = truth["per_user"]
+    sample = rng.sample(sorted(per_user), min(2000, len(per_user)))
+    under = over = 0
+    for row in sketches.user_impact_summary(sample):
+        actual = per_user[row["user_id"]]
+        for severity, column in (("CRITICAL", "critical_events"), ("ERROR", "error_events")):
+            under += row[column] < actual[severity]
+            over += row[column] > actual[severity] + row[f"{column}_error"]
+    checks = 2 * len(sample)
+    delta = shards[0].delta
+    counts_ok = not under and over <= max(3 * delta * checks, 1)
+    print(f"{'ok  ' if counts_ok else 'FAIL'} per-user counts: {under} undercounts, {over}/{checks} beyond bound "
+          f"(delta {delta})")
+    return 0 if distinct_ok and counts_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
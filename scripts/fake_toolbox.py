@@ -0,0 +1,160 @@
+"""
+Local stand-in for the MCP Toolbox server, for offline benchmarks.
+
+Serves the toolsets and tool manifests declared in mcp-toolbox/tools.yaml
+over the same HTTP API toolbox_core talks to. Aggregate tools answer from
+LogRollups over synthetic logs from generate_load.py; every other tool
+returns a few of those logs as canned rows. Each invocation can be delayed
+to mimic BigQuery latency.
+
+Usage (from the repository root):
+
+    python scripts/fake_toolbox.py --port 5000 --latency-ms 150
+    TOOLBOX_URL=http://127.0.0.1:5000 adk web
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_load import generate_batches  # noqa: E402
+
+from agent_manager.tools.rollups import ROLLUP_TOOLS, LogRollups, parse_epoch_seconds  # noqa: E402
+
+TOOLS_YAML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp-toolbox", "tools.yaml")
+SERVER_VERSION = "fake-0.1"
+CANNED_ROWS = 5
+
+
+class FakeToolbox:
+    """Manifests from tools.yaml plus canned, data-backed results for each tool."""
+
+    def __init__(self, tools_yaml: str = TOOLS_YAML, log_count: int = 20000, latency_s: float = 0.0, seed: int = 7):
+        with open(tools_yaml) as f:
+            spec = yaml.safe_load(f)
+        self.tools: Dict[str, Dict[str, Any]] = spec["tools"]
+        self.toolsets: Dict[str, List[str]] = spec.get("toolsets", {})
+        self.latency_s = latency_s
+        self.rollups = LogRollups(minute_retention_hours=0)
+        self.sample: List[Dict[str, Any]] = []
+        for batch in generate_batches(log_count, rate=10.0, seed=seed):
+            self.rollups.ingest(batch)
+            if len(self.sample) < CANNED_ROWS:
+                self.sample.extend(
+                    {"severity": row["severity"], **{k: v for k, v in row["jsonPayload"].items() if not isinstance(v, dict)}}
+                    for row in batch[: CANNED_ROWS - len(self.sample)]
+                )
+        self.invocations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def manifest(self, names: List[str]) -> Dict[str, Any]:
+        tools = {}
+        for name in names:
+            tool = self.tools[name]
+            tools[name] = {
+                "description": tool.get("description", ""),
+                "parameters": [
+                    {"name": p["name"], "type": p["type"], "description": p.get("description", "")}
+                    for p in tool.get("parameters") or []
+                ],
+                "authRequired": [],
+            }
+        return {"serverVersion": SERVER_VERSION, "tools": tools}
+
+    def toolset_manifest(self, toolset: str) -> Optional[Dict[str, Any]]:
+        if not toolset:
+            return self.manifest(list(self.tools))
+        if toolset not in self.toolsets:
+            return None
+        return self.manifest(self.toolsets[toolset])
+
+    def invoke(self, name: str, params: Dict[str, Any]) -> Any:
+        with self._lock:
+            self.invocations[name] = self.invocations.get(name, 0) + 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if name in ROLLUP_TOOLS:
+            return getattr(self.rollups, name)(
+                since=parse_epoch_seconds(params.get("start_time")), until=parse_epoch_seconds(params.get("end_time"))
+            )
+        return self.sample
+
+
+def _handler(toolbox: FakeToolbox):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Any) -> None:
+            data = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path.startswith("/api/toolset"):
+                manifest = toolbox.toolset_manifest(path[len("/api/toolset"):].lstrip("/"))
+            elif path.startswith("/api/tool/"):
+                name = path[len("/api/tool/"):]
+                manifest = toolbox.manifest([name]) if name in toolbox.tools else None
+            else:
+                manifest = None
+            if manifest is None:
+                self._send(404, {"error": f"not found: {path}"})
+            else:
+                self._send(200, manifest)
+
+        def do_POST(self) -> None:
+            path = self.path.split("?", 1)[0]
+            name = path[len("/api/tool/"):-len("/invoke")] if path.endswith("/invoke") else None
+            if not name or name not in toolbox.tools:
+                self._send(404, {"error": f"not found: {path}"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            # Toolbox returns tool output as a JSON string under "result"
+            self._send(200, {"result": json.dumps(toolbox.invoke(name, params), default=str)})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(
+    toolbox: FakeToolbox, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """Start the server on a daemon thread; port 0 picks a free port (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), _handler(toolbox))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-toolbox", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve tools.yaml with canned results over the toolbox HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every tool invocation")
+    parser.add_argument("--logs", type=int, default=20000, help="Synthetic logs behind the aggregate tools")
+    args = parser.parse_args()
+    server = serve(FakeToolbox(log_count=args.logs, latency_s=args.latency_ms / 1000), args.host, args.port)
+    print(f"fake toolbox on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Synthetic chaos-log load generator for offline benchmarks.
+
+Produces the same messages and field schema as inject_logs_gcp.py, shaped
+like rows of the BigQuery log export (severity, timestamp and insertId at top
+level, the logged struct under jsonPayload), at 100k+ events/s with batched
+writes and no GCP access. Event timestamps follow --rate in simulated time;
+--realtime also paces the output to the wall clock, e.g. for a tailing
+consumer.
+
+Scenarios:
+    steady  the inject_logs_gcp.py severity mix throughout
+    burst   periodic windows where most events are errors
+    outage  one region fails every request for a window mid-run
+
+Sinks:
+    ndjson   one JSON row per line (gzip when the path ends in .gz)
+    parquet  flattened columns; needs pyarrow
+    rollups  fold into agent_manager's in-process LogRollups and print a summary
+    null     generate only, to measure the generator itself
+
+Usage (from the repository root):
+
+    python scripts/generate_load.py --count 1000000 --output logs.ndjson
+    python scripts/generate_load.py --scenario outage --duration 3600 --rate 500 --output outage.ndjson.gz
+    python scripts/generate_load.py --count 500000 --sink rollups
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inject_logs_gcp import LOG_ENTRIES  # noqa: E402
+
+try:
+    import orjson
+
+    def _dumps(record: Dict[str, Any]) -> bytes:
+        return orjson.dumps(record)
+
+except ImportError:  # stdlib fallback, roughly 3x slower
+
+    def _dumps(record: Dict[str, Any]) -> bytes:
+        return json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+SEVERITIES = list(LOG_ENTRIES)
+STEADY_WEIGHTS = [0.6, 0.25, 0.15]  # INFO, WARNING, ERROR, as in inject_logs_gcp.py
+BURST_WEIGHTS = [0.15, 0.15, 0.7]
+REGIONS = ["us-central1", "europe-west1", "asia-east1"]
+COMPONENTS = ["scheduler", "load-balancer", "node-exporter"]
+METHODS = ["GET", "POST"]
+URLS = ["/api/v1/deploy", "/api/v1/metrics", "/health"]
+OUTAGE_MESSAGE = LOG_ENTRIES["ERROR"][1]  # "Service crashed"
+# Same value ranges as inject_logs_gcp.py, precomputed so batches can sample them in bulk
+AGENT_IDS = [f"agent-{i}" for i in range(1, 6)]
+EXPERIMENT_IDS = [f"exp{i}" for i in range(1000, 10000)]
+USER_IDS = [f"user-{i}" for i in range(100, 1000)]
+DURATIONS_MS = range(100, 3001)
+RESPONSE_SIZES = range(200, 1501)
+ENTRY_PICKS = 840  # divisible by any LOG_ENTRIES list length up to 8, so picks stay uniform
+
+
+class Scenario:
+    """Severity mix over simulated time: steady, periodic error bursts, or a regional outage."""
+
+    def __init__(
+        self,
+        name: str = "steady",
+        duration_s: float = 3600.0,
+        burst_every_s: float = 600.0,
+        burst_length_s: float = 60.0,
+        outage_region: str = REGIONS[0],
+    ):
+        if name not in ("steady", "burst", "outage"):
+            raise ValueError(f"Unknown scenario: {name}")
+        self.name = name
+        self.burst_every_s = burst_every_s
+        self.burst_length_s = burst_length_s
+        self.outage_region = outage_region
+        # The outage covers the middle third of the run
+        self.outage_window = (duration_s / 3, 2 * duration_s / 3)
+
+    def in_burst(self, offset_s: float) -> bool:
+        return self.name == "burst" and offset_s % self.burst_every_s < self.burst_length_s
+
+    def in_outage(self, offset_s: float, region: str) -> bool:
+        return (
+            self.name == "outage"
+            and region == self.outage_region
+            and self.outage_window[0] <= offset_s < self.outage_window[1]
+        )
+
+
+def generate_batches(
+    count: int,
+    rate: float = 1000.0,
+    scenario: Optional[Scenario] = None,
+    start: Optional[datetime] = None,
+    batch_size: int = 10000,
+    seed: Optional[int] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield count log rows in batches, timestamped rate per second from start."""
+    rng = random.Random(seed)
+    scenario = scenario or Scenario(duration_s=count / rate)
+    start = start or datetime.now(timezone.utc) - timedelta(seconds=count / rate)
+    start_epoch = start.timestamp()
+    second_prefix: Dict[int, str] = {}
+    produced = 0
+    while produced < count:
+        n = min(batch_size, count - produced)
+        # Draw every field for the batch up front: rng.choices(k=n) is far cheaper than per-event calls
+        steady = rng.choices(SEVERITIES, weights=STEADY_WEIGHTS, k=n)
+        burst = rng.choices(SEVERITIES, weights=BURST_WEIGHTS, k=n) if scenario.name == "burst" else steady
+        regions = rng.choices(REGIONS, k=n)
+        entry_picks = rng.choices(range(ENTRY_PICKS), k=n)
+        agents = rng.choices(AGENT_IDS, k=n)
+        experiments = rng.choices(EXPERIMENT_IDS, k=n)
+        users = rng.choices(USER_IDS, k=n)
+        durations = rng.choices(DURATIONS_MS, k=n)
+        components = rng.choices(COMPONENTS, k=n)
+        methods = rng.choices(METHODS, k=n)
+        urls = rng.choices(URLS, k=n)
+        sizes = rng.choices(RESPONSE_SIZES, k=n)
+        batch = []
+        for i in range(n):
+            seq = produced + i
+            offset = seq / rate
+            epoch = start_epoch + offset
+            second = int(epoch)
+            prefix = second_prefix.get(second)
+            if prefix is None:
+                second_prefix.clear()
+                prefix = second_prefix[second] = datetime.fromtimestamp(second, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+            timestamp = f"{prefix}.{int((epoch - second) * 1_000_000):06d}Z"
+            region = regions[i]
+            if scenario.name == "steady":
+                severity = steady[i]
+            elif scenario.in_outage(offset, region):
+                severity = None
+            else:
+                severity = burst[i] if scenario.in_burst(offset) else steady[i]
+            if severity is None:
+                severity, (message, status_code) = "ERROR", OUTAGE_MESSAGE
+            else:
+                entries = LOG_ENTRIES[severity]
+                message, status_code = entries[entry_picks[i] % len(entries)]
+            batch.append(
+                {
+                    "timestamp": timestamp,
+                    "severity": severity,
+                    "insertId": f"{seq:016x}",
+                    "jsonPayload": {
+                        "timestamp": timestamp,
+                        "message": message,
+                        "status_code": status_code,
+                        "agent_id": agents[i],
+                        "experiment_id": experiments[i],
+                        "region": region,
+                        "details": {
+                            "duration_ms": durations[i],
+                            "component": components[i],
+                            "user_id": users[i],
+                        },
+                        "httpRequest": {
+                            "requestMethod": methods[i],
+                            "requestUrl": urls[i],
+                            "status": status_code,
+                            "responseSize": sizes[i],
+                        },
+                    },
+                }
+            )
+        produced += n
+        yield batch
+
+
+# --- Sinks ---
+class NdjsonSink:
+    def __init__(self, path: str):
+        self.file = gzip.open(path, "wb", compresslevel=1) if path.endswith(".gz") else open(path, "wb")
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        self.file.write(b"\n".join(_dumps(record) for record in batch) + b"\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetSink:
+    COLUMNS = (
+        "timestamp", "severity", "insertId", "experiment_id", "agent_id", "region", "message",
+        "status_code", "user_id", "duration_ms", "component", "request_method", "request_url",
+    )
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            sys.exit("The parquet sink needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.writer = None
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns: Dict[str, list] = {name: [] for name in self.COLUMNS}
+        for record in batch:
+            payload = record["jsonPayload"]
+            values = (
+                record["timestamp"], record["severity"], record["insertId"], payload["experiment_id"],
+                payload["agent_id"], payload["region"], payload["message"], payload["status_code"],
+                payload["details"]["user_id"], payload["details"]["duration_ms"], payload["details"]["component"],
+                payload["httpRequest"]["requestMethod"], payload["httpRequest"]["requestUrl"],
+            )
+            for name, value in zip(self.COLUMNS, values):
+                columns[name].append(value)
+        table = pa.table(columns)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+class RollupSink:
+    def __init__(self):
+        from agent_manager.tools.rollups import LogRollups
+
+        self.rollups = LogRollups()
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        self.rollups.ingest(batch)
+
+    def close(self) -> None:
+        print(f"rollups: {len(self.rollups.hours)} hour buckets, {len(self.rollups.minutes)} minute buckets")
+        print(f"top regions by error: {self.rollups.top_regions_by_error()[:3]}")
+
+
+class NullSink:
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def make_sink(kind: str, output: Optional[str]):
+    if kind in ("ndjson", "parquet") and not output:
+        sys.exit(f"--output is required for the {kind} sink")
+    if kind == "ndjson":
+        return NdjsonSink(output)
+    if kind == "parquet":
+        return ParquetSink(output)
+    if kind == "rollups":
+        return RollupSink()
+    return NullSink()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic chaos logs offline at high rates.")
+    parser.add_argument("--count", type=int, help="Events to generate (default: rate x duration)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Events per simulated second")
+    parser.add_argument("--duration", type=float, default=3600.0, help="Simulated seconds when --count is not given")
+    parser.add_argument("--scenario", choices=["steady", "burst", "outage"], default="steady")
+    parser.add_argument("--burst-every", type=float, default=600.0, help="Seconds between burst starts")
+    parser.add_argument("--burst-length", type=float, default=60.0, help="Seconds each burst lasts")
+    parser.add_argument("--outage-region", default=REGIONS[0], choices=REGIONS)
+    parser.add_argument("--start", help="First event time, ISO 8601 (default: so the run ends now)")
+    parser.add_argument("--sink", choices=["ndjson", "parquet", "rollups", "null"], default=None)
+    parser.add_argument("--output", help="Output path for the ndjson/parquet sinks")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--realtime", action="store_true", help="Pace output to --rate events per wall-clock second")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    count = args.count or int(args.rate * args.duration)
+    sink_kind = args.sink or ("parquet" if (args.output or "").endswith(".parquet") else "ndjson" if args.output else "null")
+    start = datetime.fromisoformat(args.start.replace("Z", "+00:00")) if args.start else None
+    if start is not None and start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    scenario = Scenario(args.scenario, count / args.rate, args.burst_every, args.burst_length, args.outage_region)
+
+    sink = make_sink(sink_kind, args.output)
+    started = time.perf_counter()
+    written = 0
+    try:
+        for batch in generate_batches(count, args.rate, scenario, start, args.batch_size, args.seed):
+            sink.write(batch)
+            written += len(batch)
+            if args.realtime:
+                ahead = written / args.rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - started
+    print(f"{written} events ({args.scenario}) -> {sink_kind} in {elapsed:.2f}s: {written / elapsed:,.0f} events/s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import random
 import time
 from datetime import datetime
-from google.cloud import logging_v2
 
-client = logging_v2.Client()
-logger = client.logger("chaospilot-fake-logs")
+LOGGER_NAME = "chaospilot-fake-logs"
+_logger = None
+
+
+def get_logger():
+    """Cloud Logging logger, created on first use so importing LOG_ENTRIES needs no GCP credentials."""
+    global _logger
+    if _logger is None:
+        from google.cloud import logging_v2
+
+        _logger = logging_v2.Client().logger(LOGGER_NAME)
+    return _logger
+
 
 LOG_ENTRIES = {
     "INFO": [
@@ -22,6 +32,7 @@ LOG_ENTRIES = {
 }
 
 def generate_logs(n=100):
+    logger = get_logger()
     for _ in range(n):
         severity = random.choices(["INFO", "WARNING", "ERROR"], weights=[0.6, 0.25, 0.15])[0]
         message, status_code = random.choice(LOG_ENTRIES[severity])
@@ -62,4 +73,5 @@ def generate_logs(n=100):
 
     print(f"{n} enhanced log entries sent to Logs Explorer.")
 
-generate_logs(20)
+if __name__ == "__main__":
+    generate_logs(20)
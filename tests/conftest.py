@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep every database and cache the tests touch in a scratch directory; set before agent_manager.config is imported
+_scratch = tempfile.mkdtemp(prefix="chaospilot-tests-")
+os.environ.setdefault("CHAOSPILOT_DATA_DIR", _scratch)
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("AUDIT_ENABLED", "false")
@@ -0,0 +1,86 @@
+import threading
+
+from agent_manager import alerting
+from agent_manager.alerting import Alert, AlertCoalescer, coalesce_notifications, only_new_alerts
+from agent_manager.schemas import project_state
+
+
+class FakeContext:
+    def __init__(self, state):
+        self.state = state
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fixer_summary(*tasks):
+    return {
+        "safe_to_execute_tasks": [{"task_id": t, "description": f"Restart {t} in us-central1"} for t in tasks if t.startswith("safe")],
+        "escalation_required": [{"task_id": t, "description": f"Fail over {t} in us-central1"} for t in tasks if t.startswith("esc")],
+        "summary": {"total_tasks_analyzed": len(tasks)},
+    }
+
+
+def _alert(task, severity="critical"):
+    return Alert(region="us-central1", incident_type="network_issue", task=task, severity=severity,
+                 channel=alerting.SEVERITY_CHANNELS[severity])
+
+
+def test_notifier_only_sees_the_alerts_that_were_not_coalesced(monkeypatch):
+    coalescer = AlertCoalescer(clock=FakeClock())
+    monkeypatch.setattr(alerting, "alert_coalescer", coalescer)
+    context = FakeContext({"fixer_summary": _fixer_summary("safe-a", "esc-b")})
+    assert coalesce_notifications(context) is None
+
+    context.state["fixer_summary"] = _fixer_summary("safe-a", "esc-b", "esc-c")
+    assert coalesce_notifications(context) is None
+
+    projected = only_new_alerts(project_state(context.state, "notifier"), context.state)["fixer_summary"]
+    assert projected["safe_to_execute_tasks"] == []
+    assert [task["task_id"] for task in projected["escalation_required"]] == ["esc-c"]
+    assert projected["summary"] == {"total_tasks_analyzed": 3, "tasks_safe_to_execute": 0, "tasks_escalated": 1}
+    # The first notification started the digest thread
+    assert coalescer._thread is not None
+    coalescer.stop_digest_flush(timeout=1)
+    assert coalescer._thread is None
+
+
+def test_escalations_are_sent_over_the_channel_limit():
+    coalescer = AlertCoalescer(channel_limits={"email": 1, "slack": 1}, clock=FakeClock())
+    assert coalescer.offer([_alert("a")]).notify
+    assert coalescer.offer([_alert("b", "info")]).notify
+
+    decision = coalescer.offer([_alert("c"), _alert("d", "info")])
+
+    assert [alert.task for alert in decision.new_alerts] == ["c"]
+    assert [alert.task for alert in decision.suppressed] == ["d"]
+    assert coalescer.stats["over_limit_escalations"] == 1
+
+
+def test_digest_is_flushed_without_a_new_alert():
+    coalescer = AlertCoalescer(window_s=0.05)
+    coalescer.offer([_alert("a")])
+    coalescer.offer([_alert("a")])
+    received = threading.Event()
+    digests = []
+
+    def sink(digest):
+        digests.append(digest)
+        received.set()
+
+    coalescer.start_digest_flush(sink, interval=0.05)
+
+    assert received.wait(2)
+    coalescer.stop_digest_flush(timeout=1)
+    assert digests[0][0]["alerts"] == 2 and digests[0][0]["suppressed"] == 1
+
+
+def test_importing_the_agents_starts_no_digest_thread():
+    import agent_manager.agent  # noqa: F401
+
+    assert "alert-digest-flush" not in {thread.name for thread in threading.enumerate()}
@@ -0,0 +1,116 @@
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from agent_manager import audit
+from agent_manager.audit import AuditLogWriter
+from agent_manager.models import AuditLog, Base
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _rows(engine):
+    with Session(engine) as session:
+        return session.execute(select(AuditLog.event_type, AuditLog.agent_name, AuditLog.tool_name, AuditLog.details).order_by(AuditLog.id)).all()
+
+
+def _insert_sizes(engine):
+    """Rows per INSERT statement executed on engine."""
+    sizes = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO audit_log"):
+            sizes.append(len(parameters) if executemany else 1)
+
+    return sizes
+
+
+def test_events_are_written_in_batches(tmp_path):
+    engine = _engine(tmp_path)
+    sizes = _insert_sizes(engine)
+    writer = AuditLogWriter(engine=engine, batch_size=4, flush_interval=3600)
+    for i in range(10):
+        assert writer.record("tool_call", "detector", tool_name=f"tool-{i}")
+    writer.stop()
+
+    assert [row.tool_name for row in _rows(engine)] == [f"tool-{i}" for i in range(10)]
+    assert sum(sizes) == 10 and max(sizes) <= 4
+    assert writer.stats == {"enqueued": 10, "dropped": 0, "written": 10, "failed_batches": 0}
+
+
+def test_a_full_batch_wakes_the_writer_before_the_interval(tmp_path):
+    engine = _engine(tmp_path)
+    writer = AuditLogWriter(engine=engine, batch_size=3, flush_interval=3600)
+    try:
+        for _ in range(3):
+            writer.record("agent_invocation", "planner")
+        deadline = time.monotonic() + 5
+        while writer.stats["written"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.stats["written"] == 3
+    finally:
+        writer.stop()
+
+
+def test_stop_flushes_pending_events(tmp_path):
+    engine = _engine(tmp_path)
+    writer = AuditLogWriter(engine=engine, batch_size=100, flush_interval=3600)
+    writer.record("agent_invocation", "planner", user_id="u1", details={"invocation_id": "inv-1"})
+    writer.record("tool_call", "planner", tool_name="log_reader")
+    # Below the batch size and long before the interval, nothing is written yet
+    assert _rows(engine) == []
+
+    writer.stop()
+    assert writer._thread is None
+    assert [(row.event_type, row.details) for row in _rows(engine)] == [
+        ("agent_invocation", {"invocation_id": "inv-1"}),
+        ("tool_call", {}),
+    ]
+    assert writer.queue_depth() == 0
+
+
+def test_events_beyond_the_queue_are_dropped_and_counted(tmp_path):
+    engine = _engine(tmp_path)
+    writer = AuditLogWriter(engine=engine, max_queue_size=3, batch_size=100, flush_interval=3600)
+    accepted = [writer.record("tool_call", "fixer", tool_name=f"tool-{i}") for i in range(5)]
+
+    assert accepted == [True, True, True, False, False]
+    assert writer.queue_depth() == 3
+    writer.stop()
+    assert len(_rows(engine)) == 3
+    assert writer.stats == {"enqueued": 3, "dropped": 2, "written": 3, "failed_batches": 0}
+
+
+def test_failed_batches_are_counted_not_raised(tmp_path, capsys):
+    # No audit_log table
+    writer = AuditLogWriter(engine=create_engine(f"sqlite:///{tmp_path / 'empty.db'}"), batch_size=100, flush_interval=3600)
+    writer.record("tool_call", "fixer")
+    writer.stop()
+
+    assert writer.stats["failed_batches"] == 1 and writer.stats["written"] == 0
+    assert "Failed to write 1 audit events" in capsys.readouterr().out
+
+
+def test_tool_callbacks_record_arguments_and_result_size(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    writer = AuditLogWriter(engine=engine, batch_size=100, flush_interval=3600)
+    monkeypatch.setattr(audit, "audit_writer", writer)
+    monkeypatch.setattr(audit, "AUDIT_ENABLED", True)
+    tool = SimpleNamespace(name="log_reader")
+    context = SimpleNamespace(agent_name="detector", invocation_id="inv-1", _invocation_context=SimpleNamespace(user_id="u1"))
+
+    audit.audit_before_tool(tool, {"limit": 5}, context)
+    audit.audit_after_tool(tool, {"limit": 5}, context, [1, 2, 3])
+    writer.stop()
+
+    assert [(row.event_type, row.tool_name, row.details) for row in _rows(engine)] == [
+        ("tool_call", "log_reader", {"invocation_id": "inv-1", "args": {"limit": 5}}),
+        ("tool_result", "log_reader", {"invocation_id": "inv-1", "response_size": 3}),
+    ]
@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from agent_manager.batch import BatchTriageRunner, IncidentRequest
+from agent_manager.tool_dedup import active_deduplicator
+
+TOOL = SimpleNamespace(name="most_frequent_error_types")
+
+
+class _FakeTriage(BaseAgent):
+    """
+    Stands in for the triage chain: one shared tool call, then a plan.
+
+    Incident messages pick the behaviour ("slow", "boom"); the tool's
+    executions are recorded, and those listed in fail_executions raise.
+    """
+
+    tool_delay: float = 0.05
+    fail_executions: List[int] = []
+    executions: List[str] = []
+    running: int = 0
+    peak: int = 0
+
+    async def _call_tool(self, ctx) -> Any:
+        deduplicator = active_deduplicator.get()
+        tool_context = SimpleNamespace(_invocation_context=ctx, function_call_id="call-1")
+        args = {"limit": 5}
+        if deduplicator is not None:
+            shared = await deduplicator.before_tool(TOOL, args, tool_context)
+            if shared is not None:
+                return shared
+        self.executions.append(ctx.session.id)
+        await asyncio.sleep(self.tool_delay)
+        if len(self.executions) in self.fail_executions:
+            raise RuntimeError("toolbox unavailable")
+        result = {"rows": [{"failure_type": "disk full", "count": 7}]}
+        if deduplicator is not None:
+            deduplicator.after_tool(TOOL, args, tool_context, result)
+        return result
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        message = ctx.user_content.parts[0].text
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            if message == "slow":
+                await asyncio.sleep(10)
+            if message == "boom":
+                raise ValueError("planner exploded")
+            rows = await self._call_tool(ctx)
+        finally:
+            self.running -= 1
+        plan: Dict[str, Any] = {"incident_id": ctx.session.state["incident_id"], "top": rows["rows"][0]["failure_type"]}
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text="planned")]),
+            actions=EventActions(state_delta={"plan": plan}),
+        )
+
+
+def _run(agent, incidents, **options):
+    async def collect():
+        runner = BatchTriageRunner(agent=agent, **options)
+        results = {result.incident_id: result async for result in runner.run(incidents)}
+        return results, runner.deduplicator
+
+    return asyncio.run(collect())
+
+
+def test_incidents_run_concurrently_and_share_tool_calls():
+    agent = _FakeTriage(name="triage")
+    incidents = [IncidentRequest(incident_id=f"inc-{i}", message="go") for i in range(4)]
+    results, deduplicator = _run(agent, incidents, concurrency=3, incident_timeout=5)
+
+    assert {r.status for r in results.values()} == {"completed"}
+    assert results["inc-2"].outputs == {"plan": {"incident_id": "inc-2", "top": "disk full"}}
+    assert results["inc-2"].final_response == "planned"
+    assert agent.peak == 3
+    # One execution; the other incidents waited for it or reused it
+    assert len(agent.executions) == 1
+    assert deduplicator.stats == {"executed": 1, "shared": 3}
+
+
+def test_without_deduplication_every_incident_executes():
+    agent = _FakeTriage(name="triage")
+    incidents = [IncidentRequest(incident_id=f"inc-{i}", message="go") for i in range(3)]
+    results, deduplicator = _run(agent, incidents, incident_timeout=5, deduplicate_tools=False)
+
+    assert deduplicator is None
+    assert {r.status for r in results.values()} == {"completed"}
+    assert len(agent.executions) == 3
+
+
+def test_timeouts_and_failures_are_reported_per_incident():
+    agent = _FakeTriage(name="triage")
+    incidents = [
+        IncidentRequest(incident_id="slow", message="slow"),
+        IncidentRequest(incident_id="boom", message="boom"),
+        IncidentRequest(incident_id="ok", message="go"),
+    ]
+    results, _ = _run(agent, incidents, incident_timeout=1)
+
+    assert results["slow"].status == "timeout"
+    assert results["slow"].error == "Timed out after 1s"
+    assert results["boom"].status == "failed"
+    assert results["boom"].error == "planner exploded"
+    assert results["ok"].status == "completed"
+    assert all(r.duration_s > 0 for r in results.values())
+
+
+def test_waiters_run_the_call_when_its_owner_raises():
+    agent = _FakeTriage(name="triage", fail_executions=[1])
+    incidents = [IncidentRequest(incident_id=f"inc-{i}", message="go") for i in range(2)]
+    results, deduplicator = _run(agent, incidents, incident_timeout=5)
+
+    statuses = sorted(r.status for r in results.values())
+    assert statuses == ["completed", "failed"]
+    # The owner's run failed mid-call, so the waiter executed the tool itself
+    assert len(agent.executions) == 2
+    assert deduplicator.stats == {"executed": 1, "shared": 0}
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from prometheus_client import CollectorRegistry
+
+from agent_manager.compaction import ContextCompactor, estimate_tokens
+
+
+def _text(role, text):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def _call(args):
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name="recent_errors", args=args))])
+
+
+def _result(response):
+    return types.Content(
+        role="user", parts=[types.Part(function_response=types.FunctionResponse(name="recent_errors", response=response))]
+    )
+
+
+def _compactor(budget, keep_recent=2):
+    return ContextCompactor(token_budget=budget, keep_recent=keep_recent, summary_chars=40, registry=CollectorRegistry())
+
+
+def _history():
+    return [
+        _text("user", "investigate the outage in us-central1"),
+        _call({"filter": "x" * 2000}),
+        _result({"result": [{"message": "boom " * 20}] * 100}),
+        _text("model", "thinking " * 500),
+        _text("user", "focus on the database"),
+        _text("model", "ok"),
+    ]
+
+
+def test_contents_under_budget_are_returned_unchanged():
+    contents = _history()
+
+    assert _compactor(budget=10**6).compact(contents) is contents
+
+
+def test_tool_results_are_summarised_first_and_exchanges_stay_paired():
+    contents = _history()
+    compacted = _compactor(budget=estimate_tokens(contents) - 100).compact(contents)
+
+    response = compacted[2].parts[0].function_response.response
+    assert response["compacted"] and response["rows"] == 100
+    # Call arguments and text turns were not needed
+    assert compacted[1].parts[0].function_call.args == {"filter": "x" * 2000}
+    assert len(compacted) == len(contents)
+    # The caller's contents are not modified
+    assert "compacted" not in contents[2].parts[0].function_response.response
+
+
+def test_call_arguments_then_model_text_are_compacted_but_user_turns_survive():
+    contents = _history()
+    compacted = _compactor(budget=1).compact(contents)
+
+    assert compacted[1].parts[0].function_call.args["compacted"]
+    assert [c.role for c in compacted] == ["user", "model", "user", "user", "model"]
+    assert compacted[0].parts[0].text == "investigate the outage in us-central1"
+    assert all(part.text != "thinking " * 500 for c in compacted for part in c.parts)
+    # The recent turns are never touched
+    assert compacted[-2:] == contents[-2:]
+
+
+def test_before_model_preserves_upstream_state_and_records_savings():
+    compactor = _compactor(budget=10)
+    request = LlmRequest(contents=_history(), config=types.GenerateContentConfig())
+    context = SimpleNamespace(
+        agent_name="fixer", invocation_id="inv-1", state={"detector_summary": {"total_error_logs": 3}, "plan": {"x": 1}}
+    )
+
+    compactor.before_model(context, request)
+
+    instruction = request.config.system_instruction
+    assert '{"detector_summary":{"total_error_logs":3}}' in instruction
+    assert "plan" not in instruction.split("verbatim")[-1]
+    assert compactor.summary()["fixer"]["calls"] == 1
+    assert compactor.records[0].tokens_saved > 0
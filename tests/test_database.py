@@ -0,0 +1,30 @@
+import threading
+
+from sqlalchemy import inspect
+
+from agent_manager import database
+
+
+def test_data_engine_is_created_once_under_concurrent_first_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATA_DB_URL", f"sqlite:///{tmp_path / 'data.db'}")
+    monkeypatch.setattr(database, "_data_engine", None)
+    start = threading.Barrier(8)
+    engines, errors = [], []
+
+    def first_use():
+        start.wait()
+        try:
+            engines.append(database.get_data_engine())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=first_use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len({id(engine) for engine in engines}) == 1
+    assert "feedback" in inspect(engines[0]).get_table_names()
+    engines[0].dispose()
@@ -0,0 +1,158 @@
+import asyncio
+
+from agent_manager.sub_agents.action_recommender import executor as executor_module
+from agent_manager.sub_agents.action_recommender.agent import IntelligentActionRecommender
+from agent_manager.sub_agents.action_recommender.executor import FakeServiceHandler, RemediationExecutor
+
+CHECKS = ["Verify action completion", "Check system stability"]
+
+
+def _step(action, dependencies=(), level="automated", minutes=10):
+    return {
+        "action": action,
+        "automation_level": level,
+        "estimated_time": f"{minutes}_minutes",
+        "dependencies": list(dependencies),
+        "validation_steps": CHECKS,
+        "rollback_trigger": {"timeout_exceeded": True, "validation_failed": True, "error_threshold_exceeded": True},
+    }
+
+
+def _rollbacks(*actions):
+    return {"rollback_actions": [{"original_action": a, "rollback_action": f"undo_{a}"} for a in actions]}
+
+
+def _run(plan, rollback_strategy=None, handler=None, **options):
+    executor = RemediationExecutor(default_handler=handler or FakeServiceHandler(), rollback_timeout=1.0, **options)
+    return asyncio.run(executor.run(plan, rollback_strategy))
+
+
+class _CountingHandler(FakeServiceHandler):
+    """Records the most actions in flight at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def execute(self, step):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super().execute(step)
+        finally:
+            self.in_flight -= 1
+
+
+def test_independent_steps_run_concurrently_up_to_the_cap():
+    plan = [_step(name) for name in "abcde"]
+
+    handler = _CountingHandler()
+    report = _run(plan, handler=handler, concurrency=3)
+    assert report.succeeded
+    assert handler.peak == 3
+    assert handler.applied == set("abcde")
+
+    serial = _CountingHandler()
+    assert _run(plan, handler=serial, concurrency=1).succeeded
+    assert serial.peak == 1
+
+
+def test_a_dependent_waits_for_its_dependency():
+    handler = FakeServiceHandler()
+    report = _run([_step("a"), _step("b", ["a"])], handler=handler)
+
+    assert report.succeeded
+    executes = [call[1] for call in handler.calls if call[0] == "execute"]
+    assert executes == ["a", "b"]
+    assert report.outcome("b").started_s >= report.outcome("a").started_s + report.outcome("a").duration_s
+
+
+def test_validation_failure_rolls_the_step_back():
+    handler = FakeServiceHandler(fail_validation=["a"])
+    report = _run([_step("a"), _step("b")], _rollbacks("a", "b"), handler=handler)
+
+    a = report.outcome("a")
+    assert a.status == "validation_failed"
+    # Later checks assume the earlier ones passed
+    assert a.failed_checks == [CHECKS[0]]
+    assert a.rolled_back and ("rollback", "a", "undo_a") in handler.calls
+    assert report.outcome("b").succeeded
+    assert handler.applied == {"b"}
+
+
+def test_a_disabled_trigger_leaves_the_step_in_place():
+    step = _step("a")
+    step["rollback_trigger"]["validation_failed"] = False
+    handler = FakeServiceHandler(fail_validation=["a"])
+    report = _run([step], _rollbacks("a"), handler=handler)
+
+    assert report.outcome("a").status == "validation_failed"
+    assert not report.outcome("a").rolled_back
+    assert handler.applied == {"a"}
+
+
+def test_a_hanging_action_times_out_and_is_rolled_back():
+    handler = FakeServiceHandler(hang=["a"])
+    report = _run([_step("a"), _step("b", minutes=1)], _rollbacks("a"), handler=handler, action_timeout=0.05)
+
+    a = report.outcome("a")
+    assert a.status == "timeout"
+    assert a.error == "Timed out after 0.05s"
+    assert a.rolled_back
+    assert report.outcome("b").succeeded
+
+
+def test_dependents_of_a_failed_step_are_skipped_and_manual_waits_block():
+    plan = [
+        _step("a"),
+        _step("b", ["a"]),
+        _step("c", ["b"]),
+        _step("review", level="manual"),
+        _step("d", ["review"]),
+        _step("e"),
+    ]
+    handler = FakeServiceHandler(fail=["a"])
+    report = _run(plan, _rollbacks("a"), handler=handler)
+
+    assert report.outcome("a").status == "failed"
+    assert report.outcome("b").status == "skipped"
+    assert report.outcome("b").error == "Dependency a did not succeed"
+    # The skip propagates down the chain
+    assert report.outcome("c").status == "skipped"
+    assert report.outcome("d").status == "blocked"
+    assert report.outcome("e").succeeded
+    # Manual steps are never executed
+    assert [o.action for o in report.outcomes] == ["a", "b", "c", "d", "e"]
+    assert not any(call[1] in ("b", "c", "d", "review") for call in handler.calls)
+
+
+def test_rollback_all_undoes_completed_steps_newest_first():
+    plan = [_step("a", minutes=1), _step("b", ["a"], minutes=1), _step("c", ["b"], minutes=1), _step("d", ["c"])]
+    handler = FakeServiceHandler(fail=["c"])
+    report = _run(plan, _rollbacks("a", "b", "c", "d"), handler=handler, rollback_all=True)
+
+    assert report.outcome("c").status == "failed"
+    assert report.outcome("d").status == "skipped"
+    assert report.outcome("a").rolled_back and report.outcome("b").rolled_back
+    rollbacks = [call[1] for call in handler.calls if call[0] == "rollback"]
+    assert rollbacks == ["c", "b", "a"]
+    assert handler.applied == set()
+
+
+def test_recommender_executes_with_registered_handlers(monkeypatch):
+    monkeypatch.setattr(executor_module, "REMEDIATION_HANDLERS", {})
+    monkeypatch.setattr("agent_manager.sub_agents.action_recommender.agent.REMEDIATION_HANDLERS", executor_module.REMEDIATION_HANDLERS)
+    recommendations = {"automation_context": {"execution_plan": [_step("a"), _step("b")], "rollback_strategy": _rollbacks()}}
+    recommender = IntelligentActionRecommender()
+
+    report = asyncio.run(recommender.execute_recommendations(recommendations))
+    assert report.outcome("a").status == "failed"
+    assert report.outcome("a").error == "No handler for a"
+
+    fallback, for_b = FakeServiceHandler(), FakeServiceHandler()
+    executor_module.register_handler(fallback)
+    executor_module.register_handler(for_b, ["b"])
+    report = asyncio.run(recommender.execute_recommendations(recommendations))
+    assert report.succeeded
+    assert fallback.applied == {"a"} and for_b.applied == {"b"}
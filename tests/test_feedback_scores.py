@@ -0,0 +1,116 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from agent_manager.feedback_scores import FeedbackScoreTable
+from agent_manager.models import Base, Feedback
+from agent_manager.sub_agents.action_recommender import agent as recommender_module
+from agent_manager.sub_agents.action_recommender.agent import ActionType, IntelligentActionRecommender
+
+NOW = datetime.datetime(2025, 6, 20, 12, 0)
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feedback.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _feedback(engine, score, actions=(), tools=(), days_ago=0):
+    with Session(engine) as session:
+        session.add(
+            Feedback(
+                agent_name="action_recommender",
+                feedback_type="effectiveness",
+                timestamp=NOW - datetime.timedelta(days=days_ago),
+                effectiveness_score=score,
+                context_json={"actions": list(actions)},
+                tools_used=list(tools),
+            )
+        )
+        session.commit()
+
+
+def _table(tmp_path, **options):
+    return FeedbackScoreTable(engine=_engine(tmp_path), half_life_days=14, prior_weight=5, **options)
+
+
+def test_scores_are_bayesian_averages_of_decayed_feedback(tmp_path):
+    table = _table(tmp_path, refresh_interval=3600)
+    for _ in range(3):
+        _feedback(table.engine, 5, actions=["restart_services"], tools=["log_reader"])
+    # A two-week-old observation counts half at the 14-day half-life
+    _feedback(table.engine, 1, actions=["scale_resources"], days_ago=14)
+
+    assert table.refresh(now=NOW.timestamp()) == 4
+    # (prior_weight * prior + decayed score sum) / (prior_weight + decayed weight)
+    assert table.action_score("restart_services") == pytest.approx((5 * 0.5 + 3) / (5 + 3))
+    assert table.tool_score("log_reader", prior=0.2) == pytest.approx((5 * 0.2 + 3) / (5 + 3))
+    assert table.action_score("scale_resources") == pytest.approx((5 * 0.5 + 0) / (5 + 0.5))
+    # Unseen actions get their prior
+    assert table.action_score("block_suspicious_ips", prior=0.85) == 0.85
+
+
+def test_refresh_folds_in_only_new_rows(tmp_path):
+    table = _table(tmp_path, refresh_interval=3600)
+    _feedback(table.engine, 5, actions=["restart_services"])
+    _feedback(table.engine, None, actions=["restart_services"])
+    assert table.refresh(now=NOW.timestamp()) == 1
+    assert table.refresh(now=NOW.timestamp()) == 0
+
+    _feedback(table.engine, 1, actions=["restart_services"])
+    assert table.refresh(now=NOW.timestamp()) == 1
+    assert table.action_score("restart_services") == pytest.approx((5 * 0.5 + 1) / (5 + 2))
+
+
+def test_lookups_refresh_stale_tables_in_the_background(tmp_path):
+    table = _table(tmp_path, refresh_interval=3600)
+    _feedback(table.engine, 5, actions=["restart_services"])
+    # Nothing runs until the first lookup; building the recommender does not start one
+    global_thread = recommender_module.feedback_scores._thread
+    IntelligentActionRecommender()
+    assert recommender_module.feedback_scores._thread is global_thread
+    assert table._thread is None
+
+    # The first lookup answers from the empty tables and starts a refresh
+    assert table.action_score("restart_services") == 0.5
+    table._thread.join(5)
+    assert table.action_score("restart_services") > 0.5
+
+    # Fresh tables start no further refresh
+    refreshed = table._thread
+    _feedback(table.engine, 1, actions=["restart_services"])
+    table.action_score("restart_services")
+    assert table._thread is refreshed
+
+
+def test_a_failed_background_refresh_waits_an_interval(tmp_path, capsys):
+    table = FeedbackScoreTable(engine=create_engine(f"sqlite:///{tmp_path / 'empty.db'}"), refresh_interval=3600)
+    table.tool_score("log_reader")
+    table._thread.join(5)
+
+    assert "Feedback score refresh failed" in capsys.readouterr().out
+    failed = table._thread
+    table.tool_score("log_reader")
+    assert table._thread is failed
+
+
+def test_feedback_reorders_recommendations(tmp_path, monkeypatch):
+    table = _table(tmp_path, refresh_interval=3600)
+    for _ in range(5):
+        _feedback(table.engine, 5, actions=["scale_resources"])
+        _feedback(table.engine, 1, actions=["restart_services"])
+    table.refresh(now=NOW.timestamp())
+    monkeypatch.setattr(recommender_module, "feedback_scores", table)
+
+    actions = [
+        {"action": "restart_services", "automation_level": ActionType.AUTOMATED, "success_rate": 0.8, "estimated_time": "10_minutes"},
+        {"action": "scale_resources", "automation_level": ActionType.AUTOMATED, "success_rate": 0.8, "estimated_time": "10_minutes"},
+    ]
+    ranked = IntelligentActionRecommender()._prioritize_actions(actions, "high")
+
+    assert [a["action"] for a in ranked] == ["scale_resources", "restart_services"]
+    assert ranked[0]["effectiveness_score"] > 0.8 > ranked[1]["effectiveness_score"]
+    assert ranked[0]["priority_score"] > ranked[1]["priority_score"]
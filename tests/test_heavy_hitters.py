@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agent_manager.tools.heavy_hitters import HEAVY_HITTER_TOOLS, HeavyHitters, SpaceSaving
+
+START = datetime(2025, 6, 20, tzinfo=timezone.utc)
+
+
+def _log(hour, message, region="us-east1", agent="a1", severity="ERROR"):
+    when = START + timedelta(hours=hour, minutes=5)
+    return {
+        "severity": severity,
+        "jsonPayload": {"timestamp": when.strftime("%Y-%m-%dT%H:%M:%SZ"), "message": message, "region": region, "agent_id": agent},
+    }
+
+
+def _epoch(hour):
+    return int((START + timedelta(hours=hour)).timestamp())
+
+
+def _skewed_stream():
+    # Item i appears 200 // (i + 1) times, interleaved
+    counts = {f"item-{i}": 200 // (i + 1) for i in range(100)}
+    stream = []
+    for round_ in range(200):
+        stream += [item for item, count in counts.items() if count > round_]
+    return counts, stream
+
+
+def test_space_saving_evicts_the_smallest_counter():
+    summary = SpaceSaving(capacity=3)
+    for item, count in (("a", 5), ("b", 3), ("c", 1)):
+        summary.add(item, count)
+    summary.add("d")
+
+    assert "c" not in summary and len(summary) == 3
+    # The newcomer inherits the evicted count as its error
+    assert summary.top(3) == [("a", 5, 0), ("b", 3, 0), ("d", 2, 1)]
+    assert summary.total == 10
+    assert summary.min_count() == 2
+
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
+
+
+def test_space_saving_error_bounds_on_a_skewed_stream():
+    counts, stream = _skewed_stream()
+    summary = SpaceSaving(capacity=20)
+    for item in stream:
+        summary.add(item)
+
+    assert summary.total == len(stream)
+    for item, count, error in summary.top(20):
+        assert count - error <= counts[item] <= count
+        assert error <= summary.total / summary.capacity
+    # Everything more frequent than total / capacity is tracked
+    assert all(item in summary for item, count in counts.items() if count > summary.total / summary.capacity)
+    assert [item for item, _, _ in summary.top(3)] == ["item-0", "item-1", "item-2"]
+
+
+def test_space_saving_merge_keeps_the_bounds():
+    counts, stream = _skewed_stream()
+    left, right = SpaceSaving(capacity=20), SpaceSaving(capacity=20)
+    for i, item in enumerate(stream):
+        (left if i % 2 else right).add(item)
+
+    merged = left.merge(right)
+    assert merged.total == len(stream)
+    assert len(merged) <= merged.capacity
+    for item, count, error in merged.top(20):
+        assert count - error <= counts[item] <= count
+    assert [item for item, _, _ in merged.top(3)] == ["item-0", "item-1", "item-2"]
+    # Small summaries merge without losing anything
+    small = SpaceSaving(capacity=5)
+    small.add("x", 2)
+    other = SpaceSaving(capacity=5)
+    other.add("x", 3)
+    other.add("y")
+    assert small.merge(other).top(5) == [("x", 5, 0), ("y", 1, 0)]
+
+
+def _logs():
+    logs = [_log(0, f"timeout after {5000 + i} ms", region="us-east1", agent=f"a{i % 2}") for i in range(6)]
+    logs += [_log(0, "disk full", region="eu-west1", agent="a2") for _ in range(4)]
+    logs += [_log(1, "disk full", region="eu-west1", agent="a2") for _ in range(3)]
+    logs += [_log(1, "connection refused", region="us-east1", agent="a1") for _ in range(2)]
+    logs += [_log(1, "all good", severity="INFO") for _ in range(20)]
+    return logs
+
+
+def test_top_templates_and_messages():
+    hitters = HeavyHitters(capacity=10, window_hours=0)
+    assert hitters.ingest(_logs()) == 35
+
+    assert hitters.most_frequent_error_types() == [
+        {"failure_type": "disk full", "count": 7, "count_error": 0, "regions": "eu-west1"},
+        {"failure_type": "timeout after <num> ms", "count": 6, "count_error": 0, "regions": "us-east1"},
+        {"failure_type": "connection refused", "count": 2, "count_error": 0, "regions": "us-east1"},
+    ]
+    patterns = hitters.frequent_failure_patterns(limit=2)
+    assert patterns[0] == {"failure_message": "disk full", "occurrences": 7, "occurrences_error": 0, "involved_agents": "a2"}
+    assert patterns[1]["failure_message"] == "connection refused"
+
+
+def test_since_until_windows_merge_the_hours_in_range():
+    hitters = HeavyHitters(capacity=10, window_hours=0)
+    hitters.ingest(_logs())
+
+    hour0 = hitters.most_frequent_error_types(until=_epoch(1))
+    assert [(r["failure_type"], r["count"]) for r in hour0] == [("timeout after <num> ms", 6), ("disk full", 4)]
+    hour1 = hitters.most_frequent_error_types(since=_epoch(1))
+    assert [(r["failure_type"], r["count"]) for r in hour1] == [("disk full", 3), ("connection refused", 2)]
+    assert hitters.most_frequent_error_types(since=_epoch(2)) == []
+
+
+def test_region_and_agent_scopes():
+    hitters = HeavyHitters(capacity=10, window_hours=0)
+    hitters.ingest(_logs())
+
+    us = hitters.most_frequent_error_types(region="us-east1")
+    assert [(r["failure_type"], r["count"]) for r in us] == [("timeout after <num> ms", 6), ("connection refused", 2)]
+    a0 = hitters.frequent_failure_patterns(agent_id="a0")
+    assert [r["failure_message"] for r in a0] == [f"timeout after {5000 + i} ms" for i in (0, 2, 4)]
+    assert all(r["involved_agents"] == "a0" for r in a0)
+    assert hitters.frequent_failure_patterns(region="nowhere") == []
+
+
+def test_expired_hours_leave_the_live_summaries():
+    hitters = HeavyHitters(capacity=10, window_hours=1)
+    hitters.ingest(_logs())
+    assert hitters.most_frequent_error_types()[0]["count"] == 7
+
+    # Hour 2 moves the cutoff past hour 0
+    hitters.ingest([_log(2, "disk full", region="eu-west1", agent="a2")])
+    assert all(hour >= _epoch(1) for hour, _, _ in hitters.hours)
+    rows = {r["failure_type"]: r["count"] for r in hitters.most_frequent_error_types()}
+    assert rows == {"disk full": 4, "connection refused": 2}
+    # The live summaries agree with merging the remaining hours
+    assert hitters.most_frequent_error_types() == hitters.most_frequent_error_types(since=_epoch(0))
+
+
+def test_merging_shards_matches_one_summary_of_everything():
+    logs = _logs()
+    whole = HeavyHitters(capacity=10, window_hours=0)
+    whole.ingest(logs)
+    left, right = HeavyHitters(capacity=10, window_hours=0), HeavyHitters(capacity=10, window_hours=0)
+    left.ingest(logs[::2])
+    right.ingest(logs[1::2])
+
+    merged = left.merge(right)
+    assert merged.rows_ingested == 35
+    assert merged.most_frequent_error_types() == whole.most_frequent_error_types()
+    assert merged.frequent_failure_patterns(region="us-east1") == whole.frequent_failure_patterns(region="us-east1")
+
+
+def test_tools_report_error_bounds():
+    hitters = HeavyHitters(capacity=10, window_hours=0)
+    hitters.ingest(_logs())
+    tools = {tool.__name__: tool for tool in hitters.as_tools()}
+    assert set(tools) == set(HEAVY_HITTER_TOOLS)
+
+    assert "count_error" in tools["most_frequent_error_types"]()[0]
+    end = (START + timedelta(hours=1)).isoformat()
+    assert tools["frequent_failure_patterns"](end_time=end)[0]["occurrences"] == 4
+    assert "occurrences_error" in tools["frequent_failure_patterns"]()[0]
@@ -0,0 +1,24 @@
+import importlib.util
+import os
+
+from conftest import ROOT
+
+_spec = importlib.util.spec_from_file_location("bench_import_time", os.path.join(ROOT, "scripts", "bench_import_time.py"))
+bench_import_time = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench_import_time)
+
+
+def test_cold_import_needs_no_model_or_toolbox_and_defers_clients_and_agents():
+    # MODEL is unset and TOOLBOX_URL points at a closed port in the child interpreter. Wall time is
+    # left to scripts/bench_import_time.py: it is too noisy on a shared machine to assert on here.
+    _, _, loaded = bench_import_time._import_once(bench_import_time.TARGET)
+    assert loaded == [], f"imported eagerly: {loaded}"
+
+
+def test_root_agent_is_still_built_for_the_adk_loader():
+    from google.adk.cli.utils.agent_loader import AgentLoader
+
+    root_agent = AgentLoader(ROOT).load_agent("agent_manager")
+    assert [agent.name for agent in root_agent.sub_agents] == [
+        "detector", "planner", "action_recommender", "fixer", "notifier",
+    ]
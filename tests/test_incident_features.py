@@ -0,0 +1,135 @@
+import pytest
+
+from agent_manager.incident_features import EVIDENCE_SAMPLE_SIZE, IncidentFeatures
+from agent_manager.sub_agents.planner.agent import IntelligentIncidentPlanner
+
+
+# --- Baseline: the planner's per-assessment pattern scans before IncidentFeatures ---
+def _baseline_analysis(planner, detector_data):
+    analysis = detector_data.get("detailed_analysis", {})
+    patterns = analysis.get("patterns_found", [])
+    anomalies = analysis.get("anomalies", [])
+
+    incident_type = "infrastructure_failure"
+    for pattern in patterns:
+        category = pattern.get("category", "")
+        if "database" in category:
+            incident_type = "database_failure"
+        elif "api" in category:
+            incident_type = "api_degradation"
+        elif "performance" in category:
+            incident_type = "performance_issue"
+        elif "security" in category:
+            incident_type = "security_breach"
+        else:
+            continue
+        break
+
+    critical = sum(1 for p in patterns if p.get("severity") == "critical")
+    high = sum(1 for p in patterns if p.get("severity") == "high")
+    priority = "critical" if critical else "high" if high > 2 else "medium" if high else "low"
+
+    total = len(patterns)
+    complexity = total + len(anomalies)
+    impact = {
+        "affected_users": "large_scale" if total > 100 else "medium_scale" if total > 50 else "small_scale" if total > 10 else "limited_scale",
+        "service_degradation": "severe_degradation" if critical > 5 else "moderate_degradation" if critical > 2 else "minor_degradation" if critical else "no_degradation",
+        "data_risk": "high_risk" if any(p.get("category") == "security_events" for p in patterns) else "low_risk",
+        "recovery_time_estimate": "4-8_hours" if complexity > 20 else "2-4_hours" if complexity > 10 else "1-2_hours" if complexity > 5 else "30_minutes_1_hour",
+    }
+
+    hypotheses = []
+    for category, hypothesis, confidence, steps in (
+        ("database_errors", "Database connection pool exhaustion", 0.85, ["Check connection pool metrics", "Review database load", "Analyze connection patterns"]),
+        ("api_errors", "API rate limiting or authentication issues", 0.75, ["Check API rate limits", "Verify authentication tokens", "Review API endpoint health"]),
+    ):
+        evidence = [p.get("message") for p in patterns if p.get("category") == category]
+        if evidence:
+            hypotheses.append({"hypothesis": hypothesis, "confidence": confidence, "evidence": evidence, "investigation_steps": steps})
+
+    services = set()
+    for pattern in patterns:
+        message = pattern.get("message", "").lower()
+        if "api" in message:
+            services.add("api_gateway")
+        if "database" in message or "sql" in message:
+            services.add("database")
+        if "auth" in message or "login" in message:
+            services.add("authentication")
+        if "payment" in message:
+            services.add("payment_processing")
+
+    return {
+        "incident_type": incident_type,
+        "priority": priority,
+        "impact_assessment": impact,
+        "root_cause_hypothesis": hypotheses,
+        "affected_services": list(services),
+        "business_impact": planner._assess_business_impact(priority),
+    }
+
+
+def _pattern(category, severity, message):
+    return {"category": category, "severity": severity, "message": message}
+
+
+PAYLOADS = {
+    "mixed": {
+        "detailed_analysis": {
+            "patterns_found": [_pattern("api_errors", "high", f"API 503 from payment gateway #{i}") for i in range(6)]
+            + [_pattern("database_errors", "critical", f"SQL timeout on replica {i}") for i in range(4)]
+            + [_pattern("security_events", "medium", f"Failed login for user {i}") for i in range(3)]
+            + [_pattern("performance_issues", "low", "CPU saturation")],
+            "anomalies": [{"type": "spike"}] * 3,
+            "correlations": [{"pattern": "cascade"}],
+        }
+    },
+    "performance": {
+        "detailed_analysis": {
+            "patterns_found": [_pattern("performance_issues", "high", f"Slow response {i}ms") for i in range(3)],
+            "anomalies": [],
+        }
+    },
+    "empty": {"detailed_analysis": {"patterns_found": []}},
+}
+
+
+def _plan_without_ids(planner, analysis):
+    plan = planner.create_response_plan(analysis)
+    plan.pop("incident_id"), plan.pop("created_at")
+    return plan
+
+
+@pytest.mark.parametrize("name", list(PAYLOADS))
+def test_planner_matches_the_baseline(name):
+    planner = IntelligentIncidentPlanner()
+    payload = PAYLOADS[name]
+
+    analysis = planner.analyze_incident_context(payload)
+    baseline = _baseline_analysis(planner, payload)
+    # The baseline collected services in a set; the refactor keeps first-appearance order
+    assert sorted(analysis["affected_services"]) == sorted(baseline["affected_services"])
+    baseline["affected_services"] = analysis["affected_services"]
+
+    assert analysis == baseline
+    assert _plan_without_ids(planner, analysis) == _plan_without_ids(planner, baseline)
+
+
+def test_features_reused_for_the_analysis_give_the_same_result():
+    planner = IntelligentIncidentPlanner()
+    payload = PAYLOADS["mixed"]
+    features = IncidentFeatures.from_detector_data(payload)
+
+    assert planner.analyze_incident_context(payload, features) == planner.analyze_incident_context(payload)
+    assert features.services == ("api_gateway", "payment_processing", "database", "authentication")
+    assert (features.pattern_count, features.anomaly_count, features.correlation_count) == (14, 3, 1)
+
+
+def test_evidence_lists_distinct_messages_up_to_the_sample_size():
+    repeated = [_pattern("database_errors", "high", "SQL timeout")] * 5
+    many = [_pattern("database_errors", "high", f"SQL error {i}") for i in range(EVIDENCE_SAMPLE_SIZE + 5)]
+    features = IncidentFeatures.from_detector_data({"detailed_analysis": {"patterns_found": repeated + many}})
+
+    # Counts still cover every hit
+    assert features.count("database_errors") == 5 + EVIDENCE_SAMPLE_SIZE + 5
+    assert features.evidence["database_errors"] == ("SQL timeout",) + tuple(f"SQL error {i}" for i in range(EVIDENCE_SAMPLE_SIZE - 1))
@@ -0,0 +1,78 @@
+import time
+
+from sqlalchemy import create_engine
+
+from agent_manager.incident_store import IncidentHistoryStore, incident_features
+from agent_manager.models import Base
+
+
+def _detector(database=0, api=0, anomalies=0):
+    patterns = [{"category": "database_errors", "severity": "high", "message": "Database timeout"}] * database
+    patterns += [{"category": "api_errors", "severity": "medium", "message": "API 503"}] * api
+    return {"detailed_analysis": {"patterns_found": patterns, "anomalies": [{}] * anomalies}, "region": "us-central1"}
+
+
+def _store(tmp_path, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'incidents.db'}")
+    Base.metadata.create_all(engine)
+    return IncidentHistoryStore(engine=engine, **kwargs)
+
+
+def test_find_similar_ranks_by_feature_shape(tmp_path):
+    store = _store(tmp_path)
+    store.record_incident("INC-db", "database_failure", "high", _detector(database=50), summary={})
+    store.record_incident("INC-api", "database_failure", "high", _detector(api=50), summary={})
+    store.record_incident("INC-mixed", "database_failure", "high", _detector(database=20, api=20), summary={})
+    store.record_incident("INC-other-type", "network_issue", "high", _detector(database=50), summary={})
+
+    similar = store.find_similar("database_failure", _detector(database=500))
+
+    assert [incident["incident_id"] for incident in similar] == ["INC-db", "INC-mixed", "INC-api"]
+    assert similar[0]["similarity"] > 0.99 and similar[0]["region"] == "us-central1"
+    assert store.find_similar("database_failure", _detector(database=5), exclude_incident_id="INC-db")[0]["incident_id"] == "INC-mixed"
+
+
+def test_find_similar_without_features_returns_nothing(tmp_path):
+    store = _store(tmp_path)
+    store.record_incident("INC-db", "database_failure", "high", _detector(database=50), summary={})
+
+    # e.g. a planner incident_summary, which carries no detector features
+    assert store.find_similar("database_failure", {"incident_type": "database_failure", "priority": "high"}) == []
+
+
+def test_stored_vector_can_drive_the_lookup(tmp_path):
+    store = _store(tmp_path)
+    store.record_incident("INC-old", "database_failure", "high", _detector(database=50), summary={})
+    store.record_incident("INC-new", "database_failure", "high", _detector(database=30), summary={})
+
+    vector = store.feature_vector("INC-new")
+
+    assert len(vector) == len(incident_features(_detector(database=30)))
+    assert [i["incident_id"] for i in store.find_similar("database_failure", vector=vector, exclude_incident_id="INC-new")] == ["INC-old"]
+    assert store.feature_vector("INC-missing") is None
+
+
+def test_candidate_limit_keeps_only_the_newest_candidates(tmp_path):
+    store = _store(tmp_path, candidate_limit=2)
+    for incident_id, detector in (
+        ("INC-best-but-old", _detector(database=50)),
+        ("INC-2", _detector(api=50)),
+        ("INC-3", _detector(api=40, database=1)),
+    ):
+        store.record_incident(incident_id, "database_failure", "high", detector, summary={})
+        time.sleep(0.002)  # distinct created_at values
+
+    similar = store.find_similar("database_failure", _detector(database=50))
+
+    assert {incident["incident_id"] for incident in similar} == {"INC-2", "INC-3"}
+
+
+def test_record_resolution_is_returned_with_similar_incidents(tmp_path):
+    store = _store(tmp_path)
+    store.record_incident("INC-db", "database_failure", "high", _detector(database=50), summary={})
+
+    assert store.record_resolution("INC-db", {"recommended_actions": ["restart_services"]})
+    assert not store.record_resolution("INC-missing", {})
+    assert store.find_similar("database_failure", _detector(database=5))[0]["resolution"] == {
+        "recommended_actions": ["restart_services"]
+    }
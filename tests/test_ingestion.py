@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from agent_manager.ingestion import IngestionWorker, QueueSource
+
+START = datetime(2025, 6, 20, tzinfo=timezone.utc)
+
+
+def _error(hour, i):
+    when = START + timedelta(hours=hour, seconds=i)
+    return {"severity": "ERROR", "jsonPayload": {"timestamp": when.isoformat(), "agent_id": "a1", "message": "Database error"}}
+
+
+async def _run(rows, batch_size):
+    source = QueueSource()
+    results = []
+    worker = IngestionWorker([source], on_batch=results.append, batch_size=batch_size, max_latency=0.05)
+    task = asyncio.create_task(worker.run())
+    for row in rows:
+        await source.publish(row)
+    while worker.stats.rows < len(rows):
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return worker, results
+
+
+def test_worker_flags_a_spike_against_earlier_batches():
+    # Four hours at 25 errors each, then a 100-error hour; every micro-batch covers a single hour
+    rows = [_error(hour, i) for hour in range(4) for i in range(25)] + [_error(4, i) for i in range(100)]
+
+    worker, results = asyncio.run(_run(rows, batch_size=25))
+
+    spikes = [anomaly for result in results for anomaly in result.anomalies if anomaly["type"] == "error_spike"]
+    assert worker.stats.batches == 8
+    assert spikes and {spike["timestamp"] for spike in spikes} == {"2025-06-20T04"}
+    assert spikes[-1]["count"] == 100
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from agent_manager.llm import AGENT_NAME_LABEL, FakeLlm, RoutedLlm, model_ledger
+
+
+def _routed(fast_reply, full_reply='{"answer": "full", "confidence": 0.95}'):
+    llm = RoutedLlm(model="fake/full", fast_model="fake/fast")
+    fast = FakeLlm(model="fake/fast", responder=lambda request: fast_reply)
+    full = FakeLlm(model="fake/full", responder=lambda request: full_reply)
+    llm._fast._client, llm._full._client = fast, full
+    return llm, fast, full
+
+
+def _request():
+    return LlmRequest(
+        model="fake/full",
+        contents=[types.Content(role="user", parts=[types.Part(text="format this alert")])],
+        config=types.GenerateContentConfig(labels={AGENT_NAME_LABEL: "notifier"}),
+    )
+
+
+def _run(llm, stream=False):
+    async def collect():
+        return [response async for response in llm.generate_content_async(_request(), stream)]
+
+    return asyncio.run(collect())
+
+
+def _text(responses):
+    return "".join(part.text or "" for r in responses for part in r.content.parts)
+
+
+def test_confident_fast_reply_is_served_by_the_fast_model():
+    model_ledger.clear()
+    llm, fast, full = _routed('{"answer": "fast", "confidence": 0.9}')
+    responses = _run(llm)
+    assert json.loads(_text(responses))["answer"] == "fast"
+    assert [r.model for r in fast.requests] == ["fake/fast"]
+    assert full.requests == []
+    [call] = model_ledger.calls
+    assert (call.agent_name, call.model, call.tier, call.escalated) == ("notifier", "fake/fast", "fast", False)
+
+
+def test_ambiguous_fast_reply_escalates_to_the_full_model():
+    model_ledger.clear()
+    llm, fast, full = _routed('{"answer": "fast", "ambiguous": true}')
+    responses = _run(llm)
+    assert json.loads(_text(responses))["answer"] == "full"
+    assert [r.model for r in fast.requests] == ["fake/fast"]
+    assert [r.model for r in full.requests] == ["fake/full"]
+    assert [(c.model, c.escalated) for c in model_ledger.calls] == [("fake/fast", True), ("fake/full", False)]
+
+
+def test_low_confidence_and_errors_escalate():
+    llm, _, full = _routed('{"answer": "fast", "confidence_score": 0.2}')
+    _run(llm)
+    assert len(full.requests) == 1
+
+    error = LlmResponse(error_code="RESOURCE_EXHAUSTED", error_message="quota")
+    llm, _, full = _routed(error)
+    _run(llm)
+    assert len(full.requests) == 1
+
+
+def test_function_calls_and_plain_text_are_accepted_from_the_fast_model():
+    call = LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "detector"}))])
+    )
+    llm, _, full = _routed(call)
+    responses = _run(llm)
+    assert responses[0].content.parts[0].function_call.name == "transfer_to_agent"
+    assert full.requests == []
+
+    llm, _, full = _routed("All systems recovered.")
+    assert _text(_run(llm)) == "All systems recovered."
+    assert full.requests == []
@@ -0,0 +1,20 @@
+from agent_manager.tools.log_batch import LogBatch, iter_log_batches, stream_count_by
+
+
+def _rows(n):
+    for i in range(n):
+        yield {"severity": "ERROR" if i % 3 else "INFO", "jsonPayload": {"agent_id": f"a{i % 7}", "region": f"r{i % 2}"}}
+
+
+def test_stream_count_by_matches_one_batch_across_chunks():
+    whole = LogBatch.from_rows(_rows(1000)).count_by("agent_id", "severity", where={"region": {"r1"}})
+
+    assert stream_count_by(_rows(1000), "agent_id", "severity", where={"region": {"r1"}}, chunk_rows=64) == whole
+
+
+def test_iter_log_batches_consumes_rows_lazily():
+    rows = _rows(1000)
+    batches = iter_log_batches(rows, chunk_rows=100)
+
+    assert len(next(batches)) == 100
+    assert len(list(rows)) == 900
@@ -0,0 +1,20 @@
+import gzip
+import json
+
+from agent_manager.tools.log_reader import read_logs
+
+
+def _log(i):
+    return {"severity": "ERROR", "jsonPayload": {"agent_id": f"a{i}", "timestamp": "2025-06-20T00:00:00Z"}}
+
+
+def test_json_array_files_are_read(tmp_path):
+    (tmp_path / "array.json").write_text("\n  " + json.dumps([_log(i) for i in range(5)]))
+    with gzip.open(tmp_path / "array.json.gz", "wt") as f:
+        json.dump([_log(i) for i in range(5, 8)], f)
+    (tmp_path / "rows.ndjson").write_text("".join(json.dumps(_log(i)) + "\n" for i in range(8, 10)))
+
+    batch = read_logs(str(tmp_path))
+
+    assert len(batch) == 10
+    assert sorted(batch.column("agent_id")) == sorted(f"a{i}" for i in range(10))
@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from agent_manager.response_cache import LlmResponseCache, cache_key
+
+
+def _cache(tmp_path, **options):
+    return LlmResponseCache(path=str(tmp_path / "cache.db"), enabled=True, **options)
+
+
+def _context(agent_name="detector", invocation_id="inv-1"):
+    return SimpleNamespace(agent_name=agent_name, invocation_id=invocation_id)
+
+
+def _request(text="Analyze the logs", instruction="You are the detector.", model="azure/gpt-4o", tools=("most_frequent_error_types",), extra=()):
+    request = LlmRequest(
+        model=model,
+        contents=[types.Content(role="user", parts=[types.Part(text=text)]), *extra],
+        config=types.GenerateContentConfig(system_instruction=instruction),
+    )
+    for name in tools:
+        request.tools_dict[name] = None
+    return request
+
+
+def _tool_turns(rows, call_id="call-1"):
+    return (
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(id=call_id, name="most_frequent_error_types", args={"limit": 5}))]),
+        types.Content(
+            role="user",
+            parts=[types.Part(function_response=types.FunctionResponse(id=call_id, name="most_frequent_error_types", response={"rows": rows}))],
+        ),
+    )
+
+
+def _reply(text="{}"):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def test_key_covers_agent_model_instruction_tools_and_input():
+    key = cache_key("detector", _request())
+
+    assert cache_key("planner", _request()) != key
+    assert cache_key("detector", _request(model="azure/gpt-4o-mini")) != key
+    assert cache_key("detector", _request(instruction="You are the planner.")) != key
+    assert cache_key("detector", _request(tools=())) != key
+    assert cache_key("detector", _request(text="Analyze other logs")) != key
+    # Tool order and surrounding whitespace do not matter
+    assert cache_key("detector", _request(tools=("b", "a"))) == cache_key("detector", _request(tools=("a", "b")))
+    assert cache_key("detector", _request(text="  Analyze the logs\n")) == key
+
+
+def test_key_digests_tool_results_but_not_call_ids():
+    key = cache_key("detector", _request(extra=_tool_turns([{"count": 7}])))
+
+    assert cache_key("detector", _request(extra=_tool_turns([{"count": 7}], call_id="call-2"))) == key
+    assert cache_key("detector", _request(extra=_tool_turns([{"count": 8}]))) != key
+
+
+def test_identical_requests_are_served_from_the_cache(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.before_model(_context(), _request()) is None
+    cache.after_model(_context(), _reply('{"status": "ok"}'))
+
+    hit = cache.before_model(_context(invocation_id="inv-2"), _request())
+    assert hit.content.parts[0].text == '{"status": "ok"}'
+    assert hit.custom_metadata == {"cache_hit": True}
+    assert cache.stats == {"hits": 1, "misses": 1, "stores": 1, "evictions": 0}
+    # The store survives a restart
+    assert _cache(tmp_path).before_model(_context(), _request()) is not None
+
+
+def test_changed_tool_results_bypass_a_cached_reply(tmp_path):
+    cache = _cache(tmp_path)
+    call = types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(id="call-9", name="most_frequent_error_types", args={"limit": 5}))])
+    cache.before_model(_context(), _request())
+    cache.after_model(_context(), LlmResponse(content=call))
+
+    # Tool calls are stored without their per-call id
+    replay = cache.before_model(_context(invocation_id="inv-2"), _request())
+    assert replay.content.parts[0].function_call.id is None
+
+    cache.before_model(_context(), _request(extra=_tool_turns([{"count": 7}])))
+    cache.after_model(_context(), _reply("seven"))
+    assert cache.before_model(_context(), _request(extra=_tool_turns([{"count": 8}]))) is None
+    assert cache.before_model(_context(), _request(extra=_tool_turns([{"count": 7}], call_id="x"))).content.parts[0].text == "seven"
+
+
+def test_partial_error_and_disabled_responses_are_not_stored(tmp_path):
+    cache = _cache(tmp_path)
+    cache.before_model(_context(), _request())
+    cache.after_model(_context(), LlmResponse(content=types.Content(role="model", parts=[types.Part(text="{")]), partial=True))
+    cache.after_model(_context(), LlmResponse(error_code="RATE_LIMIT", error_message="slow down"))
+    assert cache.before_model(_context(), _request()) is None
+    assert cache.stats["stores"] == 0
+
+    disabled = LlmResponseCache(path=str(tmp_path / "off.db"), enabled=False)
+    assert disabled.before_model(_context(), _request()) is None
+    disabled.after_model(_context(), _reply())
+    assert disabled.stats == {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    content = _reply().content
+    cache.put("k", "detector", content, now=1000)
+
+    assert cache.get("k", now=1059) is not None
+    assert cache.get("k", now=1061) is None
+    # The expired entry is deleted, not just skipped
+    assert cache.conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0] == 0
+    assert cache._total_bytes == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(tmp_path):
+    content = _reply("x" * 100).content
+    size = len(content.model_dump_json(exclude_none=True))
+    # Room for three entries; a fourth evicts down to 90% of the limit, one entry's worth
+    cache = _cache(tmp_path, max_bytes=int(3.5 * size))
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, "detector", content, now=1000 + i)
+    # Reading "a" makes "b" the least recently used
+    cache.get("a", now=1010)
+
+    cache.put("d", "detector", content, now=1020)
+    assert cache.get("b", now=1021) is None
+    assert all(cache.get(key, now=1021) is not None for key in ("a", "c", "d"))
+    assert cache.stats["evictions"] == 1
+    assert cache._total_bytes <= cache.max_bytes
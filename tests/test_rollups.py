@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+
+from agent_manager.tools.rollups import LogRollups
+
+START = datetime(2025, 6, 20, tzinfo=timezone.utc)
+
+
+def _error(when):
+    return {"severity": "ERROR", "jsonPayload": {"timestamp": when.isoformat(), "agent_id": "a1", "message": "boom"}}
+
+
+def _total(rollups, since, until):
+    return rollups.total_error_logs(since=int(since.timestamp()), until=int(until.timestamp()))[0]["total_error_logs"]
+
+
+def test_window_is_rounded_to_the_minute_not_the_hour():
+    rollups = LogRollups(minute_retention_hours=0)
+    # One error every minute for three hours
+    rollups.ingest(_error(START + timedelta(minutes=i)) for i in range(180))
+
+    assert _total(rollups, START + timedelta(minutes=50), START + timedelta(minutes=70)) == 20
+    assert _total(rollups, START + timedelta(minutes=30), START + timedelta(minutes=150)) == 120
+    assert _total(rollups, START + timedelta(hours=1), START + timedelta(hours=2)) == 60
+    # A partial minute at either edge is counted whole
+    assert _total(rollups, START + timedelta(minutes=10, seconds=30), START + timedelta(minutes=20, seconds=1)) == 11
+
+
+def test_edges_without_minute_buckets_fall_back_to_the_hour():
+    rollups = LogRollups(minute_retention_hours=1)
+    rollups.ingest(_error(START + timedelta(minutes=i)) for i in range(180))
+
+    # Minutes of the first hour have expired, so its edge covers the whole hour; the last hour's is exact
+    assert _total(rollups, START + timedelta(minutes=30), START + timedelta(minutes=150)) == 150
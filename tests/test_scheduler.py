@@ -0,0 +1,90 @@
+import pytest
+
+from agent_manager.sub_agents.action_recommender import scheduler
+from agent_manager.sub_agents.action_recommender.scheduler import parse_minutes, schedule_actions
+
+
+def _action(name, minutes, level="automated"):
+    return {"action": name, "estimated_time": f"{minutes}_minutes", "automation_level": level}
+
+
+def _ranked(investigate_minutes=60):
+    # Ranking order; the restart outranks the scale-up it has to wait for
+    return [
+        _action("restart_app", 10),
+        _action("scale_resources", 30),
+        _action("block_suspicious_ips", 5),
+        _action("investigate_logs", investigate_minutes, level="manual"),
+        _action("enable_caching", 20),
+    ]
+
+
+def test_parse_minutes():
+    assert parse_minutes("45_minutes") == 45
+    assert parse_minutes("1_hours_15_minutes") == 75
+    assert parse_minutes(None) == parse_minutes("unknown") == 30
+
+
+def test_changes_to_one_system_are_chained_in_phase_order():
+    schedule = schedule_actions(_ranked())
+
+    assert schedule.step("restart_app").dependencies == ["scale_resources"]
+    assert all(not schedule.step(name).dependencies for name in ("scale_resources", "block_suspicious_ips", "investigate_logs", "enable_caching"))
+    assert schedule.waves == [["scale_resources", "block_suspicious_ips", "investigate_logs", "enable_caching"], ["restart_app"]]
+
+
+def test_steps_follow_ranking_order_once_their_dependencies_are_met():
+    schedule = schedule_actions(_ranked())
+
+    # The restart is ready after the scale-up and outranks everything still waiting
+    assert [step.name for step in schedule.steps] == [
+        "scale_resources",
+        "restart_app",
+        "block_suspicious_ips",
+        "investigate_logs",
+        "enable_caching",
+    ]
+
+
+def test_critical_path_and_slack():
+    schedule = schedule_actions(_ranked())
+
+    assert schedule.makespan_minutes == 60
+    assert schedule.serial_minutes == 125
+    assert schedule.critical_path == ["investigate_logs"]
+    assert schedule.step("restart_app").earliest_start == 30
+    assert {step.name: step.slack for step in schedule.steps} == {
+        "scale_resources": 20,
+        "restart_app": 20,
+        "block_suspicious_ips": 55,
+        "investigate_logs": 0,
+        "enable_caching": 40,
+    }
+
+    schedule = schedule_actions(_ranked(investigate_minutes=30))
+    assert schedule.makespan_minutes == 40
+    assert schedule.critical_path == ["scale_resources", "restart_app"]
+    assert schedule.step("restart_app").critical and schedule.step("scale_resources").critical
+    assert schedule.step("investigate_logs").slack == 10
+    assert schedule.resolution_time == "40_minutes"
+
+
+def test_duplicate_actions_keep_the_highest_ranked():
+    schedule = schedule_actions([_action("enable_caching", 20), _action("enable_caching", 90)])
+
+    assert [step.name for step in schedule.steps] == ["enable_caching"]
+    assert schedule.makespan_minutes == 20
+
+
+def test_no_actions():
+    schedule = schedule_actions([])
+
+    assert schedule.steps == [] and schedule.waves == [] and schedule.critical_path == []
+    assert schedule.makespan_minutes == 0
+
+
+def test_a_dependency_cycle_is_an_error(monkeypatch):
+    monkeypatch.setattr(scheduler, "_dependencies", lambda actions: {"a": ["b"], "b": ["a"], "c": []})
+
+    with pytest.raises(ValueError, match="Dependency cycle among a, b"):
+        schedule_actions([_action("a", 5), _action("b", 5), _action("c", 5)])
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from agent_manager.schemas import store_structured_output, strip_upstream_replies
+
+PLAN = {"incident_id": "inc-1", "incident_summary": {"incident_type": "database", "priority": "high"}}
+RECOMMENDATIONS = {"recommended_actions": [{"action": "restart_services", "estimated_time": "10_minutes"}]}
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _foreign(author, text):
+    # How ADK replays another agent's event to the current one
+    return types.Content(role="user", parts=[types.Part(text="For context:"), types.Part(text=f"[{author}] said: {text}")])
+
+
+def _own_tool_call():
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name="total_error_logs", args={}))])
+
+
+def _request():
+    return LlmRequest(
+        contents=[
+            _user("investigate the outage"),
+            _foreign("detector", '{"total_error_logs": 3}'),
+            _foreign("planner", '{"incident_id": "inc-1"}'),
+            _foreign("action_recommender", '{"recommended_actions": []}'),
+            _own_tool_call(),
+        ]
+    )
+
+
+def test_consumer_sees_user_messages_and_own_tool_calls_but_not_upstream_replies():
+    request = _request()
+    context = SimpleNamespace(agent_name="fixer", state={"plan": PLAN, "recommendations": RECOMMENDATIONS})
+    strip_upstream_replies(context, request)
+    assert request.contents[0].parts[0].text == "investigate the outage"
+    assert request.contents[1].parts[0].function_call.name == "total_error_logs"
+    assert len(request.contents) == 2
+
+
+def test_reply_is_kept_when_its_output_could_not_be_projected():
+    request = _request()
+    # The recommender's reply did not match its contract, so the projection lacks it
+    context = SimpleNamespace(agent_name="fixer", state={"plan": PLAN, "recommendations": "not json"})
+    strip_upstream_replies(context, request)
+    authors = [c.parts[1].text.split("]")[0][1:] for c in request.contents if len(c.parts) > 1]
+    assert authors == ["action_recommender"]
+
+
+def test_agents_without_a_projection_keep_their_history():
+    request = _request()
+    strip_upstream_replies(SimpleNamespace(agent_name="detector", state={}), request)
+    assert len(request.contents) == 5
+
+
+def test_structured_output_is_stored_by_agent_name():
+    context = SimpleNamespace(agent_name="planner", state={"plan": '```json\n{"incident_id": "inc-1", "success_criteria": []}\n```'})
+    store_structured_output(context)
+    assert context.state["plan"]["incident_id"] == "inc-1"
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agent_manager.tools.sketches import SKETCH_TOOLS, CountMinSketch, HyperLogLog, ImpactSketches
+
+START = datetime(2025, 6, 20, tzinfo=timezone.utc)
+
+
+def _hll(values, precision=10):
+    sketch = HyperLogLog(precision)
+    sketch.update(values)
+    return sketch
+
+
+def _log(hour, user, severity="ERROR", experiment="exp-1", agent="a1", region="us-east1"):
+    when = START + timedelta(hours=hour, minutes=user % 60)
+    return {
+        "severity": severity,
+        "jsonPayload": {
+            "timestamp": when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "agent_id": agent,
+            "experiment_id": experiment,
+            "region": region,
+            "details": {"user_id": f"user-{user}"},
+        },
+    }
+
+
+def _logs():
+    logs = [_log(0, user, experiment=f"exp-{user % 3}", agent=f"a{user % 7}") for user in range(300)]
+    logs += [_log(1, user, severity="CRITICAL", region="eu-west1") for user in range(0, 300, 2)]
+    logs += [_log(1, user, severity="INFO") for user in range(50)]
+    return logs
+
+
+def test_hyperloglog_stays_sparse_until_dense_is_smaller():
+    sketch = _hll(range(100))
+    assert sketch.registers is None
+    assert sketch.nbytes < 1 << 10
+    assert abs(sketch.count() - 100) <= sketch.error_bound()
+
+    sketch.update(range(100, 5000))
+    assert sketch.registers is not None
+    assert sketch.nbytes == 1 << 10
+    assert abs(sketch.count() - 5000) <= sketch.error_bound()
+
+
+def test_hyperloglog_ignores_missing_values():
+    sketch = _hll([None, "", "x", "x"])
+    assert sketch.count() == 1
+
+
+def test_hyperloglog_merge_equals_the_sketch_of_the_union():
+    union = _hll(range(3000)).to_bytes()
+    # Dense into dense, sparse into dense, dense into sparse and sparse into sparse
+    assert _hll(range(2000)).merge(_hll(range(1000, 3000))).to_bytes() == union
+    assert _hll(range(2950)).merge(_hll(range(2900, 3000))).to_bytes() == union
+    assert _hll(range(2900, 3000)).merge(_hll(range(2950))).to_bytes() == union
+    small = _hll(range(60)).merge(_hll(range(40, 100)))
+    assert small.registers is None
+    assert small.to_bytes() == _hll(range(100)).to_bytes()
+
+    with pytest.raises(ValueError):
+        _hll([1]).merge(_hll([1], precision=12))
+
+
+def test_hyperloglog_round_trips_through_bytes():
+    for sketch in (_hll(range(50)), _hll(range(5000))):
+        data = sketch.to_bytes()
+        restored = HyperLogLog.from_bytes(data)
+        assert restored.precision == 10
+        assert restored.count() == sketch.count()
+        assert restored.to_bytes() == data
+    # Serialising a sparse sketch leaves it sparse
+    sparse = _hll(range(50))
+    sparse.to_bytes()
+    assert sparse.registers is None
+
+
+def test_hyperloglog_rejects_bad_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+
+
+def test_count_min_never_undercounts():
+    sketch = CountMinSketch(epsilon=0.05, delta=0.01)
+    true_counts = {f"user-{i}": i % 17 + 1 for i in range(1000)}
+    for key, count in true_counts.items():
+        sketch.add(key, count)
+
+    assert sketch.total == sum(true_counts.values())
+    overcounts = [sketch.estimate(key) - count for key, count in true_counts.items()]
+    assert min(overcounts) >= 0
+    # Beyond the bound only with probability delta per key
+    assert sum(over > sketch.error_bound() for over in overcounts) <= 0.02 * len(overcounts)
+    assert sketch.estimate("never-added") <= sketch.error_bound()
+
+
+def test_count_min_merge_and_round_trip():
+    a, b, both = CountMinSketch(0.01, 0.01), CountMinSketch(0.01, 0.01), CountMinSketch(0.01, 0.01)
+    for i in range(200):
+        (a if i % 2 else b).add(f"k{i % 50}")
+        both.add(f"k{i % 50}")
+    merged = a.merge(b)
+    assert merged.total == both.total == 200
+    assert merged.counters == both.counters
+
+    restored = CountMinSketch.from_bytes(merged.to_bytes())
+    assert (restored.width, restored.depth, restored.total) == (merged.width, merged.depth, 200)
+    assert all(restored.estimate(f"k{i}") == merged.estimate(f"k{i}") for i in range(50))
+
+    with pytest.raises(ValueError):
+        a.merge(CountMinSketch(0.1, 0.01))
+
+
+def test_impact_sketches_answer_the_aggregates():
+    sketches = ImpactSketches(precision=12, retention_hours=0)
+    assert sketches.ingest(_logs()) == 500
+
+    chaos = {row["severity"]: row for row in sketches.system_chaos_summary()}
+    assert chaos["ERROR"]["count"] == 300
+    assert chaos["ERROR"]["affected_agents"] == 7
+    assert chaos["ERROR"]["affected_experiments"] == 3
+    assert chaos["CRITICAL"]["involved_regions"] == "eu-west1"
+
+    summary = sketches.user_impact_summary()[0]
+    assert abs(summary["affected_users"] - 300) <= summary["affected_users_error"]
+    assert (summary["critical_events"], summary["error_events"], summary["total_events"]) == (150, 300, 450)
+
+    rows = {row["user_id"]: row for row in sketches.user_impact_summary(["user-0", "user-1"])}
+    assert rows["user-0"]["critical_events"] >= 1 and rows["user-0"]["error_events"] >= 1
+    assert rows["user-1"]["critical_events"] <= rows["user-1"]["critical_events_error"]
+
+
+def test_merging_shards_matches_one_sketch_of_everything():
+    logs = _logs()
+    whole = ImpactSketches(precision=12, retention_hours=0)
+    whole.ingest(logs)
+    left, right = ImpactSketches(precision=12, retention_hours=0), ImpactSketches(precision=12, retention_hours=0)
+    left.ingest(logs[::2])
+    right.ingest(logs[1::2])
+
+    merged = left.merge(right)
+    assert merged.rows_ingested == whole.rows_ingested
+    assert merged.system_chaos_summary() == whole.system_chaos_summary()
+    assert merged.user_impact_by_experiment() == whole.user_impact_by_experiment()
+    assert merged.user_impact_summary(["user-4", "user-5"]) == whole.user_impact_summary(["user-4", "user-5"])
+
+
+def test_hour_windows_and_retention():
+    sketches = ImpactSketches(precision=12, retention_hours=2)
+    sketches.ingest(_logs())
+    hour1 = int((START + timedelta(hours=1)).timestamp())
+    assert {row["severity"] for row in sketches.system_chaos_summary(since=hour1)} == {"CRITICAL", "INFO"}
+    assert {row["severity"] for row in sketches.system_chaos_summary(until=hour1)} == {"ERROR"}
+
+    # Hour 3 moves the cutoff past hour 0 but not hour 1
+    sketches.ingest([_log(3, 1, severity="WARNING")])
+    assert {row["severity"] for row in sketches.system_chaos_summary()} == {"CRITICAL", "INFO", "WARNING"}
+    assert sketches.user_impact_summary()[0]["error_events"] == 0
+    assert all(key[0] >= hour1 for key in sketches.experiments)
+
+
+def test_tools_report_error_bounds():
+    sketches = ImpactSketches(precision=12, retention_hours=0)
+    sketches.ingest(_logs())
+    tools = {tool.__name__: tool for tool in sketches.as_tools()}
+    assert set(tools) == set(SKETCH_TOOLS)
+
+    end = (START + timedelta(hours=2)).isoformat()
+    assert {"affected_agents_error", "affected_experiments_error"} <= set(tools["system_chaos_summary"](end_time=end)[0])
+    assert "affected_users_error" in tools["user_impact_by_experiment"](end_time=end)[0]
+    assert "affected_users_error" in tools["user_impact_summary"]()[0]
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from agent_manager.telemetry import InMemoryExporter, StageInstrumentation
+
+
+def _context(agent_name="detector", invocation_id="inv-1"):
+    return SimpleNamespace(agent_name=agent_name, invocation_id=invocation_id)
+
+
+def _text(text, role="user"):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def test_model_stage_records_tokens_and_payload_sizes():
+    exporter = InMemoryExporter()
+    instrumentation = StageInstrumentation(exporters=[exporter])
+    context = _context()
+
+    instrumentation.before_model(context, LlmRequest(contents=[_text("find errors")]))
+    instrumentation.after_model(
+        context,
+        LlmResponse(
+            content=_text("no errors", role="model"),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=12, candidates_token_count=3),
+        ),
+    )
+
+    [record] = exporter.records
+    assert (record.kind, record.agent_name, record.invocation_id) == ("model", "detector", "inv-1")
+    assert (record.prompt_tokens, record.completion_tokens) == (12, 3)
+    assert (record.request_bytes, record.response_bytes) == (len("find errors"), len("no errors"))
+    assert record.duration_s >= 0
+
+
+def test_partial_responses_do_not_finish_the_model_stage():
+    exporter = InMemoryExporter()
+    instrumentation = StageInstrumentation(exporters=[exporter])
+    context = _context()
+
+    instrumentation.before_model(context, LlmRequest(contents=[_text("hi")]))
+    instrumentation.after_model(context, LlmResponse(content=_text("h", role="model"), partial=True))
+    assert exporter.records == []
+    instrumentation.after_model(context, LlmResponse(content=_text("hello", role="model")))
+    assert len(exporter.records) == 1
+
+
+def test_concurrent_invocations_are_timed_separately_and_summarised():
+    exporter = InMemoryExporter()
+    instrumentation = StageInstrumentation(exporters=[exporter])
+    first, second = _context(invocation_id="a"), _context(invocation_id="b")
+
+    instrumentation.before_agent(first)
+    instrumentation.before_agent(second)
+    instrumentation.after_agent(second)
+    instrumentation.after_agent(first)
+    tool = SimpleNamespace(name="total_error_logs")
+    tool_context = SimpleNamespace(agent_name="detector", invocation_id="a", function_call_id="call-1")
+    instrumentation.before_tool(tool, {"start_time": ""}, tool_context)
+    instrumentation.after_tool(tool, {"start_time": ""}, tool_context, [{"total_error_logs": 3}])
+
+    assert [r.invocation_id for r in exporter.records] == ["b", "a", "a"]
+    summary = exporter.summary()
+    assert summary["agent:detector"]["calls"] == 2
+    assert summary["tool:detector:total_error_logs"]["calls"] == 1
+    assert exporter.records[-1].response_bytes > 0
+
+
+def test_failing_exporter_does_not_stop_the_others():
+    class Broken:
+        def export(self, record):
+            raise RuntimeError("collector down")
+
+    exporter = InMemoryExporter()
+    instrumentation = StageInstrumentation(exporters=[Broken(), exporter])
+    instrumentation.before_agent(_context())
+    instrumentation.after_agent(_context())
+    assert len(exporter.records) == 1
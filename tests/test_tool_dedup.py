@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agent_manager.tool_dedup import ToolCallDeduplicator, active_deduplicator, dedup_after_tool, dedup_before_tool
+
+TOOL = SimpleNamespace(name="most_frequent_error_types")
+ARGS = {"limit": 5, "start_time": "2025-06-20T00:00:00Z"}
+
+
+def _context(session_id, call_id="call-1"):
+    return SimpleNamespace(_invocation_context=SimpleNamespace(session=SimpleNamespace(id=session_id)), function_call_id=call_id)
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        dedup = ToolCallDeduplicator()
+        owner = _context("s1")
+        assert await dedup.before_tool(TOOL, ARGS, owner) is None
+        # Same arguments in another order are the same call
+        waiter = asyncio.create_task(dedup.before_tool(TOOL, dict(reversed(list(ARGS.items()))), _context("s2")))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        dedup.after_tool(TOOL, ARGS, owner, {"rows": [1]})
+        assert await waiter == {"rows": [1]}
+        # Later runs reuse the finished result
+        assert await dedup.before_tool(TOOL, ARGS, _context("s3")) == {"rows": [1]}
+        # Different arguments execute
+        assert await dedup.before_tool(TOOL, {"limit": 10}, _context("s3")) is None
+        return dedup.stats
+
+    assert asyncio.run(scenario()) == {"executed": 2, "shared": 2}
+
+
+def test_empty_results_are_wrapped_so_adk_uses_them():
+    async def scenario():
+        dedup = ToolCallDeduplicator()
+        owner = _context("s1")
+        await dedup.before_tool(TOOL, ARGS, owner)
+        dedup.after_tool(TOOL, ARGS, owner, [])
+        return await dedup.before_tool(TOOL, ARGS, _context("s2"))
+
+    assert asyncio.run(scenario()) == {"result": []}
+
+
+def test_a_waiter_timing_out_does_not_cancel_the_call():
+    async def scenario():
+        dedup = ToolCallDeduplicator()
+        owner = _context("s1")
+        await dedup.before_tool(TOOL, ARGS, owner)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(dedup.before_tool(TOOL, ARGS, _context("s2")), 0.01)
+
+        waiter = asyncio.create_task(dedup.before_tool(TOOL, ARGS, _context("s3")))
+        await asyncio.sleep(0)
+        dedup.after_tool(TOOL, ARGS, owner, {"rows": []})
+        return await waiter
+
+    assert asyncio.run(scenario()) == {"rows": []}
+
+
+def test_waiters_run_the_call_themselves_when_the_owner_is_released():
+    async def scenario():
+        dedup = ToolCallDeduplicator()
+        await dedup.before_tool(TOOL, ARGS, _context("s1"))
+        waiter = asyncio.create_task(dedup.before_tool(TOOL, ARGS, _context("s2")))
+        await asyncio.sleep(0)
+
+        # The owning run raised or timed out before after_tool
+        dedup.release("s1")
+        assert await waiter is None
+        # The call is free again, so the next run executes it
+        assert await dedup.before_tool(TOOL, ARGS, _context("s3")) is None
+        return dedup.stats
+
+    assert asyncio.run(scenario()) == {"executed": 2, "shared": 0}
+
+
+def test_release_keeps_completed_results():
+    async def scenario():
+        dedup = ToolCallDeduplicator()
+        owner = _context("s1")
+        await dedup.before_tool(TOOL, ARGS, owner)
+        dedup.after_tool(TOOL, ARGS, owner, {"rows": [1]})
+        dedup.release("s1")
+        return await dedup.before_tool(TOOL, ARGS, _context("s2"))
+
+    assert asyncio.run(scenario()) == {"rows": [1]}
+
+
+def test_only_listed_tools_are_deduplicated():
+    async def scenario():
+        dedup = ToolCallDeduplicator(tool_names=["other_tool"])
+        await dedup.before_tool(TOOL, ARGS, _context("s1"))
+        return await dedup.before_tool(TOOL, ARGS, _context("s2")), dedup.stats
+
+    assert asyncio.run(scenario()) == (None, {"executed": 0, "shared": 0})
+
+
+def test_callbacks_use_the_active_deduplicator():
+    async def scenario():
+        owner = _context("s1")
+        # Outside a batch the callbacks do nothing
+        assert await dedup_before_tool(TOOL, ARGS, owner) is None
+        assert dedup_after_tool(TOOL, ARGS, owner, {"rows": [1]}) is None
+
+        dedup = ToolCallDeduplicator()
+        active_deduplicator.set(dedup)
+        assert await dedup_before_tool(TOOL, ARGS, owner) is None
+        dedup_after_tool(TOOL, ARGS, owner, {"rows": [1]})
+        return await dedup_before_tool(TOOL, ARGS, _context("s2"))
+
+    assert asyncio.run(scenario()) == {"rows": [1]}